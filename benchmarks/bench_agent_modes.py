@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Agent modes: ReAct text loop vs structured tool calls run in parallel.
+
+Each question is answered by both executors from agent_factory against the
+fake NetBox, reporting LLM iterations, prompt tokens and wall-clock time.
+
+By default the model is scripted: every question has a fixed plan of tool
+calls, which ReAct issues one per turn and tool-calling mode issues one turn
+per group of independent calls. Each model turn costs --llm-ms, so the
+numbers isolate the iteration count and the parallel tool execution. With
+--live both modes are driven by gpt-4o (OPENAI_API_KEY) and the iteration
+counts and tokens are the model's own, including ReAct parsing retries.
+
+    python benchmarks/bench_agent_modes.py --latency 0.3 --llm-ms 900
+    python benchmarks/bench_agent_modes.py --live
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'resources'))
+from fake_netbox import FakeNetBox
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk
+from langchain_core.tools import tool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+INSTRUCTIONS = """
+        Assistant is a network assistant answering questions from NetBox data.
+
+        TOOLS:
+        - get_netbox_data_tool: Fetches data from NetBox using the specified API URL.
+
+        GUIDELINES:
+        1. Use 'get_netbox_data_tool' with NetBox API URLs and query filters.
+        2. Keep responses concise.
+        """
+
+# Question -> turns of independent API calls
+QUESTIONS = {
+    "How many devices and VLANs are in site ams1?":
+        [['/api/dcim/devices/?site=ams1', '/api/ipam/vlans/?site=ams1']],
+    "Compare the number of devices in sites ams1, fra2 and lon1":
+        [['/api/dcim/devices/?site=ams1', '/api/dcim/devices/?site=fra2', '/api/dcim/devices/?site=lon1']],
+    "List circuits for provider zayo":
+        [['/api/circuits/circuits/?provider=zayo']],
+    "Show the interfaces and IP addresses of core-sw1":
+        [['/api/dcim/interfaces/?device=core-sw1', '/api/ipam/ip-addresses/?device=core-sw1']],
+    "Which tenants own prefixes and VLANs in fra2?":
+        [['/api/tenancy/tenants/'], ['/api/ipam/prefixes/?site=fra2', '/api/ipam/vlans/?site=fra2']],
+    "Show the platform and primary IP of edge-rtr1 and edge-rtr2":
+        [['/api/dcim/devices/?name=edge-rtr1', '/api/dcim/devices/?name=edge-rtr2']],
+}
+
+
+class ScriptedChat(GenericFakeChatModel):
+    """Replays scripted turns, streaming text and tool calls, after a fixed model latency"""
+
+    latency: float = 0.0
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        message = next(self.messages)
+        tool_calls = [{'name': c['name'], 'args': json.dumps(c['args']), 'id': c['id'], 'index': i}
+                      for i, c in enumerate(message.tool_calls)]
+        chunk = ChatGenerationChunk(message=AIMessageChunk(content=message.content, tool_call_chunks=tool_calls))
+        if run_manager:
+            run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+        yield chunk
+
+
+def script(mode: str, turns: list) -> list:
+    answer = "Here is what NetBox reports."
+    if mode == 'tools':
+        messages = [AIMessage(content='', tool_calls=[
+            {'name': 'get_netbox_data_tool', 'args': {'api_url': url}, 'id': f"call{t}_{i}"}
+            for i, url in enumerate(turn)]) for t, turn in enumerate(turns)]
+        return messages + [AIMessage(content=answer)]
+    messages = [AIMessage(content=f"Thought: I need {url}\nAction: get_netbox_data_tool\nAction Input: {url}")
+                for turn in turns for url in turn]
+    return messages + [AIMessage(content=f"Thought: I now know the final answer\nFinal Answer: {answer}")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency', type=float, default=0.3, help="NetBox latency per request (s)")
+    parser.add_argument('--llm-ms', type=float, default=900, help="Scripted model latency per turn (ms)")
+    parser.add_argument('--live', action='store_true', help="Use gpt-4o instead of the scripted model")
+    args = parser.parse_args()
+
+    netbox = FakeNetBox(object_count=50, latency=args.latency).start()
+    os.environ['NETBOX_URL'] = netbox.url
+    os.environ['NETBOX_TOKEN'] = 'bench'
+    os.environ['NETBOX_CACHE'] = 'off'
+    from netbox_client import get_netbox_controller, parse_get_input
+    from projection import projection_params, project_response
+    from observation_compactor import measure_conversation
+    from token_estimator import estimate_value_tokens
+    from agent_factory import build_agent_executor
+
+    @tool
+    def get_netbox_data_tool(api_url: str) -> dict:
+        """Fetch data from NetBox using the specified API URL."""
+        request = parse_get_input(api_url)
+        data = get_netbox_controller().get_api(request["api_url"], params=projection_params(request))
+        return project_response(request, data)
+
+    tools = [get_netbox_data_tool]
+    schema_tokens = estimate_value_tokens([convert_to_openai_tool(t) for t in tools])
+    if args.live:
+        from langchain_community.chat_models import ChatOpenAI
+
+    totals = {}
+    print(f"{'mode':<7}{'question':<62}{'iter':>5}{'tokens':>8}{'seconds':>9}")
+    for mode in ('react', 'tools'):
+        total = totals.setdefault(mode, [0, 0, 0.0])
+        for question, turns in QUESTIONS.items():
+            if args.live:
+                llm = ChatOpenAI(model_name="gpt-4o", streaming=True)
+            else:
+                llm = ScriptedChat(messages=iter(script(mode, turns)), latency=args.llm_ms / 1000)
+            executor = build_agent_executor(llm, tools, INSTRUCTIONS, mode=mode, verbose=False)
+            with measure_conversation() as meter:
+                start = time.perf_counter()
+                executor.invoke({"input": question, "chat_history": "", "agent_scratchpad": ""},
+                                config={"callbacks": [meter]})
+                elapsed = time.perf_counter() - start
+            # Tool schemas are sent with every tool-calling request but are not part of the messages
+            tokens = meter.prompt_tokens + (schema_tokens * meter.llm_calls if mode == 'tools' else 0)
+            print(f"{mode:<7}{question[:60]:<62}{meter.llm_calls:>5}{tokens:>8}{elapsed:>9.2f}")
+            total[0] += meter.llm_calls
+            total[1] += tokens
+            total[2] += elapsed
+    netbox.stop()
+
+    print()
+    for mode, (iterations, tokens, elapsed) in totals.items():
+        print(f"{mode:<7}{'total':<62}{iterations:>5}{tokens:>8}{elapsed:>9.2f}")
+    react, tools_mode = totals['react'], totals['tools']
+    print(f"\ntool-calling mode: {tools_mode[0] / react[0]:.0%} of the iterations, "
+          f"{tools_mode[1] / react[1]:.0%} of the prompt tokens, {react[2] / tools_mode[2]:.1f}x faster")
+
+
+if __name__ == '__main__':
+    main()
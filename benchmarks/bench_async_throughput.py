@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Concurrent-conversation throughput: sync NetBoxController vs AsyncNetBoxController.
+
+Each simulated conversation performs a few NetBox lookups separated by a fixed
+"LLM think time". The sync client is driven from a thread pool sized like the
+Slack socket-mode worker pool; the async client runs every conversation on one
+event loop, as slack_bot.py does with SLACK_ASYNC=true.
+
+    python benchmarks/bench_async_throughput.py --conversations 200
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'resources'))
+from netbox_client import NetBoxController
+from netbox_async import AsyncNetBoxController
+from fake_netbox import FakeNetBox
+
+CALLS = ['/api/dcim/sites/', '/api/dcim/devices/?site=site-1', '/api/dcim/devices/3/']
+
+
+def run_sync(url: str, conversations: int, workers: int, think: float) -> float:
+    controller = NetBoxController(url, 'bench', use_cache=False)
+
+    def conversation(_):
+        for api_url in CALLS:
+            time.sleep(think)
+            controller.get_api(api_url)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(conversation, range(conversations)))
+    elapsed = time.perf_counter() - start
+    controller.close()
+    return elapsed
+
+
+async def run_async(url: str, conversations: int, think: float) -> float:
+    controller = AsyncNetBoxController(url, 'bench', use_cache=False)
+
+    async def conversation():
+        for api_url in CALLS:
+            await asyncio.sleep(think)
+            await controller.get_api(api_url)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(conversation() for _ in range(conversations)))
+    elapsed = time.perf_counter() - start
+    await controller.aclose()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--conversations', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=10, help='sync worker threads (Slack default is 10)')
+    parser.add_argument('--latency', type=float, default=0.05, help='NetBox latency per request in seconds')
+    parser.add_argument('--think', type=float, default=0.05, help='simulated LLM time between calls in seconds')
+    args = parser.parse_args()
+
+    fake = FakeNetBox(latency=args.latency).start()
+    try:
+        sync_elapsed = run_sync(fake.url, args.conversations, args.workers, args.think)
+        async_elapsed = asyncio.run(run_async(fake.url, args.conversations, args.think))
+    finally:
+        fake.stop()
+
+    print(f"{'mode':<22}{'seconds':>10}{'conv/s':>10}")
+    print(f"{'sync, ' + str(args.workers) + ' threads':<22}{sync_elapsed:>10.2f}{args.conversations / sync_elapsed:>10.1f}")
+    print(f"{'async, one loop':<22}{async_elapsed:>10.2f}{args.conversations / async_elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+API catalog lookup latency: per-call JSON reload + difflib scan vs ApiCatalog.
+
+The catalog is grown from netbox_apis.json with synthetic plugin endpoints
+(/api/plugins/<plugin>/<model>/) to show how each approach scales. The
+baseline reproduces the original check_url_support: re-read the file, run
+difflib.get_close_matches over URLs and names, then map back with list scans.
+
+    python benchmarks/bench_catalog_lookup.py --sizes 68 500 2000 5000
+"""
+
+import argparse
+import difflib
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'resources'))
+from api_catalog import ApiCatalog, curated_api_file
+
+PLUGINS = ['bgp', 'dns', 'acl', 'topology', 'inventory', 'lifecycle', 'secrets', 'firewall', 'documents', 'floorplan']
+MODELS = ['sessions', 'peer-groups', 'routing-policies', 'zones', 'records', 'access-lists', 'rules', 'contracts',
+          'licenses', 'vendors', 'tiles', 'layers', 'policies', 'communities', 'prefix-lists', 'views']
+QUERIES = ['devices', 'device', '/api/dcim/device/', 'ip addresses', 'vlan', 'interface', 'circuit', 'prefix',
+           'virtual machines', 'bgp session', 'access list rules', '/api/plugins/dns/record/', 'power feed', 'nonsense']
+
+
+def build_catalog(size: int) -> list:
+    with open(curated_api_file(), 'r') as f:
+        entries = [{'URL': e['URL'], 'Name': e['Name']} for e in json.load(f)]
+    index = 0
+    while len(entries) < size:
+        plugin = f"{PLUGINS[index % len(PLUGINS)]}{index // (len(PLUGINS) * len(MODELS)) or ''}"
+        model = MODELS[(index // len(PLUGINS)) % len(MODELS)]
+        name = f"{plugin.upper()} {model.replace('-', ' ').title()}"
+        entries.append({'URL': f"/api/plugins/{plugin}/{model}/", 'Name': name})
+        index += 1
+    return entries[:size]
+
+
+def baseline_lookup(file_path: str, api_url: str) -> dict:
+    with open(file_path, 'r') as f:
+        url_list = [(entry['URL'], entry.get('Name', '')) for entry in json.load(f)]
+    urls = [entry[0] for entry in url_list]
+    names = [entry[1] for entry in url_list]
+    close_url_matches = difflib.get_close_matches(api_url, urls, n=1, cutoff=0.6)
+    close_name_matches = difflib.get_close_matches(api_url, names, n=1, cutoff=0.6)
+    if close_url_matches:
+        return {"closest_url": close_url_matches[0]}
+    if close_name_matches:
+        closest_url = [entry[0] for entry in url_list if entry[1] == close_name_matches[0]][0]
+        return {"closest_url": closest_url}
+    return {}
+
+
+def time_calls(fn, queries: list, repeat: int) -> float:
+    """Median latency of one lookup in microseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for query in queries:
+            fn(query)
+        samples.append((time.perf_counter() - start) / len(queries) * 1e6)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[68, 500, 2000, 5000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(0)
+    print(f"{'entries':>8} {'baseline us':>12} {'catalog us':>11} {'speedup':>8} {'load ms':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            file_path = os.path.join(tmp, f"apis_{size}.json")
+            with open(file_path, 'w') as f:
+                json.dump(build_catalog(size), f)
+            start = time.perf_counter()
+            catalog = ApiCatalog(file_path)
+            load_ms = (time.perf_counter() - start) * 1000
+            baseline = time_calls(lambda q: baseline_lookup(file_path, q), QUERIES, max(1, args.repeat // 2))
+            indexed = time_calls(catalog.match, QUERIES, args.repeat)
+            print(f"{size:>8} {baseline:>12.0f} {indexed:>11.1f} {baseline / indexed:>7.0f}x {load_ms:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
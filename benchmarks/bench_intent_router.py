@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Intent router fast path: hit rate and latency on a sample of Slack questions.
+
+Questions are planned against the real API catalog and answered from the
+fake NetBox (which ignores filters, so only latency and coverage are
+meaningful). Routed questions cost one NetBox GET; everything else falls back
+to the ReAct agent, whose latency is set by --agent-ms (a typical 3-5
+iteration GPT-4o run) since no LLM is called here.
+
+    python benchmarks/bench_intent_router.py --latency 0.03 --agent-ms 6000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'resources'))
+from fake_netbox import FakeNetBox
+
+QUESTIONS = [
+    "show devices in site ams1",
+    "list circuits for provider zayo",
+    "how many devices are there in site ams1?",
+    "list all active devices",
+    "show me the vlans in site fra2",
+    "list interfaces on device core-sw1",
+    "how many vms",
+    "list prefixes with status reserved",
+    "show device named edge-rtr1",
+    "count sites",
+    "list ip addresses on device core-sw1",
+    "what is connected to port 48 on core-sw1?",
+    "which devices in ams1 have no primary IP?",
+    "create a site called lab3",
+    "show devices in site ams1 with their interfaces",
+    "why is circuit CID-123 down?",
+    "list devices in ams1",
+    "delete the vlan 300 in fra2",
+    "how many interfaces does core-sw1 have that are disabled",
+    "summarize the tenants and their sites",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency', type=float, default=0.03, help="NetBox latency per request (s)")
+    parser.add_argument('--agent-ms', type=float, default=6000, help="Assumed agent latency per question (ms)")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    netbox = FakeNetBox(object_count=200, latency=args.latency).start()
+    os.environ['NETBOX_URL'] = netbox.url
+    os.environ['NETBOX_TOKEN'] = 'bench'
+    os.environ['NAME_RESOLVER'] = 'false'
+    os.environ['NETBOX_CACHE'] = 'off'
+    from netbox_client import get_netbox_controller, parse_get_input
+    from projection import projection_params, project_response
+    from intent_router import IntentRouter
+
+    def fetch(tool_input: str):
+        request = parse_get_input(tool_input)
+        data = get_netbox_controller().get_api(request["api_url"], params=projection_params(request))
+        return project_response(request, data)
+
+    router = IntentRouter()
+    fast_ms = []
+    for _ in range(args.repeat):
+        for question in QUESTIONS:
+            start = time.perf_counter()
+            answer = router.answer(question, fetch)
+            if answer is not None:
+                fast_ms.append((time.perf_counter() - start) * 1000)
+    netbox.stop()
+
+    stats = router.stats.snapshot()
+    routed = stats['fast_path'] // args.repeat
+    median = statistics.median(fast_ms) if fast_ms else 0.0
+    blended = (routed * median + (len(QUESTIONS) - routed) * args.agent_ms) / len(QUESTIONS)
+    print(f"questions          {len(QUESTIONS)}")
+    print(f"fast path hits     {routed} ({stats['hit_rate']:.0%})")
+    print(f"fallback reasons   {stats['fallbacks']}")
+    print(f"fast path p50      {median:.1f} ms")
+    print(f"agent path         {args.agent_ms:.0f} ms (assumed)")
+    print(f"mean per question  {blended:.0f} ms vs {args.agent_ms:.0f} ms agent-only")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Minimal in-process NetBox stand-in used by the benchmarks.
+Serves paginated list endpoints with a configurable per-request latency.
+"""
+
+import json
+import threading
+import time
+import http.server
+from urllib.parse import urlsplit, parse_qs
+
+
+class FakeNetBox:
+    """Threaded HTTP server answering NetBox-style list and detail requests"""
+
+    def __init__(self, object_count: int = 500, latency: float = 0.02):
+        self.object_count = object_count
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def _handler(self):
+        fake = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                with fake._lock:
+                    fake.requests += 1
+                time.sleep(fake.latency)
+                parts = urlsplit(self.path)
+                query = parse_qs(parts.query)
+                limit = int(query.get('limit', ['50'])[0]) or fake.object_count
+                offset = int(query.get('offset', ['0'])[0])
+                segments = [p for p in parts.path.split('/') if p]
+                if segments and segments[-1].isdigit():
+                    self._send(200, fake.make_object(int(segments[-1])))
+                    return
+                end = min(offset + limit, fake.object_count)
+                self._send(200, {
+                    "count": fake.object_count,
+                    "next": None,
+                    "previous": None,
+                    "results": [fake.make_object(i) for i in range(offset, end)],
+                })
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def make_object(self, object_id: int) -> dict:
+        return {
+            "id": object_id,
+            "url": f"{self.url}/api/dcim/devices/{object_id}/",
+            "display": f"device-{object_id}",
+            "name": f"device-{object_id}",
+            "status": {"value": "active", "label": "Active"},
+            "site": {"id": object_id % 7, "name": f"site-{object_id % 7}", "slug": f"site-{object_id % 7}"},
+            "tenant": None,
+            "custom_fields": {},
+            "last_updated": "2024-01-01T00:00:00Z",
+        }
+
+    def start(self) -> "FakeNetBox":
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -1,15 +1,33 @@
 import os
+import sys
 import json
+import time
 import logging
 import requests
-import difflib
 import streamlit as st
 from langchain_community.chat_models import ChatOpenAI
-from langchain.agents import AgentExecutor, create_react_agent
-from langchain.prompts import PromptTemplate
-from langchain_core.tools import tool, render_text_description
+from langchain_core.tools import tool
 import urllib3
 
+# Shared modules live in ../resources next to config_loader.py
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'resources'))
+from netbox_client import get_netbox_controller, get_client_stats, parse_get_input, parse_delete_input, is_unpaginated
+from netbox_mirror import get_mirror
+from projection import projection_params, project_response, get_projection_stats
+from name_resolver import get_name_resolver, get_resolver_stats, resolve_names, resolve_ids
+from api_catalog import get_api_catalog, check_url_support
+from openapi_catalog import ensure_catalog_in_background
+from graphql_queries import GraphQLError, parse_graphql_input, flatten_graphql, describe_templates
+from intent_router import route_question, record_agent_latency, get_router_stats
+from answer_cache import lookup_answer, record_answer, start_answer_cache_polling, get_answer_cache_stats
+from observation_compactor import compact_tools, measure_conversation, expand_results, stored_results, get_compactor_stats
+from agent_factory import chain_tools, is_final_answer, record_agent_run, get_agent_stats
+from conversation_memory import ConversationMemory, make_summarizer, get_memory_stats
+from warmup import shared_warmup_steps, warm_up, llm_warmup_enabled, start_status_server
+from agent_stream import StreamingCallback, streaming_enabled, get_stream_stats
+from agent_metrics import metrics_callbacks
+from model_router import build_tiered_agent, tier_model, tiering_enabled, get_model_tier_stats
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -18,92 +36,18 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 llm = None
 agent_executor = None
 
-# NetBoxController for CRUD Operations
-class NetBoxController:
-    def __init__(self, netbox_url, api_token):
-        self.netbox = netbox_url.rstrip('/')
-        self.api_token = api_token
-        self.headers = {
-            'Accept': 'application/json',
-            'Authorization': f"Token {self.api_token}",
-        }
-
-    def get_api(self, api_url: str, params: dict = None):
-        response = requests.get(
-            f"{self.netbox}{api_url}",
-            headers=self.headers,
-            params=params,
-            verify=False
-        )
-        response.raise_for_status()
-        return response.json()
-
-    def post_api(self, api_url: str, payload: dict):
-        response = requests.post(
-            f"{self.netbox}{api_url}",
-            headers=self.headers,
-            json=payload,
-            verify=False
-        )
-        response.raise_for_status()
-        return response.json()
-
-    def delete_api(self, api_url: str):
-        response = requests.delete(
-            f"{self.netbox}{api_url}",
-            headers=self.headers,
-            verify=False
-        )
-        response.raise_for_status()
-        return response.json()
-
-
-# Function to load supported URLs with their names from a JSON file
-def load_urls(file_path='netbox_apis.json'):
-    if not os.path.exists(file_path):
-        return {"error": f"URLs file '{file_path}' not found."}
-    try:
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-        return [(entry['URL'], entry.get('Name', '')) for entry in data]
-    except Exception as e:
-        return {"error": f"Error loading URLs: {str(e)}"}
-
-
-def check_url_support(api_url: str) -> dict:
-    url_list = load_urls()
-    if "error" in url_list:
-        return url_list  # Return error if loading URLs failed
-
-    urls = [entry[0] for entry in url_list]
-    names = [entry[1] for entry in url_list]
-
-    close_url_matches = difflib.get_close_matches(api_url, urls, n=1, cutoff=0.6)
-    close_name_matches = difflib.get_close_matches(api_url, names, n=1, cutoff=0.6)
-
-    if close_url_matches:
-        closest_url = close_url_matches[0]
-        matching_name = [entry[1] for entry in url_list if entry[0] == closest_url][0]
-        return {"status": "supported", "closest_url": closest_url, "closest_name": matching_name}
-    elif close_name_matches:
-        closest_name = close_name_matches[0]
-        closest_url = [entry[0] for entry in url_list if entry[1] == closest_name][0]
-        return {"status": "supported", "closest_url": closest_url, "closest_name": closest_name}
-    else:
-        return {"status": "unsupported", "message": f"The input '{api_url}' is not supported."}
-
-
 # Tools for interacting with NetBox
 @tool
-def discover_apis(dummy_input: str = None) -> dict:
-    """Discover available NetBox APIs from a local JSON file."""
+def discover_apis(query: str = "") -> dict:
+    """Discover NetBox APIs in the local API catalog: no input for the index of apps, or an app name or keywords to list matching endpoints."""
     try:
-        if not os.path.exists("netbox_apis.json"):
+        catalog = get_api_catalog()
+        if catalog.error:
             return {"error": "API JSON file not found. Please ensure 'netbox_apis.json' exists in the project directory."}
-        
-        with open("netbox_apis.json", "r") as f:
-            data = json.load(f)
-        return {"apis": data, "message": "APIs successfully loaded from JSON file"}
+        result = {**catalog.discover(query), "message": "APIs successfully loaded from JSON file"}
+        if catalog.meta.get("netbox_version"):
+            result["netbox_version"] = catalog.meta["netbox_version"]
+        return result
     except Exception as e:
         return {"error": f"An error occurred while loading the APIs: {str(e)}"}
 
@@ -120,28 +64,51 @@ def check_supported_url_tool(api_url: str) -> dict:
             "action": {
                 "next_tool": "get_netbox_data_tool",
                 "input": closest_url
-            }
+            },
+            # Methods, filter names and required create fields from the OpenAPI catalog
+            **{k: result[k] for k in ("methods", "filters", "required") if k in result}
         }
     return result
 
 @tool
 def get_netbox_data_tool(api_url: str) -> dict:
-    """Fetch data from NetBox."""
+    """Fetch data from NetBox. Input is an API URL, or a JSON string like {"api_url": "/api/dcim/interfaces/", "all_pages": true, "max_objects": 500} to read every page of a list endpoint. Results are trimmed to key fields; add "fields": ["name", ...] to choose fields, "brief": true for minimal objects or "full": true for the raw response."""
     try:
-        netbox_controller = NetBoxController(
-            netbox_url=os.getenv("NETBOX_URL"),
-            api_token=os.getenv("NETBOX_TOKEN")
-        )
-        data = netbox_controller.get_api(api_url)
-        return data
+        request = parse_get_input(api_url)
+        data = None
+        mirror = get_mirror()
+        if mirror is not None:
+            data = mirror.query(request["api_url"], all_pages=request.get("all_pages"), max_objects=request.get("max_objects"))
+        if data is None:
+            netbox_controller = get_netbox_controller()
+            params = projection_params(request)
+            # limit=0 is streamed and capped at max_objects instead of loading the whole list
+            if request.get("all_pages") or is_unpaginated(request["api_url"]):
+                data = netbox_controller.get_all(request["api_url"], params=params, max_objects=request.get("max_objects"))
+            else:
+                data = netbox_controller.get_api(request["api_url"], params=params)
+        return project_response(request, data)
     except requests.HTTPError as e:
         return {"error": f"Failed to fetch data from NetBox: {str(e)}"}
     except Exception as e:
         return {"error": f"An unexpected error occurred: {str(e)}"}
 
+@tool
+def graphql_netbox_tool(query: str) -> dict:
+    """Query NetBox's GraphQL API in one call for questions that join related objects (e.g. devices in a site with interfaces on a VLAN). Input is a JSON string {"template": "site_devices_on_vlan", "variables": {"site": "dc1", "vid": 100}} or {"query": "{ device_list { name } }"}. Templates: site_devices_on_vlan(site, vid), site_devices(site), device_interfaces(device), ip_address_owner(address), vlan_prefixes(vid), provider_circuits(provider)."""
+    try:
+        netbox_controller = get_netbox_controller()
+        return flatten_graphql(netbox_controller.graphql(parse_graphql_input(query)))
+    except GraphQLError as e:
+        return {"error": str(e), "templates": describe_templates()}
+    except requests.HTTPError as e:
+        return {"error": f"Failed to query NetBox GraphQL: {str(e)}"}
+    except Exception as e:
+        return {"error": f"An unexpected error occurred: {str(e)}"}
+
 @tool
 def create_netbox_data_tool(input: str) -> dict:
-    """Create new data in NetBox."""
+    """Create new data in NetBox. Input is a JSON string {"api_url": ..., "payload": {...}}; pass a list of payloads to create many objects in one call. Reference fields such as site, role, device_type, platform or tenant accept names or slugs instead of IDs."""
     try:
         data = json.loads(input)
         api_url = data.get("api_url")
@@ -150,45 +117,33 @@ def create_netbox_data_tool(input: str) -> dict:
         if not api_url or not payload:
             raise ValueError("Both 'api_url' and 'payload' must be provided.")
 
+        netbox_controller = get_netbox_controller()
+        if isinstance(payload, list):
+            if not all(isinstance(item, dict) for item in payload):
+                raise ValueError("Every payload in the list must be a dictionary.")
+            return netbox_controller.bulk_post_api(api_url, resolve_names(api_url, payload), batch_size=data.get("batch_size"))
+
         if not isinstance(payload, dict):
-            raise ValueError("Payload must be a dictionary.")
+            raise ValueError("Payload must be a dictionary or a list of dictionaries.")
 
-        netbox_controller = NetBoxController(
-            netbox_url=os.getenv("NETBOX_URL"),
-            api_token=os.getenv("NETBOX_TOKEN")
-        )
-        return netbox_controller.post_api(api_url, payload)
+        return netbox_controller.post_api(api_url, resolve_names(api_url, payload))
     except Exception as e:
         return {"error": f"An error occurred in create_netbox_data_tool: {str(e)}"}
 
 @tool
 def delete_netbox_data_tool(api_url: str) -> dict:
-    """Delete data from NetBox."""
+    """Delete data from NetBox. Input is an object URL, or a JSON string {"api_url": "/api/ipam/ip-addresses/", "ids": [1, 2, 3]} to delete many objects in one call; ids of sites, roles, tenants and other reference objects may be given as names."""
     try:
-        netbox_controller = NetBoxController(
-            netbox_url=os.getenv("NETBOX_URL"),
-            api_token=os.getenv("NETBOX_TOKEN")
-        )
-        return netbox_controller.delete_api(api_url)
+        request = parse_delete_input(api_url)
+        netbox_controller = get_netbox_controller()
+        if request.get("ids"):
+            return netbox_controller.bulk_delete_api(request["api_url"], resolve_ids(request["api_url"], request["ids"]), batch_size=request.get("batch_size"))
+        return netbox_controller.delete_api(request["api_url"])
     except requests.HTTPError as e:
         return {"error": f"Failed to delete data from NetBox: {str(e)}"}
     except Exception as e:
         return {"error": f"An unexpected error occurred: {str(e)}"}
 
-def process_agent_response(response):
-    if response and response.get("status") == "supported" and "next_tool" in response.get("action", {}):
-        next_tool = response["action"]["next_tool"]
-        tool_input = response["action"]["input"]
-
-        # Automatically invoke the next tool
-        return agent_executor.invoke({
-            "input": tool_input,
-            "chat_history": st.session_state.chat_history,
-            "agent_scratchpad": "",
-            "tool": next_tool
-        })
-    else:
-        return response
 
 # ============================================================
 # Streamlit App
@@ -222,6 +177,8 @@ def configure_page():
                 os.environ['NETBOX_URL'] = base_url
                 os.environ['NETBOX_TOKEN'] = api_token
                 os.environ['OPENAI_API_KEY'] = openai_key
+                # Build the agent now rather than on the first question
+                initialize_agent()
                 st.success("Configuration saved! Redirecting to chat...")
                 st.session_state['page'] = "chat"
                 
@@ -244,72 +201,81 @@ def configure_page():
                 os.environ['NETBOX_URL'] = base_url
                 os.environ['NETBOX_TOKEN'] = api_token
                 os.environ['OPENAI_API_KEY'] = openai_key
+                # Build the agent now rather than on the first question
+                initialize_agent()
                 st.success("Configuration saved! Redirecting to chat...")
                 st.session_state['page'] = "chat"
 
+@st.cache_resource(show_spinner="Starting the NetBox agent...")
+def build_agent(openai_api_key):
+    """Build and warm up the LLM and executor once per process and key
+
+    Streamlit re-runs this script on every interaction, resetting module
+    globals, so the agent lives in the resource cache instead.
+    """
+    # Initialize the LLM with the API key from the configuration page
+    # Streamed tokens let the chat page show the answer while it is generated
+    llm = ChatOpenAI(model_name=tier_model('strong'), openai_api_key=openai_api_key,
+                     streaming=streaming_enabled())
+    # Simple read requests try the cheaper, faster model first
+    fast_llm = ChatOpenAI(model_name=tier_model('fast'), openai_api_key=openai_api_key,
+                          streaming=streaming_enabled()) if tiering_enabled() else None
+
+    # Define tools
+    # Large observations are compacted to a token budget before they enter the scratchpad,
+    # and hand-offs such as check_supported_url_tool -> get_netbox_data_tool run in the same call
+    tools = chain_tools(compact_tools([discover_apis, check_supported_url_tool, get_netbox_data_tool, graphql_netbox_tool, create_netbox_data_tool, delete_netbox_data_tool]))
+
+    # TOOLS and GUIDELINES shared by both agent modes
+    instructions = """
+    Assistant is a network assistant capable of managing NetBox data using CRUD operations.
+
+    TOOLS:
+    - discover_apis: Lists NetBox APIs from the local API catalog. Call it without input for the apps, then with an app name (e.g. ipam) or keywords (e.g. vlan) for their endpoints.
+    - check_supported_url_tool: Checks if an API URL or Name is supported by NetBox.
+    - get_netbox_data_tool: Fetches data from NetBox using the specified API URL.
+    - graphql_netbox_tool: Answers questions spanning related objects with one NetBox GraphQL query.
+    - create_netbox_data_tool: Creates new data in NetBox using the specified API URL and payload.
+    - delete_netbox_data_tool: Deletes data from NetBox using the specified API URL.
+
+    GUIDELINES:
+    1. Use 'check_supported_url_tool' to validate ambiguous or unknown URLs or Names; only use the query filters and required fields it reports. Its result already includes the data of the closest URL under 'handoff', so do not fetch that URL again.
+    2. If certain about the URL, directly use 'get_netbox_data_tool', 'create_netbox_data_tool', or 'delete_netbox_data_tool'.
+    3. For counts or questions about every object of a type, call 'get_netbox_data_tool' with {{"api_url": "...", "all_pages": true}} so all pages are read.
+    4. For questions that join related objects (e.g. devices, their interfaces and VLANs), make ONE 'graphql_netbox_tool' call, preferably with a template, instead of chaining 'get_netbox_data_tool' calls.
+    5. To create or delete several objects, make ONE call with a list of payloads or a list of ids instead of repeating the tool.
+    6. Large results come back compacted: answer from their count, aggregates and sample, and write the [result:...] marker they give where the full list should be shown.
+    7. Follow a structured response format to ensure consistency.
+    """
+
+    # AGENT_MODE picks the ReAct text loop or structured tool calls run in parallel;
+    # simple reads go to the fast model and escalate to the strong one if it stumbles
+    agent_executor = build_tiered_agent(llm, fast_llm, tools, instructions)
+
+    # Drop cached answers when NetBox data changes outside this app
+    start_answer_cache_polling()
+
+    # Build the OpenAPI-derived catalog if enabled and missing or stale
+    ensure_catalog_in_background()
+
+    # Warm the name-to-ID index so write tools can take names without lookup calls
+    resolver = get_name_resolver()
+    if resolver is not None:
+        resolver.start_background_refresh(float(os.getenv("RESOLVER_REFRESH_INTERVAL", 300)))
+
+    # Catalog, NetBox connections and (optionally) the OpenAI connection are ready before the first question
+    warm_up(shared_warmup_steps() + ([('llm', lambda: llm.invoke("Reply with OK."), False)] if llm_warmup_enabled() else []))
+    return llm, agent_executor
+
 def initialize_agent():
     global llm, agent_executor
     if not llm:
-        # Initialize the LLM with the API key from session state
-        llm = ChatOpenAI(model_name="gpt-4o", openai_api_key=st.session_state['OPENAI_API_KEY'])
-
-        # Define tools
-        tools = [discover_apis, check_supported_url_tool, get_netbox_data_tool, create_netbox_data_tool, delete_netbox_data_tool]
-
-        # Create the prompt template
-        tool_descriptions = render_text_description(tools)
-        # Create the PromptTemplate
-        template = """
-        Assistant is a network assistant capable of managing NetBox data using CRUD operations.
-
-        TOOLS:
-        - discover_apis: Discovers available NetBox APIs from a local JSON file.
-        - check_supported_url_tool: Checks if an API URL or Name is supported by NetBox.
-        - get_netbox_data_tool: Fetches data from NetBox using the specified API URL.
-        - create_netbox_data_tool: Creates new data in NetBox using the specified API URL and payload.
-        - delete_netbox_data_tool: Deletes data from NetBox using the specified API URL.
-
-        GUIDELINES:
-        1. Use 'check_supported_url_tool' to validate ambiguous or unknown URLs or Names.
-        2. If certain about the URL, directly use 'get_netbox_data_tool', 'create_netbox_data_tool', or 'delete_netbox_data_tool'.
-        3. Follow a structured response format to ensure consistency.
-
-        FORMAT:
-        Thought: [Your thought process]
-        Action: [Tool Name]
-        Action Input: [Tool Input]
-        Observation: [Tool Response]
-        Final Answer: [Your response to the user]
-
-        Begin:
-
-        Previous conversation history:
-        {chat_history}
-
-        New input: {input}
-
-        {agent_scratchpad}
-        """
-        prompt_template = PromptTemplate(
-            template=template,
-            input_variables=["input", "chat_history", "agent_scratchpad"],
-            partial_variables={
-                "tools": tool_descriptions,
-                "tool_names": ", ".join([t.name for t in tools])
-            }
-        )
-
-        # Create the ReAct agent
-        agent = create_react_agent(llm=llm, tools=tools, prompt=prompt_template)
-
-        # Create the AgentExecutor
-        agent_executor = AgentExecutor(
-            agent=agent,
-            tools=tools,
-            handle_parsing_errors=True,
-            verbose=True,
-            max_iterations=10
-        )
+        llm, agent_executor = build_agent(st.session_state['OPENAI_API_KEY'])
+
+@st.cache_resource(show_spinner=False)
+def start_status():
+    """Serve /health and /ready once per Streamlit process"""
+    return start_status_server()
 
 def chat_page():
     st.title("Chat with NetBox AI Agent")
@@ -324,8 +290,9 @@ def chat_page():
     initialize_agent()
 
     # Initialize session state variables if not already set
-    if "chat_history" not in st.session_state:
-        st.session_state.chat_history = ""
+    if "memory" not in st.session_state:
+        # Token-bounded history for the prompt: recent turns plus a rolling summary of older ones
+        st.session_state.memory = ConversationMemory(make_summarizer(llm))
 
     if "conversation" not in st.session_state:
         st.session_state.conversation = []
@@ -336,31 +303,66 @@ def chat_page():
             # Add the user input to the conversation history
             st.session_state.conversation.append({"role": "user", "content": user_input})
 
+            # The answer is rendered into this slot, progressively when streaming
+            st.write(f"**Question:** {user_input}")
+            answer_slot = st.empty()
+
             # Invoke the agent with the user input and current chat history
             try:
-                response = agent_executor.invoke({
-                    "input": user_input,
-                    "chat_history": st.session_state.chat_history,
-                    "agent_scratchpad": ""  # Initialize agent scratchpad as an empty string
-                })
-
-                # Process the agent's response
-                final_response = process_agent_response(response)
-
-                # Extract the final answer
-                final_answer = final_response.get('output', 'No answer provided.')
-
-                # Display the question and answer
-                st.write(f"**Question:** {user_input}")
-                st.write(f"**Answer:** {final_answer}")
+                # Follow-up questions depend on the chat history, so only first questions use the answer cache
+                chat_history = st.session_state.memory.render()
+                first_question = not chat_history
+                final_answer = lookup_answer(user_input) if first_question else None
+                if final_answer is None:
+                    # Simple list and count questions are answered without the LLM
+                    fast_answer = route_question(user_input, get_netbox_data_tool.func)
+                    if fast_answer is not None:
+                        # Markdown needs two trailing spaces to keep the line breaks
+                        final_answer = fast_answer.replace("\n", "  \n")
+                tables = []
+                if final_answer is None:
+                    callbacks = []
+                    if streaming_enabled():
+                        # No API limit to respect here, so redraw at most every 50 ms; Streamlit
+                        # elements can only be updated from the script thread
+                        stream = StreamingCallback(lambda text: answer_slot.markdown(text.replace("\n", "  \n")),
+                                                   min_interval=0.05, owner_thread_only=True)
+                        callbacks.append(stream)
+                    with record_answer(user_input) as recording, measure_conversation() as meter:
+                        started = time.perf_counter()
+                        response = agent_executor.invoke({
+                            "input": user_input,
+                            "chat_history": chat_history,
+                            "agent_scratchpad": ""  # Initialize agent scratchpad as an empty string
+                        }, config={"callbacks": [meter] + metrics_callbacks('streamlit') + callbacks})
+
+                        record_agent_latency(time.perf_counter() - started)
+                        record_agent_run(meter.llm_calls)
+
+                        # Extract the final answer
+                        final_answer = response.get('output', 'No answer provided.')
+                        # Results the answer cites as [result:...] are shown in full below it
+                        tables = stored_results(final_answer)
+                        final_answer = expand_results(final_answer, lambda data: "(full result below)")
+                        # The tables are not cached, so answers pointing at them are not either
+                        if first_question and is_final_answer(response) and not tables:
+                            recording.save(final_answer)
+                    if callbacks:
+                        stream.finish()
+
+                # Display the answer
+                answer_slot.write(f"**Answer:** {final_answer}")
+                for data in tables:
+                    if isinstance(data, dict) and isinstance(data.get('results'), list):
+                        st.dataframe(data['results'])
+                    else:
+                        st.json(data)
 
                 # Add the response to the conversation history
                 st.session_state.conversation.append({"role": "assistant", "content": final_answer})
 
-                # Update chat history with the new conversation
-                st.session_state.chat_history = "\n".join(
-                    [f"{entry['role'].capitalize()}: {entry['content']}" for entry in st.session_state.conversation]
-                )
+                # Update the chat history with this exchange; older turns are summarized as the window fills
+                st.session_state.memory.add_exchange(user_input, final_answer)
             except Exception as e:
                 st.error(f"An error occurred: {str(e)}")
 
@@ -373,6 +375,30 @@ def chat_page():
             elif entry["role"] == "assistant":
                 st.markdown(f"**NetBox AI ReAct Agent:** {entry['content']}")
 
+    # Time to first byte is the latency users feel; the totals are in the streaming expander
+    stream_stats = get_stream_stats()
+    if stream_stats['runs']:
+        st.sidebar.metric("Time to first byte (p50)", f"{stream_stats['first_byte_p50_ms'] / 1000:.1f} s",
+                          help=f"Full answer p50: {stream_stats['total_p50_ms'] / 1000:.1f} s")
+
+    # NetBox client statistics, used to tune the NETBOX_* settings
+    client_stats = get_client_stats()
+    client_stats['streaming'] = stream_stats
+    client_stats['projection'] = get_projection_stats()
+    client_stats['name_resolver'] = get_resolver_stats()
+    client_stats['intent_router'] = get_router_stats()
+    client_stats['answer_cache'] = get_answer_cache_stats()
+    client_stats['compaction'] = get_compactor_stats()
+    client_stats['agent'] = get_agent_stats()
+    client_stats['memory'] = get_memory_stats()
+    client_stats['model_tiers'] = get_model_tier_stats()
+    for title, stats in client_stats.items():
+        if stats:
+            with st.sidebar.expander(f"NetBox {title.replace('_', ' ')}"):
+                st.json(stats)
+
+start_status()
+
 # Page Navigation
 if 'page' not in st.session_state:
     st.session_state['page'] = "configure"
@@ -0,0 +1,311 @@
+import os
+import logging
+import functools
+import threading
+import contextvars
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+from langchain_core.agents import AgentFinish
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder, PromptTemplate
+from langchain_core.tools import render_text_description
+
+try:
+    from langchain.agents import AgentExecutor, create_openai_tools_agent, create_react_agent
+except ImportError:  # langchain >= 1.0 moved the classic agents out
+    from langchain_classic.agents import AgentExecutor, create_openai_tools_agent, create_react_agent
+
+from loop_guard import RunGuard, loop_guard_enabled
+
+logger = logging.getLogger(__name__)
+
+AGENT_MODES = ('react', 'tools')
+# Threads running the tool calls of one model turn; shared by all conversations
+TOOL_WORKERS = int(os.getenv('AGENT_TOOL_WORKERS', 8))
+MAX_ITERATIONS = 10
+# Follow-up tools one tool call may hand off to
+MAX_HANDOFFS = 2
+
+REACT_FORMAT = """
+        FORMAT:
+        Thought: [Your thought process]
+        Action: [Tool Name]
+        Action Input: [Tool Input]
+        Observation: [Tool Response]
+        Final Answer: [Your response to the user]
+
+        Begin:
+
+        Previous conversation history:
+        {chat_history}
+
+        New input: {input}
+
+        {agent_scratchpad}
+        """
+PARALLEL_GUIDELINE = ("Request independent lookups (e.g. several endpoints or objects) together in one turn; "
+                      "they run in parallel.")
+TOOLS_INPUT = """Previous conversation history:
+{chat_history}
+
+New input: {input}"""
+STOPPED_OUTPUT = 'Agent stopped'
+
+
+class AgentRunStats:
+    """LLM calls per user request, tool hand-offs that saved a model round and why runs stopped"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.llm_calls = 0
+        self.max_llm_calls = 0
+        self.histogram: Counter = Counter()
+        self.handoffs = 0
+        self.stops: Counter = Counter()
+
+    def record_run(self, llm_calls: int):
+        with self._lock:
+            self.requests += 1
+            self.llm_calls += llm_calls
+            self.max_llm_calls = max(self.max_llm_calls, llm_calls)
+            self.histogram[llm_calls] += 1
+
+    def record_handoff(self):
+        with self._lock:
+            self.handoffs += 1
+
+    def record_stop(self, reason: str):
+        with self._lock:
+            self.stops[reason] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'llm_calls_per_request': round(self.llm_calls / self.requests, 2) if self.requests else 0.0,
+                'llm_calls_max': self.max_llm_calls,
+                'llm_calls_histogram': dict(sorted(self.histogram.items())),
+                'handoffs': self.handoffs,
+                'stop_reasons': dict(self.stops),
+            }
+
+
+_stats = AgentRunStats()
+_tool_pool = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix='agent-tool')
+_run_guard: contextvars.ContextVar[Optional[RunGuard]] = contextvars.ContextVar('agent_run_guard', default=None)
+
+
+class GuardedAgentExecutor(AgentExecutor):
+    """AgentExecutor that stops runaway runs early with the best answer so far
+
+    After each turn the run's ``RunGuard`` looks for repeated calls,
+    oscillation, stalls and exhausted budgets; when it fires, the run ends
+    with ``RunGuard.answer()`` instead of spending the remaining iterations.
+    Every run's stop reason is counted in the agent stats and returned as
+    ``stop_reason`` with the output.
+    """
+
+    def _finish(self, guard: Optional[RunGuard], output: Dict[str, Any]) -> Dict[str, Any]:
+        if guard is not None and guard.stop_reason:
+            reason = guard.stop_reason
+        elif str(output.get('output', '')).startswith(STOPPED_OUTPUT):
+            reason = 'max_iterations'
+        else:
+            reason = 'final_answer'
+        _stats.record_stop(reason)
+        output['stop_reason'] = reason
+        return output
+
+    def _call(self, inputs, run_manager=None):
+        guard = RunGuard() if loop_guard_enabled() else None
+        token = _run_guard.set(guard)
+        try:
+            return self._finish(guard, super()._call(inputs, run_manager))
+        finally:
+            _run_guard.reset(token)
+
+    async def _acall(self, inputs, run_manager=None):
+        guard = RunGuard() if loop_guard_enabled() else None
+        token = _run_guard.set(guard)
+        try:
+            return self._finish(guard, await super()._acall(inputs, run_manager))
+        finally:
+            _run_guard.reset(token)
+
+    def _guard(self, output):
+        guard = _run_guard.get()
+        if guard is None or isinstance(output, AgentFinish):
+            return output
+        reason = guard.check(output)
+        if reason is None:
+            return output
+        logger.info(f"Stopping the agent run early: {reason}")
+        return AgentFinish({'output': guard.answer(), 'stop_reason': reason}, f"Stopped early: {reason}")
+
+    def _take_next_step(self, name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager=None):
+        return self._guard(super()._take_next_step(name_to_tool_map, color_mapping, inputs, intermediate_steps,
+                                                   run_manager))
+
+    async def _atake_next_step(self, name_to_tool_map, color_mapping, inputs, intermediate_steps,
+                               run_manager=None):
+        return self._guard(await super()._atake_next_step(name_to_tool_map, color_mapping, inputs,
+                                                          intermediate_steps, run_manager))
+
+
+class ParallelAgentExecutor(GuardedAgentExecutor):
+    """AgentExecutor that runs the tool calls of one model turn concurrently
+
+    ``ainvoke`` already gathers them on the event loop; for ``invoke`` each
+    action is submitted to a thread pool as it is yielded and the steps are
+    collected once the turn's actions are all running. Tools run in a copy of
+    the caller's context, so per-conversation state held in context variables
+    (answer-cache read tracking, token meters) still sees their calls.
+    """
+
+    def _perform_agent_action(self, name_to_tool_map, color_mapping, agent_action, run_manager=None):
+        context = contextvars.copy_context()
+        perform = super()._perform_agent_action
+        return _tool_pool.submit(context.run, perform, name_to_tool_map, color_mapping, agent_action, run_manager)
+
+    def _iter_next_step(self, name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager=None):
+        pending = []
+        for item in super()._iter_next_step(name_to_tool_map, color_mapping, inputs, intermediate_steps,
+                                            run_manager):
+            if isinstance(item, Future):
+                pending.append(item)
+            else:
+                yield item
+        for future in pending:
+            yield future.result()
+
+
+def _handoff(result: Any) -> Optional[Dict[str, Any]]:
+    action = result.get('action') if isinstance(result, dict) else None
+    if isinstance(action, dict) and action.get('next_tool') and action.get('input') is not None:
+        return action
+    return None
+
+
+def _with_handoff(result: Dict[str, Any], action: Dict[str, Any], follow_up: Any) -> Dict[str, Any]:
+    chained = {k: v for k, v in result.items() if k != 'action'}
+    chained['handoff'] = {'tool': action['next_tool'], 'input': action['input'], 'result': follow_up}
+    return chained
+
+
+def chain_tools(tools: List[Any]) -> List[Any]:
+    """Copies of ``tools`` that run the follow-up a result hands off to in the same call
+
+    A result with ``{"action": {"next_tool": ..., "input": ...}}`` (e.g.
+    check_supported_url_tool -> get_netbox_data_tool) gets the follow-up's
+    result under ``handoff`` instead of costing another model round. Unless
+    TOOL_CHAINING is off.
+    """
+    if os.getenv('TOOL_CHAINING', 'true').lower() not in ('1', 'true', 'yes'):
+        return tools
+    by_name = {tool.name: tool for tool in tools}
+
+    def follow(result, depth):
+        action = _handoff(result)
+        if action is None or depth >= MAX_HANDOFFS or action['next_tool'] not in by_name:
+            return result
+        _stats.record_handoff()
+        follow_up = by_name[action['next_tool']].func(action['input'])
+        return _with_handoff(result, action, follow(follow_up, depth + 1))
+
+    async def afollow(result, depth):
+        action = _handoff(result)
+        if action is None or depth >= MAX_HANDOFFS or action['next_tool'] not in by_name:
+            return result
+        _stats.record_handoff()
+        target = by_name[action['next_tool']]
+        if target.coroutine is not None:
+            follow_up = await target.coroutine(action['input'])
+        else:
+            follow_up = target.func(action['input'])
+        return _with_handoff(result, action, await afollow(follow_up, depth + 1))
+
+    chained = []
+    for tool in tools:
+        update = {}
+        if getattr(tool, 'func', None) is not None:
+            func = tool.func
+
+            @functools.wraps(func)
+            def run(*args, _func=func, **kwargs):
+                return follow(_func(*args, **kwargs), 0)
+            update['func'] = run
+        if getattr(tool, 'coroutine', None) is not None:
+            coroutine = tool.coroutine
+
+            @functools.wraps(coroutine)
+            async def arun(*args, _coroutine=coroutine, **kwargs):
+                return await afollow(await _coroutine(*args, **kwargs), 0)
+            update['coroutine'] = arun
+        chained.append(tool.model_copy(update=update))
+    return chained
+
+
+def record_agent_run(llm_calls: int):
+    """Count the LLM calls one user request took"""
+    _stats.record_run(llm_calls)
+
+
+def is_final_answer(response: Dict[str, Any]) -> bool:
+    """Whether an agent response is a real final answer rather than an early or forced stop"""
+    return response.get('stop_reason', 'final_answer') == 'final_answer'
+
+
+def get_agent_stats() -> Dict[str, Any]:
+    """Return LLM-calls-per-request and hand-off statistics"""
+    return _stats.snapshot()
+
+
+def final_answer_marker(mode: str = None) -> str:
+    """Text that starts the final answer in the model output; tool-calling turns with text are the answer"""
+    return 'Final Answer:' if (mode or agent_mode()) == 'react' else ''
+
+
+def agent_mode() -> str:
+    """AGENT_MODE: 'react' (text Thought/Action loop) or 'tools' (structured, parallel tool calls)"""
+    mode = os.getenv('AGENT_MODE', 'react').lower()
+    if mode not in AGENT_MODES:
+        logger.warning(f"Unknown AGENT_MODE {mode!r}, using 'react'")
+        return 'react'
+    return mode
+
+
+def build_agent_executor(llm, tools: List[Any], instructions: str, mode: str = None,
+                         verbose: bool = True, max_iterations: int = MAX_ITERATIONS) -> AgentExecutor:
+    """Build the agent for ``mode`` from the shared TOOLS/GUIDELINES ``instructions``
+
+    ``instructions`` is a prompt template fragment, so literal braces are
+    doubled. Both modes take ``input`` and ``chat_history``.
+    """
+    mode = mode or agent_mode()
+    if mode == 'tools':
+        prompt = ChatPromptTemplate.from_messages([
+            ('system', f"{instructions.rstrip()}\n        - {PARALLEL_GUIDELINE}"),
+            ('human', TOOLS_INPUT),
+            MessagesPlaceholder('agent_scratchpad'),
+        ])
+        agent = create_openai_tools_agent(llm=llm, tools=tools, prompt=prompt)
+        return ParallelAgentExecutor(agent=agent, tools=tools, verbose=verbose, max_iterations=max_iterations)
+
+    prompt_template = PromptTemplate(
+        template=instructions.rstrip() + "\n" + REACT_FORMAT,
+        input_variables=["input", "chat_history", "agent_scratchpad"],
+        partial_variables={
+            "tools": render_text_description(tools),
+            "tool_names": ", ".join([t.name for t in tools])
+        }
+    )
+    agent = create_react_agent(llm=llm, tools=tools, prompt=prompt_template)
+    return GuardedAgentExecutor(
+        agent=agent,
+        tools=tools,
+        handle_parsing_errors=True,
+        verbose=verbose,
+        max_iterations=max_iterations
+    )
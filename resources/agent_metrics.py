@@ -0,0 +1,303 @@
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from token_estimator import estimate_tokens
+from response_cache import endpoint_prefix
+from netbox_client import add_request_listener
+from warmup import register_route
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+BYTE_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+ITERATION_BUCKETS = (1, 2, 3, 4, 5, 6, 8, 10)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Counter:
+    """Prometheus counter with labels"""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(_escape(labels.get(name, '')) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """Prometheus histogram with labels: cumulative buckets, sum and count per label set"""
+
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...], labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self.labels = labels
+        self._lock = threading.Lock()
+        # label values -> [per-bucket counts (last is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(_escape(labels.get(name, '')) for name in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += bucket
+                    le = 'le="+Inf"' if bound == float('inf') else f'le="{bound:g}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total:g}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+LLM_SECONDS = Histogram('agent_llm_request_seconds', 'Latency of one model call (agent iteration)',
+                        LATENCY_BUCKETS, ('model',))
+PROMPT_TOKENS = Histogram('agent_llm_prompt_tokens', 'Prompt tokens of one model call',
+                          TOKEN_BUCKETS, ('model',))
+COMPLETION_TOKENS = Histogram('agent_llm_completion_tokens', 'Completion tokens of one model call',
+                              TOKEN_BUCKETS, ('model',))
+LLM_ERRORS = Counter('agent_llm_errors_total', 'Model calls that raised', ('model',))
+TOOL_SECONDS = Histogram('agent_tool_seconds', 'Latency of one tool call', LATENCY_BUCKETS, ('tool', 'outcome'))
+PARSE_RETRIES = Counter('agent_parse_retries_total', 'Model outputs the agent could not parse and sent back')
+RUN_SECONDS = Histogram('agent_run_seconds', 'Wall-clock time of one agent run', LATENCY_BUCKETS, ('outcome',))
+RUN_ITERATIONS = Histogram('agent_run_llm_calls', 'Model calls of one agent run', ITERATION_BUCKETS)
+HTTP_SECONDS = Histogram('netbox_http_request_seconds', 'Latency of one NetBox HTTP attempt',
+                         LATENCY_BUCKETS, ('method', 'endpoint', 'status'))
+HTTP_BYTES = Histogram('netbox_http_response_bytes', 'Body size of one NetBox HTTP response',
+                       BYTE_BUCKETS, ('method', 'endpoint', 'status'))
+
+METRICS = [LLM_SECONDS, PROMPT_TOKENS, COMPLETION_TOKENS, LLM_ERRORS, TOOL_SECONDS, PARSE_RETRIES,
+           RUN_SECONDS, RUN_ITERATIONS, HTTP_SECONDS, HTTP_BYTES]
+
+
+def _model_name(serialized: Optional[Dict[str, Any]], kwargs: Dict[str, Any]) -> str:
+    params = kwargs.get('invocation_params') or {}
+    model = params.get('model_name') or params.get('model')
+    if not model and serialized:
+        model = (serialized.get('kwargs') or {}).get('model_name') or serialized.get('name')
+    return model or 'unknown'
+
+
+def _completion_text(response) -> str:
+    parts = []
+    for generations in response.generations:
+        for generation in generations:
+            parts.append(generation.text)
+            tool_calls = getattr(getattr(generation, 'message', None), 'tool_calls', None)
+            if tool_calls:
+                parts.append(json.dumps([{'name': c['name'], 'args': c['args']} for c in tool_calls], default=str))
+    return ''.join(parts)
+
+
+def _token_usage(response) -> Dict[str, Any]:
+    usage = (response.llm_output or {}).get('token_usage') or {}
+    if usage:
+        return usage
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, 'message', None), 'usage_metadata', None)
+            if metadata:
+                return {'prompt_tokens': metadata.get('input_tokens'),
+                        'completion_tokens': metadata.get('output_tokens')}
+    return {}
+
+
+def token_counts(response, estimated_prompt: int) -> Tuple[int, int]:
+    """(prompt, completion) tokens of a model response: the provider's usage report, else estimates"""
+    usage = _token_usage(response)
+    prompt = usage.get('prompt_tokens') or estimated_prompt
+    completion = usage.get('completion_tokens') or estimate_tokens(_completion_text(response))
+    return prompt, completion
+
+
+def prompt_tokens(prompts: List[str] = None, messages: List[List[Any]] = None) -> int:
+    """Estimated prompt tokens of an on_llm_start / on_chat_model_start call"""
+    if messages is not None:
+        return estimate_tokens(''.join(str(getattr(m, 'content', m)) for batch in messages for m in batch))
+    return sum(estimate_tokens(p) for p in prompts or [])
+
+
+class MetricsCallback(BaseCallbackHandler):
+    """Records the model and tool steps of one agent run into the /metrics histograms
+
+    Token counts come from the provider's usage report and are estimated
+    when it has none (e.g. streamed responses). When the run ends, one log
+    line breaks its time down into model and tool time.
+    """
+
+    def __init__(self, label: str = 'agent'):
+        self.label = label
+        self._lock = threading.Lock()
+        self._llm_starts: Dict[Any, Tuple[float, str, int]] = {}
+        self._tool_starts: Dict[Any, Tuple[float, str]] = {}
+        self._run_start: Optional[float] = None
+        self._root = None
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+        self.tool_calls = 0
+        self.tool_seconds = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.parse_retries = 0
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        if parent_run_id is None and self._root is None:
+            self._root = run_id
+            self._run_start = time.perf_counter()
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        if run_id == self._root:
+            self._finish('ok')
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        if run_id == self._root:
+            self._finish('error')
+
+    def _llm_start(self, serialized, run_id, prompt_tokens: int, kwargs: Dict[str, Any]):
+        with self._lock:
+            self._llm_starts[run_id] = (time.perf_counter(), _model_name(serialized, kwargs), prompt_tokens)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._llm_start(serialized, run_id, prompt_tokens(prompts), kwargs)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._llm_start(serialized, run_id, prompt_tokens(messages=messages), kwargs)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            start = self._llm_starts.pop(run_id, None)
+        if start is None:
+            return
+        started, model, estimated_prompt = start
+        seconds = time.perf_counter() - started
+        prompt, completion = token_counts(response, estimated_prompt)
+        LLM_SECONDS.observe(seconds, model=model)
+        PROMPT_TOKENS.observe(prompt, model=model)
+        COMPLETION_TOKENS.observe(completion, model=model)
+        with self._lock:
+            self.llm_calls += 1
+            self.llm_seconds += seconds
+            self.prompt_tokens += prompt
+            self.completion_tokens += completion
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            start = self._llm_starts.pop(run_id, None)
+        LLM_ERRORS.inc(model=start[1] if start else 'unknown')
+
+    def on_agent_action(self, action, **kwargs):
+        # ReAct output that failed to parse comes back as the '_Exception' pseudo-tool
+        if action.tool == '_Exception':
+            PARSE_RETRIES.inc()
+            with self._lock:
+                self.parse_retries += 1
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        name = (serialized or {}).get('name') or kwargs.get('name') or 'unknown'
+        if name == '_Exception':
+            return
+        with self._lock:
+            self._tool_starts[run_id] = (time.perf_counter(), name)
+
+    def _tool_done(self, run_id, outcome: str):
+        with self._lock:
+            start = self._tool_starts.pop(run_id, None)
+        if start is None:
+            return
+        seconds = time.perf_counter() - start[0]
+        TOOL_SECONDS.observe(seconds, tool=start[1], outcome=outcome)
+        with self._lock:
+            self.tool_calls += 1
+            self.tool_seconds += seconds
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._tool_done(run_id, 'ok')
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._tool_done(run_id, 'error')
+
+    def _finish(self, outcome: str):
+        total = time.perf_counter() - self._run_start
+        RUN_SECONDS.observe(total, outcome=outcome)
+        RUN_ITERATIONS.observe(self.llm_calls)
+        # Tools of one turn may run in parallel, so their time can exceed the wall clock
+        logger.info(
+            f"{self.label} run {outcome} in {total:.2f}s: {self.llm_calls} LLM calls {self.llm_seconds:.2f}s "
+            f"({self.prompt_tokens} prompt / {self.completion_tokens} completion tokens), "
+            f"{self.tool_calls} tool calls {self.tool_seconds:.2f}s, {self.parse_retries} parse retries"
+        )
+        self._root = None
+
+
+def record_http(method: str, api_url: str, status: Any, response_bytes: int, seconds: float):
+    """NetBox request listener feeding the HTTP histograms"""
+    labels = {'method': method.upper(), 'endpoint': endpoint_prefix(api_url), 'status': status}
+    HTTP_SECONDS.observe(seconds, **labels)
+    if isinstance(status, int):
+        HTTP_BYTES.observe(response_bytes, **labels)
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_enabled() -> bool:
+    """AGENT_METRICS: record agent steps and NetBox requests for /metrics"""
+    return os.getenv('AGENT_METRICS', 'true').lower() in ('1', 'true', 'yes')
+
+
+def metrics_callbacks(label: str = 'agent') -> List[BaseCallbackHandler]:
+    """Callbacks to add to an agent run: a fresh MetricsCallback, or none when metrics are off"""
+    return [MetricsCallback(label)] if metrics_enabled() else []
+
+
+if metrics_enabled():
+    add_request_listener(record_http)
+register_route('/metrics', lambda: (200, CONTENT_TYPE, render_metrics().encode()))
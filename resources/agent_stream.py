@@ -0,0 +1,246 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, Awaitable, Callable, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackHandler, BaseCallbackHandler
+
+from agent_factory import final_answer_marker
+
+logger = logging.getLogger(__name__)
+
+# Seconds between progressive updates of one message; Slack allows about one chat.update per second
+UPDATE_INTERVAL = float(os.getenv('STREAM_UPDATE_INTERVAL', 1.0))
+PLACEHOLDER = "_Working on it..._"
+# Characters of a tool input shown in a progress line
+STEP_INPUT_CHARS = 80
+# Recent runs kept for the latency percentiles
+LATENCY_WINDOW = 500
+
+
+class StreamStats:
+    """Time to first byte and update counts of streamed agent runs"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.updates = 0
+        self.throttled = 0
+        self.update_errors = 0
+        self.first_byte: deque = deque(maxlen=LATENCY_WINDOW)
+        self.total: deque = deque(maxlen=LATENCY_WINDOW)
+
+    def record_update(self, sent: bool):
+        with self._lock:
+            if sent:
+                self.updates += 1
+            else:
+                self.throttled += 1
+
+    def record_error(self):
+        with self._lock:
+            self.update_errors += 1
+
+    def record_run(self, first_byte: Optional[float], total: float):
+        with self._lock:
+            self.runs += 1
+            self.first_byte.append(total if first_byte is None else first_byte)
+            self.total.append(total)
+
+    @staticmethod
+    def _percentile(values: List[float], fraction: float) -> float:
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000, 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            first_byte, total = list(self.first_byte), list(self.total)
+            return {
+                'first_byte_p50_ms': self._percentile(first_byte, 0.5),
+                'first_byte_p95_ms': self._percentile(first_byte, 0.95),
+                'total_p50_ms': self._percentile(total, 0.5),
+                'total_p95_ms': self._percentile(total, 0.95),
+                'runs': self.runs,
+                'updates': self.updates,
+                'throttled_updates': self.throttled,
+                'update_errors': self.update_errors,
+            }
+
+
+_stats = StreamStats()
+
+
+class AgentStream:
+    """Progress of one agent run: tool steps taken so far and the final answer as it is generated
+
+    ``update()`` returns the text to render when it changed and the last update
+    is at least ``min_interval`` old; changes inside the interval stay pending
+    until the next event or ``finish()``. Model output counts as answer from
+    ``final_marker`` on (everything when it is empty, as in tool-calling mode).
+    """
+
+    def __init__(self, min_interval: float = None, stats: StreamStats = None, final_marker: str = None):
+        self.min_interval = UPDATE_INTERVAL if min_interval is None else min_interval
+        self.final_marker = final_answer_marker() if final_marker is None else final_marker
+        self.stats = stats or _stats
+        self.steps: List[str] = []
+        self.answer = ''
+        self.started = time.perf_counter()
+        self.first_byte: Optional[float] = None
+        self._output = ''
+        self._answering = False
+        self._last_update = 0.0
+        self._pending = False
+
+    def llm_start(self):
+        self._output = ''
+        self._answering = False
+        self.answer = ''
+
+    def token(self, token: str):
+        self._output += token
+        if self._answering:
+            self.answer += token
+        else:
+            # The marker can arrive split over several tokens
+            index = self._output.find(self.final_marker)
+            if index < 0:
+                return
+            self._answering = True
+            self.answer = self._output[index + len(self.final_marker):]
+        self._pending = True
+
+    def action(self, tool: str, tool_input: Any):
+        shown = str(tool_input).replace('\n', ' ')
+        if len(shown) > STEP_INPUT_CHARS:
+            shown = shown[:STEP_INPUT_CHARS] + '...'
+        self.steps.append(f"{tool}: {shown}")
+        self._pending = True
+
+    def text(self) -> str:
+        lines = [f"_> {step}_" for step in self.steps]
+        answer = self.answer.strip()
+        if answer:
+            lines.append('')
+            lines.append(answer)
+        return '\n'.join(lines) or PLACEHOLDER
+
+    def update(self) -> Optional[str]:
+        """Text to render now, or None when nothing changed or it is too soon"""
+        if not self._pending:
+            return None
+        now = time.perf_counter()
+        if now - self._last_update < self.min_interval:
+            self.stats.record_update(False)
+            return None
+        self._pending = False
+        self._last_update = now
+        if self.first_byte is None:
+            self.first_byte = now - self.started
+        self.stats.record_update(True)
+        return self.text()
+
+    def finish(self) -> float:
+        """Record the run; returns its total seconds"""
+        total = time.perf_counter() - self.started
+        self.stats.record_run(self.first_byte, total)
+        return total
+
+
+class StreamingCallback(BaseCallbackHandler):
+    """Renders an agent run progressively through ``render(text)`` (e.g. a Slack chat.update)
+
+    With ``owner_thread_only`` (Streamlit), events from tool threads are only
+    recorded and rendered by the next event on the creating thread.
+    """
+
+    def __init__(self, render: Callable[[str], Any], min_interval: float = None, owner_thread_only: bool = False):
+        self.stream = AgentStream(min_interval)
+        self.render = render
+        self._owner = threading.get_ident() if owner_thread_only else None
+
+    def _flush(self):
+        if self._owner is not None and threading.get_ident() != self._owner:
+            return
+        text = self.stream.update()
+        if text is None:
+            return
+        try:
+            self.render(text)
+        except Exception as e:
+            # A failed progress update must not fail the agent run
+            self.stream.stats.record_error()
+            logger.warning(f"Could not update the streamed answer: {e}")
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self._flush()
+        self.stream.llm_start()
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self._flush()
+        self.stream.llm_start()
+
+    def on_llm_new_token(self, token, **kwargs):
+        self.stream.token(token)
+        self._flush()
+
+    def on_llm_end(self, response, **kwargs):
+        self._flush()
+
+    def on_agent_action(self, action, **kwargs):
+        self.stream.action(action.tool, action.tool_input)
+        self._flush()
+
+    def on_tool_end(self, output, **kwargs):
+        self._flush()
+
+
+class AsyncStreamingCallback(AsyncCallbackHandler):
+    """``StreamingCallback`` for ``ainvoke``, awaiting an async ``render(text)``"""
+
+    def __init__(self, render: Callable[[str], Awaitable[Any]], min_interval: float = None):
+        self.stream = AgentStream(min_interval)
+        self.render = render
+
+    async def _flush(self):
+        text = self.stream.update()
+        if text is None:
+            return
+        try:
+            await self.render(text)
+        except Exception as e:
+            self.stream.stats.record_error()
+            logger.warning(f"Could not update the streamed answer: {e}")
+
+    async def on_llm_start(self, serialized, prompts, **kwargs):
+        self.stream.llm_start()
+
+    async def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.stream.llm_start()
+
+    async def on_llm_new_token(self, token, **kwargs):
+        self.stream.token(token)
+        await self._flush()
+
+    async def on_llm_end(self, response, **kwargs):
+        await self._flush()
+
+    async def on_agent_action(self, action, **kwargs):
+        self.stream.action(action.tool, action.tool_input)
+        await self._flush()
+
+    async def on_tool_end(self, output, **kwargs):
+        await self._flush()
+
+
+def streaming_enabled() -> bool:
+    return os.getenv('AGENT_STREAMING', 'true').lower() in ('1', 'true', 'yes')
+
+
+def get_stream_stats() -> Dict[str, Any]:
+    """Return time-to-first-byte and update statistics of streamed runs"""
+    return _stats.snapshot()
@@ -0,0 +1,512 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+from netbox_client import NetBoxController, add_write_listener, remove_write_listener, track_netbox_calls
+from response_cache import cache_scope, endpoint_prefix, get_response_cache
+from graphql_queries import GRAPHQL_URL
+from api_catalog import get_api_catalog
+
+logger = logging.getLogger(__name__)
+
+# Bumped by every write: answers built from GraphQL depend on it, since a
+# query can read any endpoint
+ANY_WRITE = '*'
+# Bumped when an upstream change cannot be mapped to an endpoint; every answer depends on it
+EPOCH = '#epoch'
+# Changelog endpoints, NetBox 4.1+ first
+CHANGELOG_URLS = ('/api/core/object-changes/', '/api/extras/object-changes/')
+# Final answers that report a failure rather than NetBox data
+UNCACHEABLE_PREFIXES = ('no answer provided', 'agent stopped', 'i stopped early', 'sorry')
+
+_MENTION = re.compile(r'<@[^>]+>')
+_PUNCTUATION = re.compile(r"[?!,;:\"'`*_()\[\]]")
+_POLITE_HEAD = re.compile(r"^(?:(?:hey|hi|hello|please|pls|kindly|can you|could you|would you)\s+)+")
+_POLITE_TAIL = re.compile(r"(?:\s+(?:please|pls|thanks|thank you|thx))+$")
+
+
+def normalize_question(question: str) -> str:
+    """Reduce a question to the form used as its cache key
+
+    Case, mentions, punctuation, extra whitespace and polite words do not
+    change the answer; dots, slashes and hyphens do (IPs, prefixes, names).
+    """
+    text = _MENTION.sub(' ', question or '').lower()
+    text = _PUNCTUATION.sub(' ', text)
+    text = ' '.join(text.split()).rstrip('. ')
+    text = _POLITE_HEAD.sub('', text)
+    return _POLITE_TAIL.sub('', text)
+
+
+class AnswerCacheStats:
+    """Thread-safe answer cache counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.stores = 0
+        self.skipped = 0
+        self.invalidations = 0
+        self.upstream_changes = 0
+
+    def incr(self, name: str, amount: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses + self.stale
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale': self.stale,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'stores': self.stores,
+                'skipped': self.skipped,
+                'invalidations': self.invalidations,
+                'upstream_changes': self.upstream_changes,
+            }
+
+
+class MemoryAnswerBackend:
+    """In-process LRU of answers bounded by entry count, with in-process data versions"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, record: Dict[str, Any], ttl: float):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.time() + ttl, record)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def versions(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._versions)
+
+    def bump(self, names: List[str]):
+        with self._lock:
+            for name in names:
+                self._versions[name] = self._versions.get(name, 0) + 1
+
+    def size(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'entries': len(self._entries), 'max_entries': self.max_entries}
+
+
+class SQLiteAnswerBackend:
+    """Answers in a local SQLite file, so they survive restarts of a single bot"""
+
+    def __init__(self, path: str, max_entries: int):
+        import sqlite3
+
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS answers (
+                    key TEXT PRIMARY KEY,
+                    record TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    used_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS answers_used_at ON answers (used_at)")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS answer_versions (
+                    name TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL
+                )
+            """)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT record, expires_at FROM answers WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE answers SET used_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key: str, record: Dict[str, Any], ttl: float):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers (key, record, expires_at, used_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(record, separators=(',', ':')), now + ttl, now),
+            )
+            self._conn.execute("DELETE FROM answers WHERE expires_at < ?", (now,))
+            self._conn.execute(
+                "DELETE FROM answers WHERE key IN (SELECT key FROM answers ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def versions(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT name, version FROM answer_versions").fetchall())
+
+    def bump(self, names: List[str]):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO answer_versions (name, version) VALUES (?, 1) "
+                "ON CONFLICT(name) DO UPDATE SET version = version + 1",
+                [(name,) for name in names],
+            )
+
+    def size(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        return {'entries': entries, 'max_entries': self.max_entries, 'path': self.path}
+
+
+class RedisAnswerBackend:
+    """Answers and data versions in Redis, shared between bot replicas
+
+    Expiry uses Redis TTLs; size is bounded by the server's ``maxmemory``
+    policy, as for the response cache.
+    """
+
+    def __init__(self, redis_url: str, namespace: str = 'answers:'):
+        import redis  # optional dependency
+
+        self.client = redis.Redis.from_url(redis_url)
+        self.client.ping()
+        self.namespace = namespace
+        self.versions_key = f"{namespace}versions"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.client.get(self.namespace + key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key: str, record: Dict[str, Any], ttl: float):
+        self.client.set(self.namespace + key, json.dumps(record, separators=(',', ':')), ex=max(1, int(ttl)))
+
+    def versions(self) -> Dict[str, int]:
+        return {name.decode(): int(version) for name, version in self.client.hgetall(self.versions_key).items()}
+
+    def bump(self, names: List[str]):
+        pipeline = self.client.pipeline()
+        for name in names:
+            pipeline.hincrby(self.versions_key, name, 1)
+        pipeline.execute()
+
+    def size(self) -> Dict[str, Any]:
+        return {'backend': 'redis'}
+
+
+class AnswerRecording:
+    """Collects what one agent run reads so its final answer can be cached"""
+
+    def __init__(self, cache: "AnswerCache", key: str, versions: Dict[str, int], calls: Dict[str, set]):
+        self.cache = cache
+        self.key = key
+        self.versions = versions
+        self.calls = calls
+
+    def save(self, answer: str):
+        self.cache.save(self, answer)
+
+
+class AnswerCache:
+    """Final agent answers keyed on the normalized question
+
+    Each answer stores the version of every endpoint the run read. A write
+    through our controllers, or an upstream change seen in NetBox's changelog,
+    bumps the endpoint's version, so the next lookup treats the answer as
+    stale. Versions are captured before the run starts, so a change during the
+    run also invalidates its answer. Runs that wrote to NetBox are not cached.
+    """
+
+    def __init__(self, backend, ttl: float = 300):
+        self.backend = backend
+        self.ttl = ttl
+        self.stats = AnswerCacheStats()
+        self._stop = threading.Event()
+        self._thread = None
+        self._changelog_url = None
+        self._last_change_id = None
+        add_write_listener(self.on_write)
+
+    # ------------------------------------------------------------------
+    # Lookups and stores
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def make_key(scope: str, question: str) -> str:
+        return hashlib.sha1(f"{scope}{normalize_question(question)}".encode()).hexdigest()
+
+    def lookup(self, scope: str, question: str) -> Optional[str]:
+        """Return the cached answer if none of the data it was built from changed"""
+        try:
+            record = self.backend.get(self.make_key(scope, question))
+            current = self.backend.versions() if record is not None else {}
+        except Exception as e:
+            logger.warning(f"Answer cache lookup failed: {e}")
+            record = None
+        if record is None:
+            self.stats.incr('misses')
+            return None
+        if any(current.get(name, 0) != version for name, version in record['versions'].items()):
+            self.stats.incr('stale')
+            return None
+        self.stats.incr('hits')
+        return record['answer']
+
+    @contextmanager
+    def record(self, scope: str, question: str) -> Iterator[AnswerRecording]:
+        """Track the NetBox calls of an agent run; call ``save(answer)`` on the result"""
+        try:
+            versions = self.backend.versions()
+        except Exception as e:
+            logger.warning(f"Answer cache versions unavailable: {e}")
+            versions = None
+        with track_netbox_calls() as calls:
+            yield AnswerRecording(self, self.make_key(scope, question), versions, calls)
+
+    def save(self, recording: AnswerRecording, answer: str):
+        if (recording.versions is None or recording.calls['writes'] or not isinstance(answer, str)
+                or not answer.strip() or answer.strip().lower().startswith(UNCACHEABLE_PREFIXES)):
+            self.stats.incr('skipped')
+            return
+        depends_on = {EPOCH}
+        for endpoint in recording.calls['reads']:
+            depends_on.add(ANY_WRITE if endpoint == endpoint_prefix(GRAPHQL_URL) else endpoint)
+        record = {
+            'answer': answer,
+            'versions': {name: recording.versions.get(name, 0) for name in sorted(depends_on)},
+            'stored_at': time.time(),
+        }
+        try:
+            self.backend.set(recording.key, record, self.ttl)
+            self.stats.incr('stores')
+        except Exception as e:
+            logger.warning(f"Answer cache store failed: {e}")
+
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+
+    def invalidate(self, endpoints: List[str]):
+        """Bump data versions; answers that read these endpoints become stale"""
+        try:
+            self.backend.bump(sorted(set(endpoints)))
+        except Exception as e:
+            logger.warning(f"Answer cache invalidation failed: {e}")
+            return
+        self.stats.incr('invalidations')
+
+    def on_write(self, api_url: str):
+        self.invalidate([endpoint_prefix(api_url), ANY_WRITE])
+
+    @staticmethod
+    def change_endpoint(change: Dict[str, Any]) -> Optional[str]:
+        """Endpoint of an ObjectChange, from the object URL or its ``app.model`` type"""
+        changed = change.get('changed_object')
+        if isinstance(changed, dict) and changed.get('url'):
+            return endpoint_prefix(urlsplit(changed['url']).path)
+        object_type = change.get('changed_object_type') or ''
+        if '.' not in object_type:
+            return None
+        app, model = object_type.split('.', 1)
+        names = {model, f"{model}s", f"{model}es", f"{model[:-1]}ies"}
+        for entry in get_api_catalog().entries:
+            segments = [s for s in entry['URL'].split('/') if s]
+            if len(segments) == 3 and segments[1] == app and segments[2].replace('-', '') in names:
+                return entry['URL']
+        return None
+
+    @staticmethod
+    def invalidate_responses(controller: NetBoxController, endpoints: set):
+        """Drop cached GETs of changed endpoints, so re-run agents do not rebuild answers from stale data"""
+        response_cache = get_response_cache()
+        if response_cache is None:
+            return
+        if EPOCH in endpoints:
+            response_cache.invalidate_scope(controller.cache_scope)
+            return
+        for endpoint in endpoints:
+            response_cache.invalidate(controller.cache_scope, endpoint)
+
+    def poll_changes(self, controller: NetBoxController) -> int:
+        """Invalidate answers and cached responses for objects changed in NetBox since the last poll
+
+        Returns the change count.
+        """
+        if self._changelog_url is None:
+            for url in CHANGELOG_URLS:
+                try:
+                    latest = controller.get_api(url, params={'ordering': '-id', 'limit': 1})
+                except requests.HTTPError as e:
+                    if e.response is not None and e.response.status_code == 404:
+                        continue
+                    raise
+                self._changelog_url = url
+                results = latest.get('results') or [{}]
+                self._last_change_id = results[0].get('id', 0)
+                return 0
+            raise RuntimeError("NetBox exposes no object-changes endpoint")
+
+        seen = 0
+        while True:
+            page = controller.get_api(self._changelog_url, params={
+                'id__gt': self._last_change_id, 'ordering': 'id', 'limit': 500,
+            })
+            changes = page.get('results') or []
+            if not changes:
+                break
+            endpoints = set()
+            for change in changes:
+                endpoint = self.change_endpoint(change)
+                endpoints.add(endpoint or EPOCH)
+                self._last_change_id = max(self._last_change_id, change.get('id', 0))
+            # Responses first: an answer re-run between the two steps must not read stale GETs
+            self.invalidate_responses(controller, endpoints)
+            self.invalidate(list(endpoints | {ANY_WRITE}))
+            seen += len(changes)
+            if len(changes) < 500:
+                break
+        if seen:
+            self.stats.incr('upstream_changes', seen)
+        return seen
+
+    def start_change_polling(self, controller: NetBoxController, interval: float = 60):
+        """Poll NetBox's changelog every ``interval`` seconds on a daemon thread"""
+        if self._thread is not None:
+            return
+
+        def run():
+            while not self._stop.is_set():
+                try:
+                    self.poll_changes(controller)
+                except Exception as e:
+                    logger.warning(f"Answer cache changelog poll failed: {e}")
+                self._stop.wait(interval)
+
+        self._thread = threading.Thread(target=run, name='netbox-answer-cache', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        remove_write_listener(self.on_write)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.stats.snapshot()
+        try:
+            stats.update(self.backend.size())
+        except Exception as e:
+            stats['error'] = str(e)
+        return stats
+
+
+_answer_cache: Optional[AnswerCache] = None
+_answer_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> Optional[AnswerCache]:
+    """Return the process-wide answer cache configured from ANSWER_CACHE_* settings
+
+    ANSWER_CACHE is ``memory`` (default), ``sqlite``, ``redis`` or ``off``.
+    SQLite and Redis fall back to memory when they cannot be opened.
+    """
+    global _answer_cache
+    with _answer_cache_lock:
+        if _answer_cache is not None:
+            return _answer_cache
+        mode = os.getenv('ANSWER_CACHE', 'memory').lower()
+        if mode in ('off', 'none', 'false', '0'):
+            return None
+
+        max_entries = int(os.getenv('ANSWER_CACHE_MAX_ENTRIES', 1000))
+        backend = None
+        try:
+            if mode == 'sqlite':
+                backend = SQLiteAnswerBackend(os.getenv('ANSWER_CACHE_PATH', 'answer_cache.sqlite3'), max_entries)
+            elif mode == 'redis':
+                backend = RedisAnswerBackend(os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+        except Exception as e:
+            logger.warning(f"Answer cache backend '{mode}' unavailable, using memory: {e}")
+        if backend is None:
+            backend = MemoryAnswerBackend(max_entries)
+
+        _answer_cache = AnswerCache(backend, ttl=float(os.getenv('ANSWER_CACHE_TTL', 300)))
+        return _answer_cache
+
+
+def _scope() -> str:
+    return cache_scope(os.getenv('NETBOX_URL', ''), os.getenv('NETBOX_TOKEN', ''))
+
+
+def lookup_answer(question: str) -> Optional[str]:
+    """Cached answer to ``question`` for the configured NetBox, or None"""
+    cache = get_answer_cache()
+    if cache is None:
+        return None
+    return cache.lookup(_scope(), question)
+
+
+class _NoRecording:
+    def save(self, answer: str):
+        pass
+
+
+@contextmanager
+def record_answer(question: str) -> Iterator[Any]:
+    """Wrap an agent run; ``save(answer)`` on the yielded object caches its final answer"""
+    cache = get_answer_cache()
+    if cache is None:
+        yield _NoRecording()
+        return
+    with cache.record(_scope(), question) as recording:
+        yield recording
+
+
+def start_answer_cache_polling(netbox_url: str = None, api_token: str = None):
+    """Watch NetBox's changelog for upstream changes every ANSWER_CACHE_POLL seconds (0 disables)"""
+    cache = get_answer_cache()
+    interval = float(os.getenv('ANSWER_CACHE_POLL', 60))
+    netbox_url = netbox_url or os.getenv('NETBOX_URL')
+    if cache is None or interval <= 0 or not netbox_url:
+        return
+    # The changelog must be read live, so polling bypasses the response cache
+    controller = NetBoxController(netbox_url, api_token or os.getenv('NETBOX_TOKEN'), use_cache=False)
+    cache.start_change_polling(controller, interval)
+
+
+def get_answer_cache_stats() -> Dict[str, Any]:
+    """Return answer cache statistics, if it exists"""
+    if _answer_cache is None:
+        return {}
+    return _answer_cache.get_stats()
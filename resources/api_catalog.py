@@ -0,0 +1,358 @@
+import os
+import json
+import time
+import heapq
+import difflib
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from response_cache import endpoint_prefix
+
+logger = logging.getLogger(__name__)
+
+# Similarity needed to call an input "supported", as difflib.get_close_matches used
+MATCH_CUTOFF = 0.6
+# Keys gathered from the rarest grams' posting lists, then narrowed by overlap
+CANDIDATE_POOL = 200
+# Candidates scored with difflib
+CANDIDATES = 12
+# Seconds between mtime checks of the catalog file
+RELOAD_CHECK_INTERVAL = 2.0
+# Entry keys listed by discover_apis; filters and required fields come with check_url_support
+SUMMARY_KEYS = ('URL', 'Name', 'Methods')
+# Catalogs up to this size are listed whole by discover_apis; larger ones get a per-app index
+DISCOVER_FULL_LIMIT = int(os.getenv('DISCOVER_FULL_LIMIT', 80))
+# Entries returned by discover_apis for an app or keyword query
+DISCOVER_LIMIT = int(os.getenv('DISCOVER_LIMIT', 60))
+# Example endpoint names shown per app in the index
+DISCOVER_EXAMPLES = 4
+# Similarity for keyword queries, looser than check_url_support's MATCH_CUTOFF
+DISCOVER_CUTOFF = 0.4
+
+
+def curated_api_file() -> str:
+    """Locate netbox_apis.json from the agent, Slack bot or repository root"""
+    candidates = [
+        'netbox_apis.json',
+        os.path.join('netbox_react_agent', 'netbox_apis.json'),
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'netbox_react_agent', 'netbox_apis.json'),
+    ]
+    for path in candidates:
+        if os.path.exists(path):
+            return path
+    return candidates[0]
+
+
+def generated_catalog_file() -> str:
+    """Path of the catalog built from the OpenAPI schema (NETBOX_CATALOG_FILE or next to netbox_apis.json)"""
+    return os.getenv('NETBOX_CATALOG_FILE') or os.path.join(
+        os.path.dirname(curated_api_file()), 'netbox_catalog.json')
+
+
+def default_api_file() -> str:
+    """The generated OpenAPI catalog when it exists, else the curated netbox_apis.json"""
+    generated = generated_catalog_file()
+    return generated if os.path.exists(generated) else curated_api_file()
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _tokens(text: str) -> set:
+    for sep in '/-_':
+        text = text.replace(sep, ' ')
+    return {t for t in text.split() if t and t != 'api'}
+
+
+def _grams(text: str) -> frozenset:
+    """Trigrams plus whole tokens (prefixed so they never collide with trigrams)"""
+    return frozenset(_trigrams(text) | {f"#{t}" for t in _tokens(text)})
+
+
+def app_of(url: str) -> str:
+    """NetBox app of a catalog URL: ``ipam`` for /api/ipam/..., ``plugins/<name>`` for plugin APIs"""
+    parts = [p for p in url.lower().strip('/').split('/') if p and p != 'api']
+    if not parts:
+        return ''
+    if parts[0] == 'plugins' and len(parts) > 1:
+        return f"plugins/{parts[1]}"
+    return parts[0]
+
+
+def normalize_query(text: str) -> str:
+    """Lower-case an input and reduce full URLs to their path"""
+    text = (text or '').strip().lower()
+    if text.startswith(('http://', 'https://')):
+        text = urlsplit(text).path
+    return text.split('?', 1)[0]
+
+
+class _CatalogIndex:
+    """Immutable lookup structures built from one version of the catalog file"""
+
+    def __init__(self, entries: List[Dict[str, Any]]):
+        keys: List[Tuple[str, int]] = []
+        key_grams: List[frozenset] = []
+        by_url, by_name = {}, {}
+        postings = defaultdict(list)
+        for position, entry in enumerate(entries):
+            url, name = entry['URL'], entry.get('Name', '')
+            by_url[url.lower()] = entry
+            by_url.setdefault(endpoint_prefix(url).lower(), entry)
+            if name:
+                by_name.setdefault(name.lower(), entry)
+            for key in (url, name):
+                if not key:
+                    continue
+                key_id = len(keys)
+                keys.append((key.lower(), position))
+                grams = _grams(key.lower())
+                key_grams.append(grams)
+                for gram in grams:
+                    postings[gram].append(key_id)
+        self.entries = entries
+        self.by_url = by_url
+        self.by_name = by_name
+        self.keys = keys
+        self.key_grams = key_grams
+        self.postings = dict(postings)
+
+    def candidates(self, query: str, pool: int = CANDIDATE_POOL) -> List[int]:
+        """Key ids most similar to ``query`` by token/trigram overlap
+
+        Only the posting lists of the query's rarest grams are read, so the
+        work depends on how selective the query is, not on the catalog size.
+        """
+        grams = _grams(query)
+        lists = sorted((self.postings[g] for g in grams if g in self.postings), key=len)
+        pooled = set()
+        for ids in lists:
+            if len(pooled) >= pool:
+                break
+            pooled.update(ids)
+        scored = []
+        for key_id in pooled:
+            other = self.key_grams[key_id]
+            # Ties go to the key listed first in the file
+            scored.append((2 * len(grams & other) / (len(grams) + len(other)), -key_id))
+        return [-neg_id for _, neg_id in heapq.nlargest(CANDIDATES, scored)]
+
+
+class ApiCatalog:
+    """API catalog file loaded once with indexes for fast fuzzy lookup
+
+    The file is either the curated netbox_apis.json (a list of entries) or a
+    catalog generated from the OpenAPI schema (``{"entries": [...]}`` plus a
+    version stamp, see openapi_catalog.py). Lookup keys are each entry's URL and Name. Exact URL, endpoint and name
+    hits are dict lookups; fuzzy queries take candidates from a token and
+    trigram index and score only those with difflib, so the cost no longer
+    grows linearly with the catalog. The file is reloaded when its mtime changes.
+    """
+
+    def __init__(self, file_path: str = None):
+        self.file_path = file_path or default_api_file()
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._checked_at = 0.0
+        self._index = _CatalogIndex([])
+        self.error: Optional[str] = None
+        # Version stamp of a generated catalog; empty for netbox_apis.json
+        self.meta: Dict[str, Any] = {}
+        self._maybe_reload(force=True)
+
+    @property
+    def entries(self) -> List[Dict[str, Any]]:
+        self._maybe_reload()
+        return self._index.entries
+
+    @property
+    def by_url(self) -> Dict[str, Dict[str, Any]]:
+        self._maybe_reload()
+        return self._index.by_url
+
+    @property
+    def by_name(self) -> Dict[str, Dict[str, Any]]:
+        self._maybe_reload()
+        return self._index.by_name
+
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.file_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _maybe_reload(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._checked_at < RELOAD_CHECK_INTERVAL:
+            return
+        self._checked_at = now
+        stamp = self._file_stamp()
+        if stamp == self._stamp and not force:
+            return
+        with self._lock:
+            if stamp is None:
+                self.error = f"URLs file '{self.file_path}' not found."
+                self._index = _CatalogIndex([])
+            else:
+                try:
+                    with open(self.file_path, 'r') as f:
+                        data = json.load(f)
+                    entries = data['entries'] if isinstance(data, dict) else data
+                    self.meta = {k: v for k, v in data.items() if k != 'entries'} if isinstance(data, dict) else {}
+                    self.error = None
+                    # Swapped in one assignment so concurrent readers see old or new, never a mix
+                    self._index = _CatalogIndex(entries)
+                    logger.info(f"Loaded API catalog with {len(entries)} entries from {self.file_path}")
+                except Exception as e:
+                    self.error = f"Error loading URLs: {str(e)}"
+            self._stamp = stamp
+
+    def get(self, api_url: str) -> Optional[Dict[str, Any]]:
+        """Return the entry for an exact catalog URL or one of its detail URLs"""
+        self._maybe_reload()
+        query = normalize_query(api_url)
+        index = self._index
+        return index.by_url.get(query) or index.by_url.get(endpoint_prefix(query))
+
+    def match(self, text: str, limit: int = 5, cutoff: float = MATCH_CUTOFF) -> List[Tuple[float, Dict[str, Any]]]:
+        """Return up to ``limit`` (score, entry) pairs ranked by similarity to a URL or name"""
+        self._maybe_reload()
+        query = normalize_query(text)
+        if not query:
+            return []
+        index = self._index
+        exact = index.by_url.get(query) or index.by_name.get(query)
+        if exact is None and query.startswith('/'):
+            exact = index.by_url.get(endpoint_prefix(query))
+        if exact is not None:
+            return [(1.0, exact)]
+
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(query)
+        best: Dict[int, float] = {}
+        for key_id in index.candidates(query):
+            key, position = index.keys[key_id]
+            matcher.set_seq1(key)
+            if matcher.real_quick_ratio() < cutoff or matcher.quick_ratio() < cutoff:
+                continue
+            score = matcher.ratio()
+            if score >= cutoff and score > best.get(position, 0.0):
+                best[position] = score
+        ranked = sorted(best.items(), key=lambda kv: (-kv[1], kv[0]))[:limit]
+        return [(round(score, 4), index.entries[position]) for position, score in ranked]
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Entries reduced to SUMMARY_KEYS, small enough to hand to the LLM"""
+        return [{k: entry[k] for k in SUMMARY_KEYS if k in entry} for entry in self.entries]
+
+    def apps(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Entries grouped by app, in file order"""
+        grouped: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for entry in self.entries:
+            grouped[app_of(entry['URL'])].append(entry)
+        return dict(grouped)
+
+    def discover(self, query: str = None) -> Dict[str, Any]:
+        """What discover_apis returns for ``query``, bounded whatever the catalog size
+
+        Without a query a small catalog is listed whole and a large one as a
+        per-app index. A query naming an app lists that app's endpoints;
+        anything else returns the entries whose URL or name contains the
+        keywords, topped up with the closest fuzzy matches.
+        """
+        text = normalize_query(query).strip('/')
+        if text in ('none', 'null'):
+            text = ''
+        if text.startswith('api/'):
+            text = text[4:]
+        entries = self.entries
+        if not text:
+            if len(entries) <= DISCOVER_FULL_LIMIT:
+                return {"apis": self.summary()}
+            index = [{"app": app, "endpoints": len(app_entries),
+                      "examples": [e.get('Name') or e['URL'] for e in app_entries[:DISCOVER_EXAMPLES]]}
+                     for app, app_entries in self.apps().items()]
+            return {"apps": index, "total_endpoints": len(entries),
+                    "hint": "Call discover_apis again with an app name (e.g. 'ipam') or keywords (e.g. 'vlan') to list endpoints."}
+
+        app_entries = self.apps().get(text)
+        if app_entries is not None:
+            found = app_entries
+        else:
+            words = _tokens(text)
+            found = [e for e in entries
+                     if all(w in e['URL'].lower() or w in e.get('Name', '').lower() for w in words)]
+            if len(found) < DISCOVER_LIMIT:
+                listed = {id(e) for e in found}
+                found += [e for _, e in self.match(text, limit=DISCOVER_LIMIT, cutoff=DISCOVER_CUTOFF)
+                          if id(e) not in listed]
+        result: Dict[str, Any] = {
+            "apis": [{k: e[k] for k in SUMMARY_KEYS if k in e} for e in found[:DISCOVER_LIMIT]]}
+        if len(found) > DISCOVER_LIMIT:
+            result["more"] = len(found) - DISCOVER_LIMIT
+        if not found:
+            result["apps"] = sorted(self.apps())
+        return result
+
+    def url_names(self) -> List[Tuple[str, str]]:
+        """(URL, Name) pairs in file order"""
+        return [(entry['URL'], entry.get('Name', '')) for entry in self.entries]
+
+
+_catalogs: Dict[str, ApiCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_api_catalog(file_path: str = None) -> ApiCatalog:
+    """Return the shared catalog for a file, loading it on first use"""
+    file_path = os.path.abspath(file_path or default_api_file())
+    with _catalogs_lock:
+        catalog = _catalogs.get(file_path)
+        if catalog is None:
+            catalog = _catalogs[file_path] = ApiCatalog(file_path)
+        return catalog
+
+
+def check_url_support(api_url: str, file_path: str = None) -> dict:
+    """Find the catalog entry closest to an API URL or name"""
+    catalog = get_api_catalog(file_path)
+    if catalog.error:
+        return {"error": catalog.error}
+    matches = catalog.match(api_url)
+    if not matches:
+        return {"status": "unsupported", "message": f"The input '{api_url}' is not supported."}
+    entry = matches[0][1]
+    result = {"status": "supported", "closest_url": entry['URL'], "closest_name": entry.get('Name', '')}
+    # Only present in a catalog generated from the OpenAPI schema
+    for key in ('Methods', 'Filters', 'Required'):
+        if entry.get(key):
+            result[key.lower()] = entry[key]
+    if len(matches) > 1:
+        result["alternatives"] = [{"url": e['URL'], "name": e.get('Name', '')} for _, e in matches[1:]]
+    return result
+
+
+def select_catalog_endpoints(env_var: str, defaults: List[str], file_path: str = None) -> List[str]:
+    """Resolve a comma-separated list of URLs or names in ``env_var`` against the catalog
+
+    Falls back to ``defaults``; entries missing from the catalog are skipped.
+    """
+    catalog = get_api_catalog(file_path)
+    requested = [e.strip() for e in os.getenv(env_var, '').split(',') if e.strip()]
+    endpoints = []
+    for entry in requested or defaults:
+        if entry.startswith('/'):
+            found = catalog.get(entry) if catalog.entries else {'URL': entry}
+        else:
+            found = catalog.by_name.get(entry.lower())
+        if found is None:
+            logger.warning(f"Skipping {env_var} entry not in the API catalog: {entry}")
+            continue
+        endpoints.append(endpoint_prefix(found['URL']))
+    return endpoints
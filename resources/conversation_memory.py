@@ -0,0 +1,233 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from token_estimator import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Tokens of verbatim recent turns kept in the prompt
+WINDOW_TOKENS = int(os.getenv('MEMORY_WINDOW_TOKENS', 1500))
+# Tokens of the rolling summary of older turns
+SUMMARY_TOKENS = int(os.getenv('MEMORY_SUMMARY_TOKENS', 300))
+# Conversations kept by the Slack store, and how long an idle one lives
+MAX_CONVERSATIONS = int(os.getenv('MEMORY_MAX_CONVERSATIONS', 500))
+IDLE_TTL = float(os.getenv('MEMORY_IDLE_TTL', 3600))
+# Once over the window, evict down to this share of it so summaries are batched
+EVICT_TO = 0.6
+# Characters of an evicted turn kept by the extractive summarizer
+EXTRACT_CHARS = 200
+
+SUMMARY_PROMPT = """Update the summary of a conversation between a user and a NetBox assistant.
+Keep object names, IDs, URLs, filters and anything the user may refer back to; drop pleasantries.
+Answer with the new summary only, in at most {words} words.
+
+Current summary:
+{summary}
+
+Turns to add:
+{turns}"""
+
+# (current summary, evicted "Role: content" lines) -> new summary
+Summarizer = Callable[[str, List[str]], str]
+
+
+class MemoryStats:
+    """Turns added, turns folded into summaries and the size of rendered histories"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.turns = 0
+        self.summarized_turns = 0
+        self.summaries = 0
+        self.summary_failures = 0
+        self.renders = 0
+        self.rendered_tokens = 0
+        self.unbounded_tokens = 0
+
+    def record_turn(self):
+        with self._lock:
+            self.turns += 1
+
+    def record_summary(self, turns: int, ok: bool):
+        with self._lock:
+            self.summarized_turns += turns
+            self.summaries += 1
+            self.summary_failures += int(not ok)
+
+    def record_render(self, tokens: int, unbounded: int):
+        with self._lock:
+            self.renders += 1
+            self.rendered_tokens += tokens
+            self.unbounded_tokens += unbounded
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'turns': self.turns,
+                'summarized_turns': self.summarized_turns,
+                'summaries': self.summaries,
+                'summary_failures': self.summary_failures,
+                'history_tokens_avg': round(self.rendered_tokens / self.renders) if self.renders else 0,
+                'history_tokens_avg_unbounded': round(self.unbounded_tokens / self.renders) if self.renders else 0,
+            }
+
+
+_stats = MemoryStats()
+
+
+def extractive_summarizer(summary: str, lines: List[str], max_tokens: int = SUMMARY_TOKENS) -> str:
+    """Summary without a model: the start of each evicted turn, oldest lines dropped past the budget"""
+    kept = [line for line in summary.split('\n') if line] if summary else []
+    kept += [line if len(line) <= EXTRACT_CHARS else line[:EXTRACT_CHARS] + '...' for line in lines]
+    while len(kept) > 1 and estimate_tokens('\n'.join(kept)) > max_tokens:
+        kept.pop(0)
+    return '\n'.join(kept)
+
+
+def llm_summarizer(llm, max_tokens: int = SUMMARY_TOKENS) -> Summarizer:
+    """Summarizer that asks ``llm`` to fold evicted turns into the summary"""
+    def summarize(summary: str, lines: List[str]) -> str:
+        prompt = SUMMARY_PROMPT.format(words=max_tokens * 3 // 4, summary=summary or '(none)',
+                                       turns='\n'.join(lines))
+        text = llm.invoke(prompt).content.strip()
+        # The model may overshoot; never let the summary outgrow its budget
+        return extractive_summarizer('', [text], max_tokens) if estimate_tokens(text) > max_tokens * 2 else text
+    return summarize
+
+
+class ConversationMemory:
+    """Token-bounded chat history: recent turns verbatim plus a rolling summary of older ones
+
+    Each turn is counted once when added. When the window exceeds
+    ``window_tokens``, the oldest turns are folded into the summary in one
+    batch; the rendered history is rebuilt only after a change.
+    """
+
+    def __init__(self, summarizer: Summarizer = None, window_tokens: int = WINDOW_TOKENS,
+                 summary_tokens: int = SUMMARY_TOKENS):
+        self.summarizer = summarizer or (lambda summary, lines: extractive_summarizer(summary, lines, summary_tokens))
+        self.window_tokens = window_tokens
+        self.summary_tokens = summary_tokens
+        self.summary = ''
+        self.turns: "deque[Tuple[str, int]]" = deque()
+        self.window_used = 0
+        self.total_tokens = 0
+        self.last_used = time.monotonic()
+        self._rendered: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.turns) + int(bool(self.summary))
+
+    def add(self, role: str, content: str):
+        line = f"{role.capitalize()}: {content}"
+        tokens = estimate_tokens(line)
+        with self._lock:
+            self.turns.append((line, tokens))
+            self.window_used += tokens
+            self.total_tokens += tokens
+            self.last_used = time.monotonic()
+            self._rendered = None
+            evicted = []
+            if self.window_used > self.window_tokens:
+                # Keep at least the latest turn verbatim, however long
+                while len(self.turns) > 1 and self.window_used > self.window_tokens * EVICT_TO:
+                    old, old_tokens = self.turns.popleft()
+                    self.window_used -= old_tokens
+                    evicted.append(old)
+        _stats.record_turn()
+        if evicted:
+            self._fold(evicted)
+
+    def add_exchange(self, question: str, answer: str):
+        self.add('user', question)
+        self.add('assistant', answer)
+
+    def _fold(self, lines: List[str]):
+        ok = True
+        try:
+            summary = self.summarizer(self.summary, lines)
+        except Exception as e:
+            logger.warning(f"Conversation summary failed, keeping an extract instead: {e}")
+            summary = extractive_summarizer(self.summary, lines, self.summary_tokens)
+            ok = False
+        with self._lock:
+            self.summary = summary
+            self._rendered = None
+        _stats.record_summary(len(lines), ok)
+
+    def render(self) -> str:
+        """Chat history for the prompt's {chat_history}"""
+        with self._lock:
+            if self._rendered is None:
+                parts = [f"Summary of the earlier conversation:\n{self.summary}"] if self.summary else []
+                parts += [line for line, _ in self.turns]
+                self._rendered = '\n'.join(parts)
+            rendered, unbounded = self._rendered, self.total_tokens
+        if rendered:
+            _stats.record_render(estimate_tokens(rendered), unbounded)
+        return rendered
+
+
+class MemoryStore:
+    """Per-conversation memories (e.g. one per Slack thread), LRU-bounded and expired when idle"""
+
+    def __init__(self, summarizer: Summarizer = None, max_conversations: int = MAX_CONVERSATIONS,
+                 idle_ttl: float = IDLE_TTL):
+        self.summarizer = summarizer
+        self.max_conversations = max_conversations
+        self.idle_ttl = idle_ttl
+        self._memories: "OrderedDict[str, ConversationMemory]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> ConversationMemory:
+        now = time.monotonic()
+        with self._lock:
+            memory = self._memories.get(key)
+            if memory is not None and now - memory.last_used > self.idle_ttl:
+                memory = None
+            if memory is None:
+                memory = ConversationMemory(self.summarizer)
+            self._memories[key] = memory
+            self._memories.move_to_end(key)
+            while len(self._memories) > self.max_conversations:
+                self._memories.popitem(last=False)
+            return memory
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._memories)
+
+
+def make_summarizer(llm=None) -> Optional[Summarizer]:
+    """MEMORY_SUMMARIZER: 'llm' (default, when a model is given) or 'extractive'"""
+    if llm is not None and os.getenv('MEMORY_SUMMARIZER', 'llm').lower() == 'llm':
+        return llm_summarizer(llm)
+    return None
+
+
+_store: Optional[MemoryStore] = None
+_store_lock = threading.Lock()
+
+
+def get_memory_store(llm=None) -> MemoryStore:
+    """Return the process-wide store; the first call with ``llm`` sets its summarizer"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = MemoryStore(make_summarizer(llm))
+        elif _store.summarizer is None and llm is not None:
+            _store.summarizer = make_summarizer(llm)
+        return _store
+
+
+def get_memory_stats() -> Dict[str, Any]:
+    """Return conversation memory statistics"""
+    stats = _stats.snapshot()
+    if _store is not None:
+        stats['conversations'] = len(_store)
+    return stats
@@ -0,0 +1,209 @@
+import json
+from string import Template
+from typing import Dict, Any, List
+
+# Endpoint of NetBox's read-only GraphQL API
+GRAPHQL_URL = '/graphql/'
+
+
+class GraphQLError(RuntimeError):
+    """Raised when NetBox answers a GraphQL query with an ``errors`` list"""
+
+    def __init__(self, errors: List[Dict[str, Any]]):
+        self.errors = errors
+        messages = '; '.join(str(e.get('message', e)) for e in errors) if errors else 'unknown error'
+        super().__init__(f"NetBox GraphQL error: {messages}")
+
+
+# Parameterized queries for questions that would otherwise take several REST
+# calls. Placeholders are ``$name`` and are substituted as GraphQL literals.
+# Filters follow the NetBox 4.x GraphQL schema.
+QUERY_TEMPLATES: Dict[str, Dict[str, Any]] = {
+    'site_devices_on_vlan': {
+        'description': 'Devices in a site with an interface carrying a VLAN (tagged or untagged)',
+        'params': ['site', 'vid'],
+        'query': """
+            {
+              interface_list(filters: {site: [$site], vlan: $vid}) {
+                name
+                mode
+                device { name role { name } }
+                untagged_vlan { vid name }
+                tagged_vlans { vid name }
+              }
+            }
+        """,
+    },
+    'site_devices': {
+        'description': 'Devices in a site with role, type, status and primary IP',
+        'params': ['site'],
+        'query': """
+            {
+              device_list(filters: {site: [$site]}) {
+                name
+                status
+                role { name }
+                device_type { model manufacturer { name } }
+                rack { name }
+                primary_ip4 { address }
+              }
+            }
+        """,
+    },
+    'device_interfaces': {
+        'description': 'Interfaces of a device with their VLANs and IP addresses',
+        'params': ['device'],
+        'query': """
+            {
+              device_list(filters: {name: [$device]}) {
+                name
+                site { name }
+                interfaces {
+                  name
+                  enabled
+                  mode
+                  untagged_vlan { vid name }
+                  tagged_vlans { vid name }
+                  ip_addresses { address }
+                }
+              }
+            }
+        """,
+    },
+    'ip_address_owner': {
+        'description': 'Which device and interface an IP address is assigned to',
+        'params': ['address'],
+        'query': """
+            {
+              ip_address_list(filters: {address: [$address]}) {
+                address
+                status
+                dns_name
+                vrf { name }
+                assigned_object {
+                  ... on InterfaceType { name device { name site { name } } }
+                  ... on VMInterfaceType { name virtual_machine { name } }
+                }
+              }
+            }
+        """,
+    },
+    'vlan_prefixes': {
+        'description': 'Prefixes bound to a VLAN ID with their VRF and status',
+        'params': ['vid'],
+        'query': """
+            {
+              prefix_list(filters: {vlan_vid: $vid}) {
+                prefix
+                status
+                vrf { name }
+                vlan { vid name }
+                tenant { name }
+              }
+            }
+        """,
+    },
+    'provider_circuits': {
+        'description': 'Circuits of a provider with their type and termination sites',
+        'params': ['provider'],
+        'query': """
+            {
+              circuit_list(filters: {provider: [$provider]}) {
+                cid
+                status
+                type { name }
+                tenant { name }
+                termination_a { termination { ... on SiteType { name } } }
+                termination_z { termination { ... on SiteType { name } } }
+              }
+            }
+        """,
+    },
+}
+
+
+def graphql_data(response) -> Dict[str, Any]:
+    """Return ``data`` from a requests or httpx GraphQL response, raising on errors"""
+    # Invalid queries come back as 400 with a GraphQL errors list
+    if response.status_code == 400:
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        if body.get('errors'):
+            raise GraphQLError(body['errors'])
+    response.raise_for_status()
+    body = response.json()
+    if body.get('errors'):
+        raise GraphQLError(body['errors'])
+    return body.get('data') or {}
+
+
+def render_template(name: str, variables: Dict[str, Any] = None) -> str:
+    """Fill a query template; values are encoded as GraphQL literals"""
+    template = QUERY_TEMPLATES.get(name)
+    if template is None:
+        raise ValueError(f"Unknown GraphQL template '{name}'. Available: {', '.join(QUERY_TEMPLATES)}")
+    variables = variables or {}
+    missing = [p for p in template['params'] if p not in variables]
+    if missing:
+        raise ValueError(f"Template '{name}' requires: {', '.join(missing)}")
+    # JSON strings and numbers are valid GraphQL literals and escape quotes safely
+    literals = {p: json.dumps(variables[p]) for p in template['params']}
+    return Template(template['query']).substitute(literals)
+
+
+def describe_templates() -> Dict[str, Dict[str, Any]]:
+    """Template names with their purpose and parameters, for the LLM"""
+    return {name: {'description': t['description'], 'params': t['params']} for name, t in QUERY_TEMPLATES.items()}
+
+
+def flatten_record(record: Any, prefix: str = '') -> Any:
+    """Flatten nested objects into dotted keys; nested lists stay lists of flat rows"""
+    if not isinstance(record, dict):
+        return record
+    flat: Dict[str, Any] = {}
+    for key, value in record.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_record(value, f"{name}."))
+        elif isinstance(value, list):
+            flat[name] = [flatten_record(v) for v in value]
+        elif value is not None:
+            flat[name] = value
+    return flat
+
+
+def flatten_graphql(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn a GraphQL ``data`` payload into ``{field: {"count": n, "results": [...]}}``"""
+    flattened = {}
+    for field, value in (data or {}).items():
+        if isinstance(value, list):
+            rows = [flatten_record(v) for v in value]
+            flattened[field] = {'count': len(rows), 'results': rows}
+        else:
+            flattened[field] = flatten_record(value)
+    return flattened
+
+
+def parse_graphql_input(tool_input: str) -> str:
+    """Parse graphql_netbox_tool input into a query string
+
+    Accepts ``{"template": name, "variables": {...}}``, ``{"query": "..."}`` or
+    a raw query.
+    """
+    text = (tool_input or '').strip()
+    try:
+        options = json.loads(text)
+    except ValueError:
+        # Not JSON: a raw GraphQL query such as '{ site_list { name } }'
+        options = None
+    if not isinstance(options, dict):
+        if not text:
+            raise ValueError("Provide a 'template' with 'variables' or a 'query'.")
+        return text
+    if options.get('template'):
+        return render_template(options['template'], options.get('variables'))
+    if options.get('query'):
+        return options['query']
+    raise ValueError("Provide a 'template' with 'variables' or a 'query'.")
@@ -0,0 +1,376 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+from collections import Counter
+from typing import Dict, Any, List, Optional, Callable
+from urllib.parse import urlencode
+
+from api_catalog import get_api_catalog
+from name_resolver import get_name_resolver, FIELD_ENDPOINTS
+
+logger = logging.getLogger(__name__)
+
+# Catalog similarity an object phrase needs before the fast path answers
+DEFAULT_MIN_SCORE = 0.85
+# Objects listed in a fast-path answer; the count always covers every match
+MAX_ROWS = 20
+
+_COUNT_HEAD = re.compile(r"^(?:how many|count(?: of)?|number of|total(?: number of)?)\s+(?:the\s+|all\s+)*")
+_LIST_HEAD = re.compile(r"^(?:show|list|get|display|find|fetch|give|what are|which are)(?:\s+me)?\s+(?:all\s+|the\s+|every\s+|of\s+)*")
+_POLITE = re.compile(r"^(?:please\s+|can you\s+|could you\s+|would you\s+)+")
+_TAIL = re.compile(r"\s+(?:are there|do we have|exist|are configured|please)$")
+_TOKEN = re.compile(r'"([^"]+)"|(\S+)')
+
+# Words that start a filter clause after the object phrase
+PREPOSITIONS = {'in', 'at', 'for', 'on', 'from', 'of', 'with', 'by', 'under', 'where'}
+NAME_WORDS = {'named', 'called'}
+# Fields a clause may filter on ("in site ams1", "for provider Zayo", "with status active")
+FILTER_FIELDS = {'site', 'region', 'location', 'rack', 'tenant', 'provider', 'device', 'role', 'platform',
+                 'manufacturer', 'cluster', 'vrf', 'status', 'type'}
+STATUS_VALUES = {'active', 'planned', 'staged', 'offline', 'failed', 'inventory', 'decommissioning',
+                 'reserved', 'deprecated', 'available', 'connected', 'container', 'dhcp', 'slaac',
+                 'provisioning', 'deprovisioning', 'decommissioned'}
+# Filler words left between the object and its clauses ("devices are there in site x")
+FILLERS = {'are', 'is', 'there', 'do', 'we', 'have', 'exist', 'currently', 'configured'}
+# Colloquial object names the catalog does not spell out
+ALIASES = {
+    'vms': 'virtual machines',
+    'ips': 'ip addresses',
+    'ip': 'ip addresses',
+    'addresses': 'ip addresses',
+    'switches': 'devices',
+    'routers': 'devices',
+    'subnets': 'prefixes',
+    'networks': 'prefixes',
+}
+# Reference filters that match what a user types: the slug, or the name for device. Others
+# match something else (vrf takes the RD) or do not exist (rack only has rack_id)
+TYPED_FILTERS = {'site', 'region', 'location', 'tenant', 'provider', 'role', 'platform', 'manufacturer', 'device'}
+# Keys tried, in order, for the label of a listed object
+LABEL_KEYS = ('name', 'display', 'cid', 'address', 'prefix', 'vid', 'model', 'id')
+
+
+class RouterStats:
+    """Fast-path hit rate and latency against the agent path"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routed = 0
+        self.fallbacks = Counter()
+        self.fast_seconds = 0.0
+        self.agent_calls = 0
+        self.agent_seconds = 0.0
+
+    def record_route(self, seconds: float):
+        with self._lock:
+            self.routed += 1
+            self.fast_seconds += seconds
+
+    def record_fallback(self, reason: str):
+        with self._lock:
+            self.fallbacks[reason] += 1
+
+    def record_agent(self, seconds: float):
+        with self._lock:
+            self.agent_calls += 1
+            self.agent_seconds += seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.routed + sum(self.fallbacks.values())
+            fast_ms = self.fast_seconds / self.routed * 1000 if self.routed else None
+            agent_ms = self.agent_seconds / self.agent_calls * 1000 if self.agent_calls else None
+            return {
+                'questions': total,
+                'fast_path': self.routed,
+                'hit_rate': round(self.routed / total, 3) if total else 0.0,
+                'fallbacks': dict(self.fallbacks),
+                'avg_fast_ms': round(fast_ms, 1) if fast_ms is not None else None,
+                'avg_agent_ms': round(agent_ms, 1) if agent_ms is not None else None,
+                'speedup': round(agent_ms / fast_ms, 1) if fast_ms and agent_ms else None,
+            }
+
+
+class NoRoute(Exception):
+    """A question the fast path will not answer; ``reason`` is counted in the stats"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class IntentRouter:
+    """Answers simple list and count questions without the LLM
+
+    A question is routed only when it parses completely as "<verb> <object>
+    [<filter clauses>]", the object matches a catalog entry with at least
+    ``min_score`` and every filter becomes an ID from the name resolver or a
+    parameter in the endpoint's OpenAPI filter list. Anything else is left to
+    the ReAct agent.
+    """
+
+    def __init__(self, min_score: float = DEFAULT_MIN_SCORE, max_rows: int = MAX_ROWS):
+        self.min_score = min_score
+        self.max_rows = max_rows
+        self.stats = RouterStats()
+
+    # ------------------------------------------------------------------
+    # Parsing
+    # ------------------------------------------------------------------
+
+    def parse(self, message: str) -> Dict[str, Any]:
+        """Split a question into intent, object phrase and filter clauses; raises NoRoute"""
+        text = ' '.join((message or '').split()).rstrip('?.! ')
+        lowered = _POLITE.sub('', text.lower())
+        text = text[len(text) - len(lowered):]
+        lowered = _TAIL.sub('', lowered)
+        text = text[:len(lowered)]
+
+        head = _COUNT_HEAD.match(lowered)
+        intent = 'count'
+        if head is None:
+            head = _LIST_HEAD.match(lowered)
+            intent = 'list'
+        if head is None:
+            raise NoRoute('no_intent')
+
+        tokens = [quoted or word for quoted, word in _TOKEN.findall(text[head.end():])]
+        words = [t.lower() for t in tokens]
+        position = 0
+        object_words = []
+        while position < len(words) and words[position] not in PREPOSITIONS | NAME_WORDS:
+            object_words.append(words[position])
+            position += 1
+
+        while object_words and object_words[-1] in FILLERS:
+            object_words.pop()
+
+        filters: Dict[str, str] = {}
+        # "active devices": a leading status is a filter, not part of the object
+        if len(object_words) > 1 and object_words[0] in STATUS_VALUES:
+            filters['status'] = object_words.pop(0)
+        if not object_words:
+            raise NoRoute('no_object')
+
+        while position < len(words):
+            word = words[position]
+            position += 1
+            if word == 'and':
+                continue
+            if word in NAME_WORDS:
+                field = 'name'
+            elif word in PREPOSITIONS:
+                if position < len(words) and words[position] == 'the':
+                    position += 1
+                if position >= len(words) or words[position] not in FILTER_FIELDS:
+                    raise NoRoute('unknown_clause')
+                field = words[position]
+                position += 1
+            else:
+                raise NoRoute('unknown_clause')
+            value = []
+            while position < len(words) and not self._clause_starts(words, position):
+                value.append(tokens[position])
+                position += 1
+            if not value or field in filters:
+                raise NoRoute('unknown_clause')
+            filters[field] = ' '.join(value)
+
+        return {'intent': intent, 'object': ' '.join(object_words), 'filters': filters}
+
+    @staticmethod
+    def _clause_starts(words: List[str], position: int) -> bool:
+        word = words[position]
+        if word in NAME_WORDS:
+            return True
+        if word == 'and':
+            position += 1
+            word = words[position] if position < len(words) else ''
+        if word not in PREPOSITIONS:
+            return False
+        following = words[position + 1:position + 3]
+        return bool(following) and (following[0] in FILTER_FIELDS or following[:1] == ['the'] and
+                                    following[1:] and following[1] in FILTER_FIELDS)
+
+    # ------------------------------------------------------------------
+    # Planning
+    # ------------------------------------------------------------------
+
+    def match_endpoint(self, phrase: str) -> Dict[str, Any]:
+        """Catalog entry for an object phrase such as "devices" or "ip addresses"; raises NoRoute"""
+        catalog = get_api_catalog()
+        phrase = ALIASES.get(phrase, phrase)
+        entry = catalog.by_name.get(phrase) or catalog.by_name.get(f"{phrase}s") or catalog.by_name.get(f"{phrase}es")
+        if entry is None:
+            matches = catalog.match(phrase, limit=1, cutoff=self.min_score)
+            if not matches:
+                raise NoRoute('low_score')
+            entry = matches[0][1]
+        if entry.get('Methods') and 'GET' not in entry['Methods']:
+            raise NoRoute('low_score')
+        return entry
+
+    @staticmethod
+    def _supports(entry: Dict[str, Any], field: str) -> bool:
+        """Whether an endpoint has a reference ``field`` the resolver can filter on as ``<field>_id``
+
+        Uses the OpenAPI filter list when the catalog has one; otherwise the
+        curated field profile, since NetBox has an ``_id`` filter for each FK field.
+        """
+        if entry.get('Filters'):
+            return f"{field}_id" in entry['Filters']
+        return field in entry.get('Fields', ())
+
+    def build_params(self, entry: Dict[str, Any], filters: Dict[str, str]) -> Dict[str, Any]:
+        """Turn filter clauses into NetBox query parameters; raises NoRoute
+
+        Only two kinds of parameter are sent: ``<field>_id`` from the name
+        resolver, and filters the endpoint's OpenAPI ``Filters`` list that take
+        the value as typed. NetBox silently ignores unknown filters and would
+        return every object, so anything else is left to the agent.
+        """
+        params: Dict[str, Any] = {}
+        known = set(entry.get('Filters') or ())
+        resolver = get_name_resolver()
+        for field, value in filters.items():
+            if field == 'name':
+                if not known & {'name', 'q'}:
+                    raise NoRoute('unsupported_filter')
+                params['name' if 'name' in known else 'q'] = value
+                continue
+            if field == 'status':
+                if 'status' not in known or value.lower() not in STATUS_VALUES:
+                    raise NoRoute('unsupported_filter')
+                params['status'] = value.lower()
+                continue
+            target = resolver.field_endpoint(entry['URL'], field) if resolver else FIELD_ENDPOINTS.get(field)
+            if resolver is not None and target in resolver.endpoints and self._supports(entry, field):
+                try:
+                    object_id = resolver.lookup(target, value)
+                except ValueError:
+                    raise NoRoute('ambiguous_name')
+                if object_id is None:
+                    raise NoRoute('unresolved_name')
+                params[f"{field}_id"] = object_id
+            elif field in TYPED_FILTERS and field in known and (field == 'device' or ' ' not in value):
+                # Slug filters (or the device name on component endpoints), assuming the user typed the slug
+                params[field] = value if field == 'device' else value.lower()
+            else:
+                raise NoRoute('unsupported_filter')
+        return params
+
+    def plan(self, message: str) -> Dict[str, Any]:
+        """Return the NetBox request answering ``message``; raises NoRoute"""
+        parsed = self.parse(message)
+        entry = self.match_endpoint(parsed['object'])
+        params = self.build_params(entry, parsed['filters'])
+        params['limit'] = 1 if parsed['intent'] == 'count' else self.max_rows
+        request: Dict[str, Any] = {'api_url': f"{entry['URL']}?{urlencode(params)}"}
+        if parsed['intent'] == 'count':
+            request['fields'] = ['id']
+        return dict(parsed, entry=entry, request=request)
+
+    # ------------------------------------------------------------------
+    # Answering
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _describe(plan: Dict[str, Any]) -> str:
+        name = plan['entry'].get('Name', plan['object']).lower()
+        clauses = [f"named {v}" if f == 'name' else f"with status {v}" if f == 'status' else f"in {f} {v}"
+                   for f, v in plan['filters'].items()]
+        return ' '.join([name] + clauses)
+
+    @staticmethod
+    def _row(item: Dict[str, Any]) -> str:
+        label_key = next((k for k in LABEL_KEYS if item.get(k) not in (None, '')), None)
+        label = item.get(label_key, '?')
+        details = []
+        for key, value in item.items():
+            if key in (label_key, 'id', 'display') or key.startswith('_'):
+                continue
+            if isinstance(value, dict):
+                value = value.get('name') or value.get('display') or value.get('vid') or value.get('id')
+            if value in (None, '') or isinstance(value, (list, dict)):
+                continue
+            details.append(f"{key}: {value}")
+            if len(details) == 4:
+                break
+        return f"• *{label}*" + (f" ({', '.join(details)})" if details else '')
+
+    def format_answer(self, plan: Dict[str, Any], data: Dict[str, Any]) -> str:
+        subject = self._describe(plan)
+        count = data.get('count', len(data.get('results', [])))
+        if plan['intent'] == 'count':
+            return f"There {'is' if count == 1 else 'are'} {count} {subject}."
+        results = data.get('results', [])
+        if not results:
+            return f"No {subject} found."
+        lines = [f"Found {count} {subject}:"] + [self._row(item) for item in results]
+        if count > len(results):
+            lines.append(f"... and {count - len(results)} more")
+        return '\n'.join(lines)
+
+    def answer(self, message: str, fetch: Callable[[str], Any]) -> Optional[str]:
+        """Answer ``message`` through ``fetch`` (the get tool), or return None to use the agent"""
+        start = time.perf_counter()
+        try:
+            plan = self.plan(message)
+        except NoRoute as e:
+            self.stats.record_fallback(e.reason)
+            return None
+        try:
+            data = fetch(json.dumps(plan['request']))
+        except Exception as e:
+            logger.warning(f"Fast path failed for {plan['request']['api_url']}: {e}")
+            data = {'error': str(e)}
+        if not isinstance(data, dict) or 'error' in data:
+            self.stats.record_fallback('netbox_error')
+            return None
+        answer = self.format_answer(plan, data)
+        self.stats.record_route(time.perf_counter() - start)
+        logger.info(f"Fast path answered '{message}' via {plan['request']['api_url']}")
+        return answer
+
+
+_router: Optional[IntentRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_intent_router() -> Optional[IntentRouter]:
+    """Return the process-wide router unless INTENT_ROUTER is disabled"""
+    global _router
+    if os.getenv('INTENT_ROUTER', 'true').lower() not in ('1', 'true', 'yes'):
+        return None
+    with _router_lock:
+        if _router is None:
+            _router = IntentRouter(
+                min_score=float(os.getenv('INTENT_ROUTER_MIN_SCORE', DEFAULT_MIN_SCORE)),
+                max_rows=int(os.getenv('INTENT_ROUTER_MAX_ROWS', MAX_ROWS)),
+            )
+        return _router
+
+
+def route_question(message: str, fetch: Callable[[str], Any]) -> Optional[str]:
+    """Fast-path answer for ``message``, or None when the agent should handle it"""
+    router = get_intent_router()
+    if router is None:
+        return None
+    return router.answer(message, fetch)
+
+
+def record_agent_latency(seconds: float):
+    """Count one question answered by the agent, for the fast-path comparison"""
+    router = get_intent_router()
+    if router is not None:
+        router.stats.record_agent(seconds)
+
+
+def get_router_stats() -> Dict[str, Any]:
+    """Return router statistics, if it exists"""
+    if _router is None:
+        return {}
+    return _router.stats.snapshot()
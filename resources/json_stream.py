@@ -0,0 +1,148 @@
+import re
+import json
+import codecs
+from typing import Dict, Any, List, Union
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# Parser states
+_START = 'start'
+_KEY = 'key'
+_COLON = 'colon'
+_VALUE = 'value'
+_AFTER_MEMBER = 'after_member'
+_ITEM = 'item'
+_AFTER_ITEM = 'after_item'
+_DONE = 'done'
+
+
+class _Incomplete(Exception):
+    """More input is needed before the next token can be decoded"""
+
+
+class ResultsStreamParser:
+    """Incremental decoder for NetBox list responses
+
+    Bytes are fed as they arrive from the socket and the objects of the
+    ``results`` array are returned one at a time, so peak memory is one object
+    plus the unread buffer rather than the whole body. The other top-level
+    members (``count``, ``next``, ``previous``) are collected into ``meta``.
+    A top-level array yields its elements; any other document (a detail object)
+    is returned whole from ``close()``.
+    """
+
+    def __init__(self, array_key: str = 'results', meta: Dict[str, Any] = None):
+        self.array_key = array_key
+        self.meta = meta if meta is not None else {}
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._buf = ''
+        self._pos = 0
+        self._state = _START
+        self._key = None
+        self._saw_array = False
+        self._top_array = False
+        self._closed = False
+
+    def feed(self, chunk: Union[bytes, str]) -> List[Any]:
+        """Add a chunk of the body and return the objects completed by it"""
+        self._buf += self._text.decode(chunk) if isinstance(chunk, bytes) else chunk
+        items = self._parse()
+        # Drop consumed input so the buffer never holds more than the current object
+        self._buf = self._buf[self._pos:]
+        self._pos = 0
+        return items
+
+    def close(self) -> List[Any]:
+        """Signal the end of the body and return any remaining objects"""
+        self._buf += self._text.decode(b'', final=True)
+        self._closed = True
+        items = self._parse()
+        if self._state != _DONE or self._buf[self._pos:].strip():
+            raise ValueError("Truncated or invalid JSON response from NetBox")
+        if not self._saw_array and not self._top_array:
+            # Not a list response: hand back the whole object, not as list metadata
+            items.append(dict(self.meta))
+            self.meta.clear()
+        return items
+
+    def _peek(self) -> str:
+        self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+        if self._pos >= len(self._buf):
+            raise _Incomplete()
+        return self._buf[self._pos]
+
+    def _decode(self) -> Any:
+        try:
+            value, end = self._decoder.raw_decode(self._buf, self._pos)
+        except json.JSONDecodeError:
+            if self._closed:
+                raise ValueError("Invalid JSON response from NetBox")
+            raise _Incomplete()
+        # A number at the very end of the buffer may continue in the next chunk
+        if end >= len(self._buf) and not self._closed:
+            raise _Incomplete()
+        self._pos = end
+        return value
+
+    def _expect(self, char: str, expected: str):
+        if char not in expected:
+            raise ValueError(f"Unexpected {char!r} at offset {self._pos} in NetBox response")
+        self._pos += 1
+
+    def _parse(self) -> List[Any]:
+        items = []
+        try:
+            while self._state != _DONE:
+                char = self._peek()
+                if self._state == _START:
+                    if char == '{':
+                        self._pos += 1
+                        self._state = _KEY
+                    elif char == '[':
+                        self._pos += 1
+                        self._top_array = True
+                        self._state = _ITEM
+                    else:
+                        items.append(self._decode())
+                        self._top_array = True
+                        self._state = _DONE
+                elif self._state == _KEY:
+                    if char == '}':
+                        self._pos += 1
+                        self._state = _DONE
+                    else:
+                        if char != '"':
+                            self._expect(char, '}"')
+                        self._key = self._decode()
+                        self._state = _COLON
+                elif self._state == _COLON:
+                    self._expect(char, ':')
+                    self._state = _VALUE
+                elif self._state == _VALUE:
+                    if self._key == self.array_key and char == '[':
+                        self._pos += 1
+                        self._saw_array = True
+                        self._state = _ITEM
+                    else:
+                        self.meta[self._key] = self._decode()
+                        self._state = _AFTER_MEMBER
+                elif self._state == _AFTER_MEMBER:
+                    self._expect(char, ',}')
+                    self._state = _KEY if char == ',' else _DONE
+                elif self._state == _ITEM:
+                    if char == ']':
+                        self._pos += 1
+                        self._state = _DONE if self._top_array else _AFTER_MEMBER
+                    else:
+                        items.append(self._decode())
+                        self._state = _AFTER_ITEM
+                elif self._state == _AFTER_ITEM:
+                    self._expect(char, ',]')
+                    if char == ',':
+                        self._state = _ITEM
+                    else:
+                        self._state = _DONE if self._top_array else _AFTER_MEMBER
+        except _Incomplete:
+            pass
+        return items
@@ -0,0 +1,150 @@
+import os
+import re
+import time
+import logging
+from collections import Counter
+from typing import Any, List, Optional, Tuple
+
+from token_estimator import to_text
+from observation_compactor import current_meter
+
+logger = logging.getLogger(__name__)
+
+# Identical tool calls (same tool and input) allowed in one run
+MAX_REPEATS = int(os.getenv('LOOP_MAX_REPEATS', 1))
+# Turns alternating between the same two kinds of tool call, without new calls or new data, before the
+# run counts as oscillating
+OSCILLATION_TURNS = int(os.getenv('LOOP_OSCILLATION_TURNS', 4))
+# Consecutive turns with only empty, failed or already-seen observations
+NO_PROGRESS_TURNS = int(os.getenv('LOOP_NO_PROGRESS_TURNS', 3))
+# Consecutive unparseable model outputs (ReAct format errors)
+PARSE_ERROR_TURNS = int(os.getenv('LOOP_PARSE_ERROR_TURNS', 2))
+# Per-request budgets; 0 disables. Tokens are the estimated prompt tokens of all model calls
+TIME_BUDGET = float(os.getenv('AGENT_TIME_BUDGET', 90))
+TOKEN_BUDGET = int(os.getenv('AGENT_TOKEN_BUDGET', 40000))
+# Characters of a raw observation quoted in an early-stop answer
+ANSWER_CHARS = 1500
+
+STOP_MESSAGES = {
+    'repeat': "I was repeating the same lookup",
+    'oscillation': "I was going back and forth between the same tools",
+    'no_progress': "my last lookups returned nothing new",
+    'parse_errors': "I could not produce a well-formed next step",
+    'time_budget': "this request ran out of its time budget",
+    'token_budget': "this request ran out of its token budget",
+}
+_SPACES = re.compile(r'\s+')
+
+# (AgentAction, observation) as in AgentExecutor's intermediate steps
+Step = Tuple[Any, Any]
+
+
+def loop_guard_enabled() -> bool:
+    """LOOP_GUARD: stop agent runs that loop, stall or exceed their budgets"""
+    return os.getenv('LOOP_GUARD', 'true').lower() in ('1', 'true', 'yes')
+
+
+def _signature(action) -> Tuple[str, str]:
+    return action.tool, _SPACES.sub(' ', to_text(action.tool_input)).strip().lower()
+
+
+def _is_empty(observation: Any) -> bool:
+    if observation is None or observation == '' or observation == [] or observation == {}:
+        return True
+    if isinstance(observation, dict):
+        if observation.get('error') or observation.get('errors'):
+            return True
+        if observation.get('count') == 0 or observation.get('results') == []:
+            return True
+    return isinstance(observation, str) and observation.lower().startswith(('error', 'failed'))
+
+
+class RunGuard:
+    """Watches the turns of one agent run and names the reason to stop it early, if any
+
+    ``check()`` takes the steps of each turn as the executor completes it. A
+    run stops when it repeats an identical tool call, alternates between the
+    same two kinds of turn without new calls or new data, goes ``NO_PROGRESS_TURNS`` turns without a new
+    non-empty observation, keeps failing to parse, or exceeds the request's
+    time or token budget. Budgets count from the start of the request's
+    ``measure_conversation()`` when there is one.
+    """
+
+    def __init__(self, time_budget: float = TIME_BUDGET, token_budget: int = TOKEN_BUDGET):
+        meter = current_meter()
+        self.started = meter.started if meter is not None else time.perf_counter()
+        self.time_budget = time_budget
+        self.token_budget = token_budget
+        self.calls: Counter = Counter()
+        self.seen = set()
+        self.turn_kinds: List[frozenset] = []
+        # Per turn: whether it only repeated earlier calls or found nothing new
+        self.turn_stale: List[bool] = []
+        self.stalled_turns = 0
+        self.parse_error_turns = 0
+        self.best: Optional[Step] = None
+        self.stop_reason: Optional[str] = None
+
+    def check(self, steps: List[Step]) -> Optional[str]:
+        """Record one turn; returns the stop reason, or None to carry on"""
+        actions = [(action, observation) for action, observation in steps if action.tool != '_Exception']
+        self.parse_error_turns = 0 if actions else self.parse_error_turns + 1
+        progress = False
+        repeated = False
+        seen_call = False
+        for action, observation in actions:
+            signature = _signature(action)
+            self.calls[signature] += 1
+            repeated = repeated or self.calls[signature] > MAX_REPEATS
+            seen_call = seen_call or self.calls[signature] > 1
+            fingerprint = to_text(observation)
+            if fingerprint not in self.seen and not _is_empty(observation):
+                progress = True
+                self.best = (action, observation)
+            self.seen.add(fingerprint)
+        if actions:
+            self.stalled_turns = 0 if progress else self.stalled_turns + 1
+            self.turn_kinds.append(frozenset(action.tool for action, _ in actions))
+            self.turn_stale.append(seen_call or not progress)
+        self.stop_reason = self._reason(repeated)
+        return self.stop_reason
+
+    def _oscillating(self) -> bool:
+        recent = self.turn_kinds[-OSCILLATION_TURNS:]
+        if OSCILLATION_TURNS < 2 or len(recent) < OSCILLATION_TURNS or recent[0] == recent[1]:
+            return False
+        # Alternating tools is normal (check a URL, fetch it, check the next); it is a loop
+        # only when the turns after the first pair bring neither new calls nor new data
+        stale = self.turn_stale[-OSCILLATION_TURNS:][2:]
+        return all(kind == recent[i % 2] for i, kind in enumerate(recent)) and all(stale)
+
+    def _reason(self, repeated: bool) -> Optional[str]:
+        if repeated:
+            return 'repeat'
+        if self._oscillating():
+            return 'oscillation'
+        if self.stalled_turns >= NO_PROGRESS_TURNS:
+            return 'no_progress'
+        if self.parse_error_turns >= PARSE_ERROR_TURNS:
+            return 'parse_errors'
+        if self.time_budget and time.perf_counter() - self.started > self.time_budget:
+            return 'time_budget'
+        meter = current_meter()
+        if self.token_budget and meter is not None and meter.prompt_tokens > self.token_budget:
+            return 'token_budget'
+        return None
+
+    def answer(self) -> str:
+        """Best available answer for a stopped run: the reason and the most recent useful observation"""
+        text = f"I stopped early because {STOP_MESSAGES.get(self.stop_reason, 'the run was not converging')}."
+        if self.best is None:
+            return text + " Please rephrase the question or name the exact object or API endpoint."
+        action, observation = self.best
+        text += f" The most relevant result I found ({action.tool}: {to_text(action.tool_input)}):\n"
+        if isinstance(observation, dict) and observation.get('result_id'):
+            # Compacted results are shown in full by expand_results
+            return text + f"[result:{observation['result_id']}]"
+        shown = to_text(observation)
+        if len(shown) > ANSWER_CHARS:
+            shown = shown[:ANSWER_CHARS] + '...'
+        return text + f"```\n{shown}\n```"
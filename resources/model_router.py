@@ -0,0 +1,306 @@
+import os
+import re
+import time
+import logging
+import threading
+from collections import Counter, deque
+from typing import Dict, Any, List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from agent_factory import STOPPED_OUTPUT, build_agent_executor
+from agent_metrics import prompt_tokens, token_counts
+from model_tiers import TIERS, tier_model
+
+logger = logging.getLogger(__name__)
+
+# USD per million (prompt, completion) tokens; MODEL_<TIER>_PRICE="prompt,completion" overrides
+PRICES = {
+    'gpt-4o': (2.50, 10.00),
+    'gpt-4o-mini': (0.15, 0.60),
+    'gpt-4.1': (2.00, 8.00),
+    'gpt-4.1-mini': (0.40, 1.60),
+    'gpt-3.5-turbo': (0.50, 1.50),
+}
+# Tools the fast tier never gets: a write must not run twice if the request escalates
+WRITE_TOOLS = {'create_netbox_data_tool', 'delete_netbox_data_tool'}
+# Largest request the fast tier takes: named objects and words
+FAST_MAX_ENTITIES = int(os.getenv('MODEL_FAST_MAX_ENTITIES', 2))
+FAST_MAX_WORDS = int(os.getenv('MODEL_FAST_MAX_WORDS', 20))
+# Model calls a fast run gets before it escalates
+FAST_MAX_ITERATIONS = int(os.getenv('MODEL_FAST_MAX_ITERATIONS', 4))
+# Recent runs per tier kept for the latency percentiles
+LATENCY_WINDOW = 500
+
+_WRITE = re.compile(r"\b(?:create|add|delete|remove|update|change|modify|edit|rename|assign|unassign|set|"
+                    r"provision|decommission|reserve|allocate|move)\b", re.I)
+_COMPLEX = re.compile(r"\b(?:compare|comparison|versus|vs|why|explain|summari[sz]e|each|per|across|between|"
+                      r"relationship|related|along with|together with|and their|without|unused|missing|"
+                      r"differ|difference|audit|recommend|plan|troubleshoot|trace|path)\b", re.I)
+# Quoted names, anything with a digit (hosts, sites, IPs, VLAN IDs) and hyphenated names
+_ENTITY = re.compile(r'"[^"]+"|\'[^\']+\'|[\w.:/-]*\d[\w.:/-]*|\b[a-z]+(?:-[a-z0-9]+)+\b', re.I)
+# Early stops worth a retry on the strong model; an exhausted budget is not
+LOOP_STOPS = {'repeat', 'oscillation', 'no_progress', 'parse_errors'}
+
+
+def classify_request(question: str) -> Dict[str, Any]:
+    """Read/write, complexity and named objects of a request, and the tier that should answer it"""
+    entities = {match.strip('"\'').lower() for match in _ENTITY.findall(question)}
+    profile = {
+        'write': bool(_WRITE.search(question)),
+        'complex': bool(_COMPLEX.search(question)),
+        'entities': len(entities),
+        'words': len(question.split()),
+    }
+    if profile['write']:
+        reason = 'write'
+    elif profile['complex']:
+        reason = 'complex'
+    elif profile['entities'] > FAST_MAX_ENTITIES:
+        reason = 'entities'
+    elif profile['words'] > FAST_MAX_WORDS:
+        reason = 'long'
+    else:
+        reason = 'simple'
+    profile['reason'] = reason
+    profile['tier'] = 'fast' if reason == 'simple' else 'strong'
+    return profile
+
+
+def tiering_enabled() -> bool:
+    """MODEL_TIERING: answer simple read requests with the fast model first"""
+    return os.getenv('MODEL_TIERING', 'true').lower() in ('1', 'true', 'yes')
+
+
+def tier_price(tier: str) -> Tuple[float, float]:
+    override = os.getenv(f"MODEL_{tier.upper()}_PRICE")
+    if override:
+        prompt, _, completion = override.partition(',')
+        return float(prompt), float(completion or prompt)
+    return PRICES.get(tier_model(tier), (0.0, 0.0))
+
+
+class TierStats:
+    """Requests, latency, tokens, cost and escalations per model tier"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.classified = Counter()
+        self.requests = Counter()
+        self.seconds = {tier: deque(maxlen=LATENCY_WINDOW) for tier in TIERS}
+        self.prompt_tokens = Counter()
+        self.completion_tokens = Counter()
+        self.cost = Counter()
+        self.escalations = Counter()
+
+    def record_classified(self, reason: str):
+        with self._lock:
+            self.classified[reason] += 1
+
+    def record_run(self, tier: str, seconds: float, prompt: int, completion: int):
+        price_prompt, price_completion = tier_price(tier)
+        with self._lock:
+            self.requests[tier] += 1
+            self.seconds[tier].append(seconds)
+            self.prompt_tokens[tier] += prompt
+            self.completion_tokens[tier] += completion
+            self.cost[tier] += (prompt * price_prompt + completion * price_completion) / 1_000_000
+
+    def record_escalation(self, reason: str):
+        with self._lock:
+            self.escalations[reason] += 1
+
+    @staticmethod
+    def _percentile(values: List[float], fraction: float) -> float:
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000, 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            tiers = {}
+            for tier in TIERS:
+                seconds = list(self.seconds[tier])
+                tiers[tier] = {
+                    'model': tier_model(tier),
+                    'runs': self.requests[tier],
+                    'latency_p50_ms': self._percentile(seconds, 0.5),
+                    'latency_p95_ms': self._percentile(seconds, 0.95),
+                    'prompt_tokens': self.prompt_tokens[tier],
+                    'completion_tokens': self.completion_tokens[tier],
+                    'cost_usd': round(self.cost[tier], 4),
+                }
+            escalations = sum(self.escalations.values())
+            return {
+                'tiers': tiers,
+                'classified': dict(self.classified),
+                'escalations': escalations,
+                'escalation_rate': round(escalations / self.requests['fast'], 3) if self.requests['fast'] else 0.0,
+                'escalation_reasons': dict(self.escalations),
+            }
+
+
+_stats = TierStats()
+
+
+class Escalate(Exception):
+    """A fast-tier run that should be retried on the strong model; ``reason`` is counted in the stats"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class _TierUsage(BaseCallbackHandler):
+    """Prompt and completion tokens of one tier run"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._prompts: Dict[Any, int] = {}
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        with self._lock:
+            self._prompts[run_id] = prompt_tokens(prompts)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        with self._lock:
+            self._prompts[run_id] = prompt_tokens(messages=messages)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            estimated = self._prompts.pop(run_id, 0)
+        prompt, completion = token_counts(response, estimated)
+        with self._lock:
+            self.prompt_tokens += prompt
+            self.completion_tokens += completion
+
+
+class _EscalationWatch(BaseCallbackHandler):
+    """Stops a fast-tier run at its first unparseable output or unknown tool"""
+
+    raise_error = True
+
+    def __init__(self, tool_names: List[str]):
+        self.tool_names = set(tool_names)
+
+    def on_agent_action(self, action, **kwargs):
+        if action.tool == '_Exception':
+            raise Escalate('parse_error')
+        if action.tool not in self.tool_names:
+            raise Escalate('invalid_tool')
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        # The async executor reports parse errors only as a run of the '_Exception' tool
+        if (serialized or {}).get('name') == '_Exception':
+            raise Escalate('parse_error')
+
+
+def _with_callbacks(config: Optional[Dict[str, Any]], callbacks: List[Any]) -> Dict[str, Any]:
+    config = dict(config or {})
+    config['callbacks'] = list(config.get('callbacks') or []) + callbacks
+    return config
+
+
+def _failure(response: Dict[str, Any]) -> Optional[str]:
+    output = str(response.get('output') or '').strip()
+    if not output or output.startswith(STOPPED_OUTPUT):
+        return 'no_final_answer'
+    if response.get('stop_reason') in LOOP_STOPS:
+        return response['stop_reason']
+    return None
+
+
+class TieredAgent:
+    """Runs each request on the fast or the strong agent executor
+
+    Simple read requests (see ``classify_request``) go to the fast model
+    with the read-only tools and a short iteration limit. A fast run that
+    produces unparseable output, calls a tool it does not have, raises,
+    loops or ends without a final answer is retried from scratch on the
+    strong model. ``invoke``/``ainvoke`` take the same inputs and config as the
+    executors.
+    """
+
+    def __init__(self, strong, fast=None, fast_tool_names: List[str] = ()):
+        self.strong = strong
+        self.fast = fast
+        self.fast_tool_names = list(fast_tool_names)
+
+    def _tier(self, inputs: Dict[str, Any]) -> str:
+        if self.fast is None:
+            return 'strong'
+        profile = classify_request(str(inputs.get('input', '')))
+        _stats.record_classified(profile['reason'])
+        return profile['tier']
+
+    def _record(self, tier: str, started: float, usage: _TierUsage):
+        _stats.record_run(tier, time.perf_counter() - started, usage.prompt_tokens, usage.completion_tokens)
+
+    def _escalate(self, reason: str):
+        _stats.record_escalation(reason)
+        logger.info(f"Escalating from {tier_model('fast')} to {tier_model('strong')}: {reason}")
+
+    def invoke(self, inputs: Dict[str, Any], config: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        if self._tier(inputs) == 'fast':
+            usage, started = _TierUsage(), time.perf_counter()
+            try:
+                response = self.fast.invoke(
+                    inputs, _with_callbacks(config, [usage, _EscalationWatch(self.fast_tool_names)]), **kwargs)
+                reason = _failure(response)
+            except Escalate as e:
+                reason = e.reason
+            except Exception as e:
+                logger.warning(f"Fast model run failed: {e}")
+                reason = 'error'
+            self._record('fast', started, usage)
+            if reason is None:
+                return response
+            self._escalate(reason)
+        usage, started = _TierUsage(), time.perf_counter()
+        try:
+            return self.strong.invoke(inputs, _with_callbacks(config, [usage]), **kwargs)
+        finally:
+            self._record('strong', started, usage)
+
+    async def ainvoke(self, inputs: Dict[str, Any], config: Optional[Dict[str, Any]] = None,
+                      **kwargs) -> Dict[str, Any]:
+        if self._tier(inputs) == 'fast':
+            usage, started = _TierUsage(), time.perf_counter()
+            try:
+                response = await self.fast.ainvoke(
+                    inputs, _with_callbacks(config, [usage, _EscalationWatch(self.fast_tool_names)]), **kwargs)
+                reason = _failure(response)
+            except Escalate as e:
+                reason = e.reason
+            except Exception as e:
+                logger.warning(f"Fast model run failed: {e}")
+                reason = 'error'
+            self._record('fast', started, usage)
+            if reason is None:
+                return response
+            self._escalate(reason)
+        usage, started = _TierUsage(), time.perf_counter()
+        try:
+            return await self.strong.ainvoke(inputs, _with_callbacks(config, [usage]), **kwargs)
+        finally:
+            self._record('strong', started, usage)
+
+
+def build_tiered_agent(llm, fast_llm, tools: List[Any], instructions: str, mode: str = None,
+                       verbose: bool = True) -> TieredAgent:
+    """Strong executor for ``llm`` plus, with ``fast_llm``, a read-only fast executor tried first"""
+    strong = build_agent_executor(llm, tools, instructions, mode=mode, verbose=verbose)
+    if fast_llm is None:
+        return TieredAgent(strong)
+    fast_tools = [t for t in tools if t.name not in WRITE_TOOLS]
+    fast = build_agent_executor(fast_llm, fast_tools, instructions, mode=mode, verbose=verbose,
+                                max_iterations=FAST_MAX_ITERATIONS)
+    return TieredAgent(strong, fast, [t.name for t in fast_tools])
+
+
+def get_model_tier_stats() -> Dict[str, Any]:
+    """Return per-tier latency, token, cost and escalation statistics"""
+    return _stats.snapshot() if _stats.requests else {}
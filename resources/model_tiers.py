@@ -0,0 +1,10 @@
+import os
+
+# Kept free of LangChain imports so the standalone bot can pick its model without the agent stack
+TIERS = ('fast', 'strong')
+DEFAULT_MODELS = {'fast': 'gpt-4o-mini', 'strong': 'gpt-4o'}
+
+
+def tier_model(tier: str) -> str:
+    """MODEL_FAST / MODEL_STRONG: the model name of a tier"""
+    return os.getenv(f"MODEL_{tier.upper()}", DEFAULT_MODELS[tier])
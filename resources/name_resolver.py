@@ -0,0 +1,282 @@
+import os
+import time
+import logging
+import threading
+from typing import Dict, Any, List, Optional
+
+from netbox_client import NetBoxController, add_write_listener, remove_write_listener
+from api_catalog import select_catalog_endpoints
+from response_cache import endpoint_prefix
+
+logger = logging.getLogger(__name__)
+
+# Reference endpoints indexed when RESOLVER_ENDPOINTS is not set
+DEFAULT_RESOLVER_ENDPOINTS = [
+    '/api/dcim/sites/',
+    '/api/dcim/regions/',
+    '/api/dcim/site-groups/',
+    '/api/dcim/locations/',
+    '/api/dcim/manufacturers/',
+    '/api/dcim/device-types/',
+    '/api/dcim/device-roles/',
+    '/api/dcim/platforms/',
+    '/api/dcim/rack-roles/',
+    '/api/tenancy/tenants/',
+    '/api/tenancy/tenant-groups/',
+    '/api/tenancy/contact-roles/',
+    '/api/tenancy/contact-groups/',
+    '/api/circuits/providers/',
+    '/api/circuits/circuit-types/',
+    '/api/ipam/rirs/',
+    '/api/ipam/roles/',
+    '/api/ipam/vrfs/',
+    '/api/ipam/vlan-groups/',
+    '/api/virtualization/cluster-types/',
+    '/api/virtualization/cluster-groups/',
+    '/api/virtualization/clusters/',
+]
+
+# Payload fields that reference another object, by the endpoint they point to
+FIELD_ENDPOINTS = {
+    'site': '/api/dcim/sites/',
+    'region': '/api/dcim/regions/',
+    'location': '/api/dcim/locations/',
+    'manufacturer': '/api/dcim/manufacturers/',
+    'device_type': '/api/dcim/device-types/',
+    'role': '/api/dcim/device-roles/',
+    'platform': '/api/dcim/platforms/',
+    'tenant': '/api/tenancy/tenants/',
+    'tenant_group': '/api/tenancy/tenant-groups/',
+    'provider': '/api/circuits/providers/',
+    'rir': '/api/ipam/rirs/',
+    'vrf': '/api/ipam/vrfs/',
+    'cluster': '/api/virtualization/clusters/',
+}
+
+# Fields whose target depends on the endpoint being written to
+FIELD_OVERRIDES = {
+    '/api/dcim/sites/': {'group': '/api/dcim/site-groups/'},
+    '/api/dcim/racks/': {'role': '/api/dcim/rack-roles/'},
+    '/api/dcim/regions/': {'parent': '/api/dcim/regions/'},
+    '/api/dcim/site-groups/': {'parent': '/api/dcim/site-groups/'},
+    '/api/dcim/locations/': {'parent': '/api/dcim/locations/'},
+    '/api/ipam/prefixes/': {'role': '/api/ipam/roles/'},
+    '/api/ipam/ip-ranges/': {'role': '/api/ipam/roles/'},
+    '/api/ipam/vlans/': {'role': '/api/ipam/roles/', 'group': '/api/ipam/vlan-groups/'},
+    '/api/tenancy/tenants/': {'group': '/api/tenancy/tenant-groups/'},
+    '/api/tenancy/contacts/': {'group': '/api/tenancy/contact-groups/'},
+    '/api/tenancy/contact-assignments/': {'role': '/api/tenancy/contact-roles/'},
+    '/api/circuits/circuits/': {'type': '/api/circuits/circuit-types/'},
+    '/api/virtualization/clusters/': {'type': '/api/virtualization/cluster-types/',
+                                      'group': '/api/virtualization/cluster-groups/'},
+}
+
+# Object attributes indexed as lookup keys
+KEY_ATTRIBUTES = ('name', 'slug', 'model', 'display')
+
+# Marks a key shared by several objects (e.g. two locations named "Row A")
+AMBIGUOUS = -1
+
+
+def load_resolver_endpoints(file_path: str = None) -> List[str]:
+    """Resolve RESOLVER_ENDPOINTS (URLs or names) against netbox_apis.json"""
+    return select_catalog_endpoints('RESOLVER_ENDPOINTS', DEFAULT_RESOLVER_ENDPOINTS, file_path)
+
+
+class NameResolver:
+    """In-memory name/slug to ID index for reference endpoints
+
+    Each endpoint is loaded with one ``?brief=1`` pass, refreshed in the
+    background and dropped whenever a controller writes to it, so the write
+    tools can accept ``"site": "dc1"`` without a lookup GET per field.
+    """
+
+    def __init__(self, controller: NetBoxController, endpoints: List[str] = None,
+                 miss_refresh_interval: float = 30):
+        self.controller = controller
+        self.endpoints = endpoints or load_resolver_endpoints()
+        # A miss reloads its endpoint at most this often, in case the object is new
+        self.miss_refresh_interval = miss_refresh_interval
+        self._indexes: Dict[str, Dict[str, int]] = {}
+        self._loaded_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {'hits': 0, 'misses': 0, 'refreshes': 0, 'invalidations': 0}
+        add_write_listener(self.invalidate)
+
+    # ------------------------------------------------------------------
+    # Index maintenance
+    # ------------------------------------------------------------------
+
+    def refresh(self, endpoint: str):
+        """Reload one endpoint's index from NetBox"""
+        index: Dict[str, int] = {}
+        for obj in self.controller.iter_api(endpoint, params={'brief': 1}, page_size=1000):
+            keys = {str(obj[attr]).strip().lower() for attr in KEY_ATTRIBUTES if obj.get(attr)}
+            for key in keys:
+                index[key] = obj['id'] if index.get(key, obj['id']) == obj['id'] else AMBIGUOUS
+        with self._lock:
+            self._indexes[endpoint] = index
+            self._loaded_at[endpoint] = time.monotonic()
+            self.stats['refreshes'] += 1
+
+    def refresh_all(self):
+        for endpoint in self.endpoints:
+            try:
+                self.refresh(endpoint)
+            except Exception as e:
+                logger.error(f"Name index refresh of {endpoint} failed: {e}")
+
+    def invalidate(self, api_url: str):
+        """Drop the index of the endpoint a write touched; it reloads on next use"""
+        endpoint = endpoint_prefix(api_url)
+        with self._lock:
+            if self._indexes.pop(endpoint, None) is not None:
+                self.stats['invalidations'] += 1
+
+    def start_background_refresh(self, interval: float = 300):
+        """Warm every index, then refresh every ``interval`` seconds on a daemon thread"""
+        if self._thread is not None:
+            return
+
+        def run():
+            while not self._stop.is_set():
+                self.refresh_all()
+                self._stop.wait(interval)
+
+        self._thread = threading.Thread(target=run, name='netbox-name-resolver', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        remove_write_listener(self.invalidate)
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def lookup(self, endpoint: str, name: str) -> Optional[int]:
+        """Return the ID for a name or slug, or None if unknown
+
+        Raises ValueError when several objects share the name or the endpoint
+        is not indexed.
+        """
+        endpoint = endpoint_prefix(endpoint)
+        if endpoint not in self.endpoints:
+            raise ValueError(f"Names are not indexed for {endpoint}; use the numeric ID")
+        key = name.strip().lower()
+        with self._lock:
+            index = self._indexes.get(endpoint)
+            loaded_at = self._loaded_at.get(endpoint, 0)
+        if index is None or (key not in index and time.monotonic() - loaded_at >= self.miss_refresh_interval):
+            self.refresh(endpoint)
+            with self._lock:
+                index = self._indexes.get(endpoint, {})
+        object_id = index.get(key)
+        with self._lock:
+            self.stats['hits' if object_id is not None else 'misses'] += 1
+        if object_id == AMBIGUOUS:
+            raise ValueError(f"'{name}' matches several objects in {endpoint}; use the numeric ID")
+        return object_id
+
+    def field_endpoint(self, api_url: str, field: str) -> Optional[str]:
+        """Endpoint a payload field refers to when writing to ``api_url``"""
+        overrides = FIELD_OVERRIDES.get(endpoint_prefix(api_url), {})
+        return overrides.get(field) or FIELD_ENDPOINTS.get(field)
+
+    def resolve_payload(self, api_url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Replace names in reference fields with IDs
+
+        Numbers, numeric strings and nested objects are passed through. Raises
+        ValueError listing every name that could not be resolved.
+        """
+        resolved = dict(payload)
+        unresolved = []
+        for field, value in payload.items():
+            target = self.field_endpoint(api_url, field)
+            if target not in self.endpoints or not isinstance(value, str):
+                continue
+            if value.strip().isdigit():
+                resolved[field] = int(value)
+                continue
+            object_id = self.lookup(target, value)
+            if object_id is None:
+                unresolved.append(f"{field}='{value}' ({target})")
+            else:
+                resolved[field] = object_id
+        if unresolved:
+            raise ValueError(f"Could not resolve: {', '.join(unresolved)}")
+        return resolved
+
+    def resolve_ids(self, api_url: str, ids: List[Any]) -> List[int]:
+        """Turn a mix of IDs and names of objects at ``api_url`` into IDs"""
+        endpoint = endpoint_prefix(api_url)
+        resolved = []
+        for value in ids:
+            if isinstance(value, int) or (isinstance(value, str) and value.strip().isdigit()):
+                resolved.append(int(value))
+                continue
+            object_id = self.lookup(endpoint, str(value))
+            if object_id is None:
+                raise ValueError(f"No object named '{value}' in {endpoint}")
+            resolved.append(object_id)
+        return resolved
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, endpoints_loaded=len(self._indexes),
+                        keys=sum(len(index) for index in self._indexes.values()))
+
+
+_resolver: Optional[NameResolver] = None
+_resolver_lock = threading.Lock()
+
+
+def get_name_resolver(netbox_url: str = None, api_token: str = None) -> Optional[NameResolver]:
+    """Return the process-wide resolver unless NAME_RESOLVER is disabled or NetBox is unset"""
+    global _resolver
+    if os.getenv('NAME_RESOLVER', 'true').lower() not in ('1', 'true', 'yes'):
+        return None
+    netbox_url = netbox_url or os.getenv('NETBOX_URL')
+    api_token = api_token or os.getenv('NETBOX_TOKEN')
+    if not netbox_url:
+        return None
+    with _resolver_lock:
+        if (_resolver is None
+                or _resolver.controller.netbox != netbox_url.rstrip('/')
+                or _resolver.controller.api_token != api_token):
+            if _resolver is not None:
+                _resolver.stop()
+            # The index must see live data, so it bypasses the response cache
+            controller = NetBoxController(netbox_url, api_token, use_cache=False)
+            _resolver = NameResolver(
+                controller,
+                miss_refresh_interval=float(os.getenv('RESOLVER_MISS_REFRESH', 30)),
+            )
+        return _resolver
+
+
+def get_resolver_stats() -> Dict[str, Any]:
+    """Return resolver statistics, if it exists"""
+    if _resolver is None:
+        return {}
+    return _resolver.get_stats()
+
+
+def resolve_names(api_url: str, payload: Any) -> Any:
+    """Resolve reference names in one payload or a list of payloads with the shared resolver"""
+    resolver = get_name_resolver()
+    if resolver is None:
+        return payload
+    if isinstance(payload, list):
+        return [resolver.resolve_payload(api_url, item) for item in payload]
+    return resolver.resolve_payload(api_url, payload)
+
+
+def resolve_ids(api_url: str, ids: List[Any]) -> List[Any]:
+    """Resolve object names given in place of IDs with the shared resolver"""
+    resolver = get_name_resolver()
+    if resolver is None:
+        return ids
+    return resolver.resolve_ids(api_url, ids)
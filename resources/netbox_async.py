@@ -0,0 +1,348 @@
+import asyncio
+import logging
+import os
+import time
+import weakref
+from typing import Dict, Any, AsyncIterator, List, Optional
+
+import httpx
+
+from netbox_client import (
+    PoolConfig,
+    DEFAULT_PAGE_SIZE,
+    DEFAULT_PAGE_WORKERS,
+    DEFAULT_MAX_OBJECTS,
+    DEFAULT_BULK_BATCH_SIZE,
+    DEFAULT_STREAM,
+    STREAM_CHUNK_SIZE,
+    split_api_url,
+    is_unpaginated,
+    _env_bool,
+    chunked,
+    created_summary,
+    abort_bulk,
+    bulk_report,
+    http_error_detail,
+    notify_write,
+    notify_request,
+    response_size,
+    record_read,
+    _request_listeners,
+)
+from response_cache import ResponseCache, cache_scope, get_response_cache, normalize_key
+from resilience import RETRY_STATUSES, CircuitOpenError, RetryPolicy, get_circuit_breaker
+from single_flight import AsyncSingleFlight
+from json_stream import ResultsStreamParser
+from graphql_queries import GRAPHQL_URL, graphql_data
+
+logger = logging.getLogger(__name__)
+
+
+# Async NetBoxController for CRUD Operations
+class AsyncNetBoxController:
+    def __init__(self, netbox_url, api_token, pool_config: Optional[PoolConfig] = None,
+                 cache: Optional[ResponseCache] = None, use_cache: bool = True):
+        self.netbox = netbox_url.rstrip('/')
+        self.api_token = api_token
+        self.headers = {
+            'Accept': 'application/json',
+            'Authorization': f"Token {self.api_token}",
+        }
+        self.pool_config = pool_config or PoolConfig.from_env()
+        self.client = httpx.AsyncClient(
+            base_url=self.netbox,
+            headers=self.headers,
+            verify=False,
+            timeout=httpx.Timeout(self.pool_config.read_timeout, connect=self.pool_config.connect_timeout),
+            limits=httpx.Limits(
+                max_connections=self.pool_config.pool_maxsize,
+                max_keepalive_connections=self.pool_config.pool_maxsize,
+            ),
+        )
+        # Shares the process-wide response cache with the sync controller
+        self.cache = cache or (get_response_cache() if use_cache else None)
+        self.cache_scope = cache_scope(self.netbox, self.api_token)
+        self.retry_policy = RetryPolicy.from_env()
+        # Same breaker as the sync controller for this NetBox
+        self.breaker = get_circuit_breaker(self.netbox)
+        self.single_flight = AsyncSingleFlight() if _env_bool('NETBOX_SINGLE_FLIGHT', True) else None
+
+    async def _request(self, method: str, api_url: str, idempotent: bool = None, **kwargs) -> httpx.Response:
+        """Async counterpart of NetBoxController._request, with the same retry rule for writes"""
+        stream = kwargs.pop('stream', False)
+        idempotent = method == 'GET' if idempotent is None else idempotent
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            retry_after = None
+            started = time.perf_counter()
+            try:
+                request = self.client.build_request(method, api_url, **kwargs)
+                response = await self.client.send(request, stream=stream)
+            except httpx.TransportError as e:
+                if _request_listeners:
+                    notify_request(method, api_url, type(e).__name__, 0, time.perf_counter() - started)
+                self.breaker.record_failure()
+                transient = isinstance(e, (httpx.NetworkError, httpx.TimeoutException))
+                # ConnectTimeout and ConnectError: the connection was never opened, as never_sent()
+                retryable = (idempotent and transient) or isinstance(e, (httpx.ConnectTimeout, httpx.ConnectError))
+                if not retryable or attempt >= self.retry_policy.max_retries:
+                    raise
+            else:
+                if _request_listeners:
+                    notify_request(method, api_url, response.status_code, response_size(response, stream),
+                                   time.perf_counter() - started)
+                if response.status_code not in RETRY_STATUSES and response.status_code < 500:
+                    self.breaker.record_success()
+                    return response
+                self.breaker.record_failure()
+                retryable = idempotent or response.status_code == 429
+                if not retryable or attempt >= self.retry_policy.max_retries:
+                    return response
+                retry_after = response.headers.get('Retry-After')
+                await response.aclose()
+
+            delay = self.retry_policy.delay(attempt, retry_after)
+            self.breaker.record_retry()
+            logger.info(f"Retrying {method} {api_url} in {delay:.2f}s (attempt {attempt + 1})")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def get_api(self, api_url: str, params: dict = None):
+        record_read(api_url)
+        if self.cache is not None:
+            key = self.cache.make_key(self.cache_scope, api_url, params)
+            cached = self.cache.lookup(key)
+            if cached is not None:
+                return cached
+        if self.single_flight is None:
+            data = await self._get(api_url, params)
+        else:
+            data = await self.single_flight.do(normalize_key(api_url, params), lambda: self._get(api_url, params))
+        if self.cache is not None:
+            self.cache.store(key, api_url, data)
+        return data
+
+    async def _get(self, api_url: str, params: dict = None):
+        response = await self._request('GET', api_url, params=params)
+        response.raise_for_status()
+        return response.json()
+
+    async def stream_api(self, api_url: str, params: dict = None,
+                         meta: Dict[str, Any] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Async counterpart of NetBoxController.stream_api"""
+        record_read(api_url)
+        response = await self._request('GET', api_url, params=params, stream=True)
+        try:
+            if response.is_error:
+                await response.aread()
+            response.raise_for_status()
+            parser = ResultsStreamParser(meta=meta)
+            async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+                for item in parser.feed(chunk):
+                    yield item
+            for item in parser.close():
+                yield item
+        finally:
+            await response.aclose()
+
+    async def graphql(self, query: str, variables: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Async counterpart of NetBoxController.graphql"""
+        payload = {'query': query}
+        if variables:
+            payload['variables'] = variables
+        record_read(GRAPHQL_URL)
+        response = await self._request('POST', GRAPHQL_URL, json=payload, idempotent=True)
+        return graphql_data(response)
+
+    async def post_api(self, api_url: str, payload: Any):
+        response = await self._request('POST', api_url, json=payload)
+        response.raise_for_status()
+        self._invalidate(api_url)
+        return response.json()
+
+    async def delete_api(self, api_url: str):
+        response = await self._request('DELETE', api_url)
+        response.raise_for_status()
+        self._invalidate(api_url)
+        # NetBox answers a successful DELETE with 204 No Content
+        if response.status_code == 204 or not response.content:
+            return {"status": "deleted", "api_url": api_url}
+        return response.json()
+
+    async def bulk_post_api(self, api_url: str, payloads: List[dict], batch_size: int = None) -> Dict[str, Any]:
+        """Async counterpart of NetBoxController.bulk_post_api"""
+        results: List[Dict[str, Any]] = []
+        for start, chunk in chunked(payloads, batch_size or DEFAULT_BULK_BATCH_SIZE):
+            try:
+                created = await self.post_api(api_url, chunk)
+                for offset, obj in enumerate(created):
+                    results.append(dict(created_summary(obj), index=start + offset))
+            except httpx.HTTPStatusError:
+                for offset, payload in enumerate(chunk):
+                    index = start + offset
+                    try:
+                        obj = await self.post_api(api_url, payload)
+                        results.append(dict(created_summary(obj), index=index))
+                    except httpx.HTTPStatusError as e:
+                        results.append({"index": index, "status": "error", "error": http_error_detail(e)})
+                    except (httpx.RequestError, CircuitOpenError) as e:
+                        abort_bulk(results, [{"index": index}], [{"index": i} for i in range(index + 1, len(payloads))], e)
+                        return bulk_report("created", results)
+            except (httpx.RequestError, CircuitOpenError) as e:
+                end = start + len(chunk)
+                abort_bulk(results, [{"index": i} for i in range(start, end)],
+                           [{"index": i} for i in range(end, len(payloads))], e)
+                break
+        return bulk_report("created", results)
+
+    async def bulk_delete_api(self, api_url: str, ids: List[int], batch_size: int = None) -> Dict[str, Any]:
+        """Async counterpart of NetBoxController.bulk_delete_api"""
+        endpoint = split_api_url(api_url)[0]
+        results: List[Dict[str, Any]] = []
+        for start, chunk in chunked(ids, batch_size or DEFAULT_BULK_BATCH_SIZE):
+            try:
+                response = await self._request('DELETE', endpoint, json=[{"id": object_id} for object_id in chunk])
+            except (httpx.RequestError, CircuitOpenError) as e:
+                abort_bulk(results, [{"id": i} for i in chunk], [{"id": i} for i in ids[start + len(chunk):]], e)
+                break
+            if response.is_success:
+                self._invalidate(endpoint)
+                results.extend({"id": object_id, "status": "deleted"} for object_id in chunk)
+                continue
+            for offset, object_id in enumerate(chunk):
+                try:
+                    await self.delete_api(f"{endpoint.rstrip('/')}/{object_id}/")
+                    results.append({"id": object_id, "status": "deleted"})
+                except httpx.HTTPStatusError as e:
+                    results.append({"id": object_id, "status": "error", "error": http_error_detail(e)})
+                except (httpx.RequestError, CircuitOpenError) as e:
+                    abort_bulk(results, [{"id": object_id}], [{"id": i} for i in ids[start + offset + 1:]], e)
+                    return bulk_report("deleted", results)
+        return bulk_report("deleted", results)
+
+    def _invalidate(self, api_url: str):
+        """Drop cached GETs for the endpoint a successful write touched and tell write listeners"""
+        if self.cache is not None:
+            self.cache.invalidate(self.cache_scope, api_url)
+        notify_write(api_url)
+
+    async def iter_api(self, api_url: str, params: dict = None, page_size: int = None,
+                       max_objects: int = None, max_workers: int = None,
+                       meta: Dict[str, Any] = None, stream: bool = None) -> AsyncIterator[Dict[str, Any]]:
+        """Async counterpart of NetBoxController.iter_api with the same ordering and window"""
+        page_size = page_size or DEFAULT_PAGE_SIZE
+        max_workers = max(1, max_workers or DEFAULT_PAGE_WORKERS)
+        stream = DEFAULT_STREAM if stream is None else stream
+        path, base_params = split_api_url(api_url, params)
+        base_params.pop('offset', None)
+        if is_unpaginated(path, base_params) or stream:
+            if not is_unpaginated(path, base_params):
+                base_params['limit'] = page_size
+            async for item in self._iter_streamed(path, base_params, max_objects, meta):
+                yield item
+            return
+        base_params['limit'] = page_size
+
+        first = await self.get_api(path, params=dict(base_params, offset=0))
+        if not isinstance(first, dict) or 'results' not in first:
+            yield first
+            return
+
+        total = first.get('count') or 0
+        if meta is not None:
+            meta['count'] = total
+        if max_objects is not None:
+            total = min(total, max_objects)
+
+        yielded = 0
+        for item in first['results']:
+            if yielded >= total:
+                return
+            yield item
+            yielded += 1
+
+        offsets = iter(range(page_size, total, page_size))
+        pending = []
+        try:
+            for offset in offsets:
+                pending.append(asyncio.ensure_future(self.get_api(path, dict(base_params, offset=offset))))
+                if len(pending) >= max_workers * 2:
+                    break
+            while pending:
+                page = await pending.pop(0)
+                next_offset = next(offsets, None)
+                if next_offset is not None:
+                    pending.append(asyncio.ensure_future(self.get_api(path, dict(base_params, offset=next_offset))))
+                for item in page.get('results', []):
+                    if yielded >= total:
+                        return
+                    yield item
+                    yielded += 1
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _iter_streamed(self, path: str, params: Dict[str, Any], max_objects: int = None,
+                             meta: Dict[str, Any] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Async counterpart of NetBoxController._iter_streamed"""
+        meta = meta if meta is not None else {}
+        offset = 0
+        yielded = 0
+        while True:
+            received = 0
+            pages = self.stream_api(path, dict(params, offset=offset), meta=meta)
+            try:
+                async for item in pages:
+                    if max_objects is not None and yielded >= max_objects:
+                        return
+                    yield item
+                    yielded += 1
+                    received += 1
+            finally:
+                # Async generators are not closed by garbage collection promptly
+                await pages.aclose()
+            offset += received
+            if not received or offset >= (meta.get('count') or 0):
+                return
+
+    async def get_all(self, api_url: str, params: dict = None, max_objects: int = None, **kwargs) -> Dict[str, Any]:
+        """Collect a paginated list endpoint into a single NetBox-style response"""
+        max_objects = DEFAULT_MAX_OBJECTS if max_objects is None else max_objects
+        meta = {}
+        results = [item async for item in self.iter_api(api_url, params=params, max_objects=max_objects,
+                                                         meta=meta, **kwargs)]
+        count = meta.get('count', len(results))
+        return {
+            "count": count,
+            "returned": len(results),
+            "truncated": len(results) < count,
+            "results": results,
+        }
+
+    async def aclose(self):
+        """Close all pooled connections"""
+        await self.client.aclose()
+
+
+# httpx.AsyncClient is bound to the event loop it was first used on,
+# so the shared controller is kept per running loop.
+_async_controllers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncNetBoxController]" = weakref.WeakKeyDictionary()
+
+
+def get_async_netbox_controller(netbox_url: str = None, api_token: str = None) -> AsyncNetBoxController:
+    """Return the AsyncNetBoxController shared by everything on the running event loop"""
+    netbox_url = netbox_url or os.getenv("NETBOX_URL")
+    api_token = api_token or os.getenv("NETBOX_TOKEN")
+    if not netbox_url:
+        raise ValueError("NETBOX_URL is not configured")
+
+    loop = asyncio.get_running_loop()
+    controller = _async_controllers.get(loop)
+    if (controller is None
+            or controller.netbox != netbox_url.rstrip('/')
+            or controller.api_token != api_token):
+        controller = AsyncNetBoxController(netbox_url, api_token)
+        _async_controllers[loop] = controller
+        logger.info(f"Created async NetBox controller for {controller.netbox}")
+    return controller
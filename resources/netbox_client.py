@@ -0,0 +1,739 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit, parse_qsl
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError
+
+from response_cache import ResponseCache, cache_scope, get_response_cache, normalize_key, endpoint_prefix
+from resilience import RETRY_STATUSES, CircuitOpenError, RetryPolicy, get_circuit_breaker
+from single_flight import SingleFlight, get_single_flight_stats
+from json_stream import ResultsStreamParser
+from graphql_queries import GRAPHQL_URL, graphql_data
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment"""
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a float setting from the environment"""
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """Read a boolean setting from the environment"""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+# Pagination defaults for list endpoints
+DEFAULT_PAGE_SIZE = _env_int('NETBOX_PAGE_SIZE', 250)
+DEFAULT_PAGE_WORKERS = _env_int('NETBOX_PAGE_WORKERS', 4)
+DEFAULT_MAX_OBJECTS = _env_int('NETBOX_MAX_OBJECTS', 1000)
+# Objects per bulk POST/DELETE request
+DEFAULT_BULK_BATCH_SIZE = _env_int('NETBOX_BULK_BATCH_SIZE', 50)
+# Decode list pages incrementally from the socket instead of prefetching whole pages
+DEFAULT_STREAM = _env_bool('NETBOX_STREAM', False)
+STREAM_CHUNK_SIZE = _env_int('NETBOX_STREAM_CHUNK_SIZE', 64 * 1024)
+
+
+def split_api_url(api_url: str, params: dict = None) -> Tuple[str, Dict[str, Any]]:
+    """Split a URL with an inline query string into path and merged params"""
+    parts = urlsplit(api_url)
+    merged = dict(parse_qsl(parts.query, keep_blank_values=True))
+    merged.update(params or {})
+    return parts.path, merged
+
+
+def is_unpaginated(api_url: str, params: dict = None) -> bool:
+    """True if the request asks NetBox for the whole list at once (``limit=0``)"""
+    return str(split_api_url(api_url, params)[1].get('limit')) == '0'
+
+
+def parse_get_input(tool_input: str) -> Dict[str, Any]:
+    """Parse get_netbox_data_tool input: a plain API URL or a JSON options object"""
+    text = (tool_input or "").strip()
+    if text.startswith('{'):
+        options = json.loads(text)
+        if not options.get("api_url"):
+            raise ValueError("'api_url' must be provided.")
+        return options
+    return {"api_url": text}
+
+
+def parse_delete_input(tool_input: str) -> Dict[str, Any]:
+    """Parse delete_netbox_data_tool input: a detail URL or {"api_url": ..., "ids": [...]}"""
+    text = (tool_input or "").strip()
+    if text.startswith('{'):
+        options = json.loads(text)
+        if not options.get("api_url"):
+            raise ValueError("'api_url' must be provided.")
+        ids = options.get("ids")
+        if ids is not None and (not isinstance(ids, list) or not ids):
+            raise ValueError("'ids' must be a non-empty list of object IDs.")
+        return options
+    return {"api_url": text}
+
+
+def never_sent(error: requests.RequestException) -> bool:
+    """Whether a failed request never reached NetBox: the connection timed out or could not be opened"""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(error, requests.ConnectionError) and isinstance(reason, NewConnectionError)
+
+
+def chunked(items: List[Any], size: int) -> Iterator[Tuple[int, List[Any]]]:
+    """Yield (start_index, chunk) pairs of at most ``size`` items"""
+    size = max(1, size)
+    for start in range(0, len(items), size):
+        yield start, items[start:start + size]
+
+
+def http_error_detail(error: Exception) -> Any:
+    """Return NetBox's JSON error body for an HTTP error, or its message"""
+    response = getattr(error, 'response', None)
+    if response is not None:
+        try:
+            return response.json()
+        except ValueError:
+            return response.text or str(error)
+    return str(error)
+
+
+def created_summary(obj: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact per-item report for a created object"""
+    return {"status": "created", "id": obj.get("id"), "display": obj.get("display") or obj.get("name")}
+
+
+def abort_bulk(results: List[Dict[str, Any]], failed: List[Dict[str, Any]],
+               pending: List[Dict[str, Any]], error: Exception):
+    """Record a bulk operation cut short by a connection error or open circuit
+
+    The items of the request that failed are reported as errors (a timed-out
+    write may still have been applied), the items after it as not attempted.
+    """
+    results.extend(dict(item, status="error", error=str(error)) for item in failed)
+    results.extend(dict(item, status="not_attempted") for item in pending)
+
+
+def bulk_report(action: str, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Summarize per-item results of a bulk operation"""
+    succeeded = sum(1 for r in results if r["status"] == action)
+    not_attempted = sum(1 for r in results if r["status"] == "not_attempted")
+    report = {
+        action: succeeded,
+        "failed": len(results) - succeeded - not_attempted,
+        "results": results,
+    }
+    if not_attempted:
+        report["not_attempted"] = not_attempted
+    return report
+
+
+class PoolConfig:
+    """Connection pool and timeout settings for the NetBox HTTP session"""
+
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 20, pool_block: bool = True,
+                 connect_timeout: float = 5.0, read_timeout: float = 30.0):
+        # Number of distinct host pools kept alive
+        self.pool_connections = pool_connections
+        # Maximum open connections per host
+        self.pool_maxsize = pool_maxsize
+        # Wait for a free connection instead of opening extra ones past pool_maxsize
+        self.pool_block = pool_block
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+    @classmethod
+    def from_env(cls) -> "PoolConfig":
+        """Build the pool configuration from NETBOX_* environment variables"""
+        return cls(
+            pool_connections=_env_int('NETBOX_POOL_CONNECTIONS', 10),
+            pool_maxsize=_env_int('NETBOX_POOL_MAXSIZE', 20),
+            pool_block=_env_bool('NETBOX_POOL_BLOCK', True),
+            connect_timeout=_env_float('NETBOX_CONNECT_TIMEOUT', 5.0),
+            read_timeout=_env_float('NETBOX_READ_TIMEOUT', 30.0),
+        )
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        return (self.connect_timeout, self.read_timeout)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'pool_connections': self.pool_connections,
+            'pool_maxsize': self.pool_maxsize,
+            'pool_block': self.pool_block,
+            'connect_timeout': self.connect_timeout,
+            'read_timeout': self.read_timeout,
+        }
+
+
+class PoolStats:
+    """Thread-safe counters describing how the connection pool is used"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.new_connections = 0
+        self.checkout_wait_total = 0.0
+        self.checkout_wait_max = 0.0
+
+    def record_checkout(self, wait: float):
+        with self._lock:
+            self.checkouts += 1
+            self.checkout_wait_total += wait
+            self.checkout_wait_max = max(self.checkout_wait_max, wait)
+
+    def record_new_connection(self):
+        with self._lock:
+            self.new_connections += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a point-in-time copy of the counters with derived ratios"""
+        with self._lock:
+            checkouts = self.checkouts
+            new_connections = min(self.new_connections, checkouts)
+            reused = checkouts - new_connections
+            return {
+                'checkouts': checkouts,
+                'new_connections': self.new_connections,
+                'reused_connections': reused,
+                'reuse_ratio': round(reused / checkouts, 4) if checkouts else 0.0,
+                'checkout_wait_avg_ms': round(self.checkout_wait_total / checkouts * 1000, 3) if checkouts else 0.0,
+                'checkout_wait_max_ms': round(self.checkout_wait_max * 1000, 3),
+            }
+
+
+def _instrumented_pool_class(base, stats: PoolStats):
+    """Subclass a urllib3 connection pool so checkouts and new sockets are counted"""
+
+    class InstrumentedPool(base):
+        def _get_conn(self, timeout=None):
+            start = time.monotonic()
+            conn = super()._get_conn(timeout=timeout)
+            stats.record_checkout(time.monotonic() - start)
+            return conn
+
+        def _new_conn(self):
+            stats.record_new_connection()
+            return super()._new_conn()
+
+    InstrumentedPool.__name__ = f"Instrumented{base.__name__}"
+    return InstrumentedPool
+
+
+class InstrumentedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose per-host pools report into a PoolStats instance"""
+
+    def __init__(self, stats: PoolStats, **kwargs):
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _instrumented_pool_class(HTTPConnectionPool, self.stats),
+            'https': _instrumented_pool_class(HTTPSConnectionPool, self.stats),
+        }
+
+
+# Endpoints read and written in the current context, see track_netbox_calls()
+_tracked_calls: ContextVar[Optional[Dict[str, set]]] = ContextVar('netbox_tracked_calls', default=None)
+
+
+@contextmanager
+def track_netbox_calls() -> Iterator[Dict[str, set]]:
+    """Collect the endpoints read (``reads``) and written (``writes``) by NetBox calls made in the block
+
+    Used to learn which data an agent answer depends on. Calls made from
+    worker threads that do not inherit the context (page prefetch) are not
+    seen, but they always repeat an endpoint the calling thread already read.
+    """
+    calls = {'reads': set(), 'writes': set()}
+    token = _tracked_calls.set(calls)
+    try:
+        yield calls
+    finally:
+        _tracked_calls.reset(token)
+
+
+def record_read(api_url: str):
+    calls = _tracked_calls.get()
+    if calls is not None:
+        calls['reads'].add(endpoint_prefix(api_url))
+
+
+# Callbacks told about every successful write, e.g. to drop local indexes
+_write_listeners: List[Callable[[str], None]] = []
+
+
+def add_write_listener(callback: Callable[[str], None]):
+    """Register ``callback(api_url)`` to run after any controller writes to NetBox"""
+    if callback not in _write_listeners:
+        _write_listeners.append(callback)
+
+
+def remove_write_listener(callback: Callable[[str], None]):
+    if callback in _write_listeners:
+        _write_listeners.remove(callback)
+
+
+_request_listeners: List[Callable[[str, str, Any, int, float], None]] = []
+
+
+def add_request_listener(callback: Callable[[str, str, Any, int, float], None]):
+    """Register ``callback(method, api_url, status, response_bytes, seconds)`` for every NetBox HTTP attempt
+
+    ``status`` is the HTTP status code, or the exception class name when no
+    response arrived. Used by the metrics endpoint; keep callbacks cheap.
+    """
+    if callback not in _request_listeners:
+        _request_listeners.append(callback)
+
+
+def notify_request(method: str, api_url: str, status: Any, response_bytes: int, seconds: float):
+    for callback in list(_request_listeners):
+        try:
+            callback(method, api_url, status, response_bytes, seconds)
+        except Exception as e:
+            logger.warning(f"Request listener failed for {method} {api_url}: {e}")
+
+
+def response_size(response, streamed: bool) -> int:
+    """Body size of a response; streamed bodies are not read, so their Content-Length is used"""
+    if streamed:
+        return int(response.headers.get('Content-Length') or 0)
+    return len(response.content)
+
+
+def notify_write(api_url: str):
+    calls = _tracked_calls.get()
+    if calls is not None:
+        calls['writes'].add(endpoint_prefix(api_url))
+    for callback in list(_write_listeners):
+        try:
+            callback(api_url)
+        except Exception as e:
+            logger.warning(f"Write listener failed for {api_url}: {e}")
+
+
+# NetBoxController for CRUD Operations
+class NetBoxController:
+    def __init__(self, netbox_url, api_token, pool_config: Optional[PoolConfig] = None,
+                 cache: Optional[ResponseCache] = None, use_cache: bool = True):
+        self.netbox = netbox_url.rstrip('/')
+        self.api_token = api_token
+        self.headers = {
+            'Accept': 'application/json',
+            'Authorization': f"Token {self.api_token}",
+        }
+        self.pool_config = pool_config or PoolConfig.from_env()
+        self.pool_stats = PoolStats()
+        self.session = self._build_session()
+        self.cache = cache or (get_response_cache() if use_cache else None)
+        self.cache_scope = cache_scope(self.netbox, self.api_token)
+        self.retry_policy = RetryPolicy.from_env()
+        self.breaker = get_circuit_breaker(self.netbox)
+        # Concurrent identical GETs share one outbound request
+        self.single_flight = SingleFlight() if _env_bool('NETBOX_SINGLE_FLIGHT', True) else None
+
+    def _build_session(self) -> requests.Session:
+        """Create a keep-alive session backed by a bounded, instrumented pool"""
+        session = requests.Session()
+        session.headers.update(self.headers)
+        session.headers['Connection'] = 'keep-alive'
+        session.verify = False
+        adapter = InstrumentedHTTPAdapter(
+            self.pool_stats,
+            pool_connections=self.pool_config.pool_connections,
+            pool_maxsize=self.pool_config.pool_maxsize,
+            pool_block=self.pool_config.pool_block,
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _request(self, method: str, api_url: str, idempotent: bool = None, **kwargs) -> requests.Response:
+        """Send a request with timeouts, retries and the circuit breaker
+
+        GETs are retried on connection errors, timeouts and 429/502/503/504.
+        Writes are only retried when NetBox cannot have acted on them: the
+        connection was never opened (connect timeout, refused or unresolvable
+        host) or NetBox answered 429. The async client follows the same rule.
+        Pass ``idempotent=True`` for read-only POSTs.
+        """
+        idempotent = method == 'GET' if idempotent is None else idempotent
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            retry_after = None
+            started = time.perf_counter()
+            try:
+                response = self.session.request(
+                    method,
+                    f"{self.netbox}{api_url}",
+                    timeout=self.pool_config.timeout,
+                    **kwargs
+                )
+            except requests.RequestException as e:
+                if _request_listeners:
+                    notify_request(method, api_url, type(e).__name__, 0, time.perf_counter() - started)
+                self.breaker.record_failure()
+                transient = isinstance(e, (requests.ConnectionError, requests.Timeout))
+                retryable = (idempotent and transient) or never_sent(e)
+                if not retryable or attempt >= self.retry_policy.max_retries:
+                    raise
+            else:
+                if _request_listeners:
+                    notify_request(method, api_url, response.status_code,
+                                   response_size(response, kwargs.get('stream', False)), time.perf_counter() - started)
+                if response.status_code not in RETRY_STATUSES and response.status_code < 500:
+                    self.breaker.record_success()
+                    return response
+                self.breaker.record_failure()
+                retryable = idempotent or response.status_code == 429
+                if not retryable or attempt >= self.retry_policy.max_retries:
+                    return response
+                retry_after = response.headers.get('Retry-After')
+                response.close()
+
+            delay = self.retry_policy.delay(attempt, retry_after)
+            self.breaker.record_retry()
+            logger.info(f"Retrying {method} {api_url} in {delay:.2f}s (attempt {attempt + 1})")
+            time.sleep(delay)
+            attempt += 1
+
+    def get_api(self, api_url: str, params: dict = None):
+        record_read(api_url)
+        if self.cache is None:
+            return self._coalesced_get(api_url, params)
+        return self.cache.get_or_fetch(self.cache_scope, api_url, params,
+                                       lambda: self._coalesced_get(api_url, params))
+
+    def _coalesced_get(self, api_url: str, params: dict = None):
+        if self.single_flight is None:
+            return self._get(api_url, params)
+        return self.single_flight.do(normalize_key(api_url, params), lambda: self._get(api_url, params))
+
+    def _get(self, api_url: str, params: dict = None):
+        response = self._request('GET', api_url, params=params)
+        response.raise_for_status()
+        return response.json()
+
+    def stream_api(self, api_url: str, params: dict = None,
+                   meta: Dict[str, Any] = None) -> Iterator[Dict[str, Any]]:
+        """Yield the objects of one list response as they are decoded from the socket
+
+        The body is never materialized, so peak memory is one object plus the
+        read buffer. ``meta`` receives ``count``, ``next`` and ``previous``. The
+        response cache and single-flight are bypassed. Closing the generator
+        early closes the connection.
+        """
+        record_read(api_url)
+        response = self._request('GET', api_url, params=params, stream=True)
+        try:
+            response.raise_for_status()
+            parser = ResultsStreamParser(meta=meta)
+            for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                yield from parser.feed(chunk)
+            yield from parser.close()
+        finally:
+            response.close()
+
+    def iter_api(self, api_url: str, params: dict = None, page_size: int = None,
+                 max_objects: int = None, max_workers: int = None,
+                 meta: Dict[str, Any] = None, stream: bool = None) -> Iterator[Dict[str, Any]]:
+        """Yield every object of a list endpoint, prefetching pages concurrently
+
+        The first page is read to learn ``count``; the remaining ``offset``/``limit``
+        pages are fetched by a bounded worker pool. Pages are yielded in order and
+        at most ``2 * max_workers`` pages are held at once, so memory stays flat
+        regardless of the endpoint size. Detail endpoints yield their single object.
+        If ``meta`` is given it receives the endpoint's total ``count``.
+
+        With ``stream`` (default NETBOX_STREAM) pages are read one after another
+        and decoded object by object, trading prefetch for a memory peak of one
+        object. A ``limit=0`` request is always streamed as a single response.
+        """
+        page_size = page_size or DEFAULT_PAGE_SIZE
+        max_workers = max(1, max_workers or DEFAULT_PAGE_WORKERS)
+        stream = DEFAULT_STREAM if stream is None else stream
+        path, base_params = split_api_url(api_url, params)
+        base_params.pop('offset', None)
+        if is_unpaginated(path, base_params) or stream:
+            if not is_unpaginated(path, base_params):
+                base_params['limit'] = page_size
+            yield from self._iter_streamed(path, base_params, max_objects, meta)
+            return
+        base_params['limit'] = page_size
+
+        first = self.get_api(path, params=dict(base_params, offset=0))
+        if not isinstance(first, dict) or 'results' not in first:
+            yield first
+            return
+
+        total = first.get('count') or 0
+        if meta is not None:
+            meta['count'] = total
+        if max_objects is not None:
+            total = min(total, max_objects)
+
+        yielded = 0
+        for item in first['results']:
+            if yielded >= total:
+                return
+            yield item
+            yielded += 1
+
+        offsets = iter(range(page_size, total, page_size))
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='netbox-page')
+        pending = deque()
+        try:
+            # Keep a bounded window of pages in flight ahead of the consumer
+            for offset in offsets:
+                pending.append(executor.submit(self.get_api, path, dict(base_params, offset=offset)))
+                if len(pending) >= max_workers * 2:
+                    break
+            while pending:
+                page = pending.popleft().result()
+                next_offset = next(offsets, None)
+                if next_offset is not None:
+                    pending.append(executor.submit(self.get_api, path, dict(base_params, offset=next_offset)))
+                for item in page.get('results', []):
+                    if yielded >= total:
+                        return
+                    yield item
+                    yielded += 1
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _iter_streamed(self, path: str, params: Dict[str, Any], max_objects: int = None,
+                       meta: Dict[str, Any] = None) -> Iterator[Dict[str, Any]]:
+        """Stream consecutive pages until ``count`` objects or ``max_objects`` are read
+
+        Offsets advance by the number of objects actually received, so NetBox
+        capping ``limit=0`` at MAX_PAGE_SIZE is followed transparently.
+        """
+        meta = meta if meta is not None else {}
+        offset = 0
+        yielded = 0
+        while True:
+            received = 0
+            for item in self.stream_api(path, dict(params, offset=offset), meta=meta):
+                if max_objects is not None and yielded >= max_objects:
+                    return
+                yield item
+                yielded += 1
+                received += 1
+            offset += received
+            if not received or offset >= (meta.get('count') or 0):
+                return
+
+    def get_all(self, api_url: str, params: dict = None, max_objects: int = None, **kwargs) -> Dict[str, Any]:
+        """Collect a paginated list endpoint into a single NetBox-style response"""
+        max_objects = DEFAULT_MAX_OBJECTS if max_objects is None else max_objects
+        meta = {}
+        results = list(self.iter_api(api_url, params=params, max_objects=max_objects, meta=meta, **kwargs))
+        count = meta.get('count', len(results))
+        return {
+            "count": count,
+            "returned": len(results),
+            "truncated": len(results) < count,
+            "results": results,
+        }
+
+    def graphql(self, query: str, variables: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Run a read-only query against NetBox's GraphQL API and return its ``data``
+
+        One query with nested selections replaces a chain of REST calls. It is
+        retried like a GET because it cannot change anything.
+        """
+        payload = {'query': query}
+        if variables:
+            payload['variables'] = variables
+        record_read(GRAPHQL_URL)
+        response = self._request('POST', GRAPHQL_URL, json=payload, idempotent=True)
+        return graphql_data(response)
+
+    def post_api(self, api_url: str, payload: Any):
+        response = self._request('POST', api_url, json=payload)
+        response.raise_for_status()
+        self._invalidate(api_url)
+        return response.json()
+
+    def delete_api(self, api_url: str):
+        response = self._request('DELETE', api_url)
+        response.raise_for_status()
+        self._invalidate(api_url)
+        # NetBox answers a successful DELETE with 204 No Content
+        if response.status_code == 204 or not response.content:
+            return {"status": "deleted", "api_url": api_url}
+        return response.json()
+
+    def bulk_post_api(self, api_url: str, payloads: List[dict], batch_size: int = None) -> Dict[str, Any]:
+        """Create many objects with NetBox's list-endpoint bulk POST
+
+        Payloads are sent in chunks of ``batch_size``. NetBox creates a chunk
+        atomically, so a rejected chunk is retried item by item to report which
+        payloads are actually invalid. A connection error or open circuit
+        stops the run; what was created so far is still reported.
+        """
+        results: List[Dict[str, Any]] = []
+        for start, chunk in chunked(payloads, batch_size or DEFAULT_BULK_BATCH_SIZE):
+            try:
+                created = self.post_api(api_url, chunk)
+                for offset, obj in enumerate(created):
+                    results.append(dict(created_summary(obj), index=start + offset))
+            except requests.HTTPError:
+                for offset, payload in enumerate(chunk):
+                    index = start + offset
+                    try:
+                        obj = self.post_api(api_url, payload)
+                        results.append(dict(created_summary(obj), index=index))
+                    except requests.HTTPError as e:
+                        results.append({"index": index, "status": "error", "error": http_error_detail(e)})
+                    except (requests.RequestException, CircuitOpenError) as e:
+                        abort_bulk(results, [{"index": index}], [{"index": i} for i in range(index + 1, len(payloads))], e)
+                        return bulk_report("created", results)
+            except (requests.RequestException, CircuitOpenError) as e:
+                end = start + len(chunk)
+                abort_bulk(results, [{"index": i} for i in range(start, end)],
+                           [{"index": i} for i in range(end, len(payloads))], e)
+                break
+        return bulk_report("created", results)
+
+    def bulk_delete_api(self, api_url: str, ids: List[int], batch_size: int = None) -> Dict[str, Any]:
+        """Delete many objects with NetBox's list-endpoint bulk DELETE
+
+        A rejected chunk is retried per object so each ID gets its own result.
+        A connection error or open circuit stops the run with the partial report.
+        """
+        endpoint = split_api_url(api_url)[0]
+        results: List[Dict[str, Any]] = []
+        for start, chunk in chunked(ids, batch_size or DEFAULT_BULK_BATCH_SIZE):
+            try:
+                response = self._request('DELETE', endpoint, json=[{"id": object_id} for object_id in chunk])
+            except (requests.RequestException, CircuitOpenError) as e:
+                abort_bulk(results, [{"id": i} for i in chunk], [{"id": i} for i in ids[start + len(chunk):]], e)
+                break
+            if response.ok:
+                self._invalidate(endpoint)
+                results.extend({"id": object_id, "status": "deleted"} for object_id in chunk)
+                continue
+            for offset, object_id in enumerate(chunk):
+                try:
+                    self.delete_api(f"{endpoint.rstrip('/')}/{object_id}/")
+                    results.append({"id": object_id, "status": "deleted"})
+                except requests.HTTPError as e:
+                    results.append({"id": object_id, "status": "error", "error": http_error_detail(e)})
+                except (requests.RequestException, CircuitOpenError) as e:
+                    abort_bulk(results, [{"id": object_id}], [{"id": i} for i in ids[start + offset + 1:]], e)
+                    return bulk_report("deleted", results)
+        return bulk_report("deleted", results)
+
+    def _invalidate(self, api_url: str):
+        """Drop cached GETs for the endpoint a successful write touched and tell write listeners"""
+        if self.cache is not None:
+            self.cache.invalidate(self.cache_scope, api_url)
+        notify_write(api_url)
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Return pool usage counters together with the active pool settings"""
+        stats = self.pool_stats.snapshot()
+        stats['config'] = self.pool_config.as_dict()
+        return stats
+
+    def get_resilience_stats(self) -> Dict[str, Any]:
+        """Return circuit breaker state together with retry and failure counters"""
+        return self.breaker.snapshot()
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Return response cache counters, or an empty dict when caching is off"""
+        return self.cache.get_stats() if self.cache is not None else {}
+
+    def close(self):
+        """Close all pooled connections"""
+        self.session.close()
+
+
+# Process-wide controller shared by the Streamlit app and both Slack bots
+_controller: Optional[NetBoxController] = None
+_controller_lock = threading.Lock()
+
+
+def get_netbox_controller(netbox_url: str = None, api_token: str = None) -> NetBoxController:
+    """Return the shared NetBoxController, creating it on first use
+
+    Falls back to NETBOX_URL / NETBOX_TOKEN from the environment. If the URL or
+    token changes (e.g. re-entered on the Streamlit configuration page) a new
+    controller and pool are created.
+    """
+    global _controller
+    netbox_url = netbox_url or os.getenv("NETBOX_URL")
+    api_token = api_token or os.getenv("NETBOX_TOKEN")
+    if not netbox_url:
+        raise ValueError("NETBOX_URL is not configured")
+
+    with _controller_lock:
+        if (_controller is None
+                or _controller.netbox != netbox_url.rstrip('/')
+                or _controller.api_token != api_token):
+            _controller = NetBoxController(netbox_url, api_token)
+            logger.info(f"Created pooled NetBox controller for {_controller.netbox} "
+                        f"({_controller.pool_config.as_dict()})")
+        return _controller
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Return pool statistics for the shared controller, if it exists"""
+    if _controller is None:
+        return {}
+    return _controller.get_pool_stats()
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Return response cache statistics for the shared controller, if it exists"""
+    if _controller is None:
+        return {}
+    return _controller.get_cache_stats()
+
+
+def get_resilience_stats() -> Dict[str, Any]:
+    """Return circuit breaker statistics for the shared controller, if it exists"""
+    if _controller is None:
+        return {}
+    return _controller.get_resilience_stats()
+
+
+def get_client_stats() -> Dict[str, Dict[str, Any]]:
+    """Return pool, cache, breaker and single-flight statistics in one dict"""
+    return {
+        'pool': get_pool_stats(),
+        'cache': get_cache_stats(),
+        'breaker': get_resilience_stats(),
+        'single_flight': get_single_flight_stats(),
+    }
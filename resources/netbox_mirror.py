@@ -0,0 +1,443 @@
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+
+from netbox_client import NetBoxController, DEFAULT_MAX_OBJECTS, split_api_url, record_read, add_write_listener
+from response_cache import endpoint_prefix
+from api_catalog import select_catalog_endpoints
+
+logger = logging.getLogger(__name__)
+
+# Endpoints mirrored when MIRROR_ENDPOINTS is not set
+DEFAULT_MIRROR_ENDPOINTS = [
+    '/api/dcim/sites/',
+    '/api/dcim/racks/',
+    '/api/dcim/devices/',
+    '/api/dcim/device-types/',
+    '/api/dcim/device-roles/',
+    '/api/dcim/interfaces/',
+    '/api/ipam/prefixes/',
+    '/api/ipam/ip-addresses/',
+    '/api/ipam/vlans/',
+    '/api/ipam/vrfs/',
+    '/api/circuits/circuits/',
+    '/api/circuits/providers/',
+    '/api/tenancy/tenants/',
+    '/api/virtualization/virtual-machines/',
+]
+
+# Query parameters the mirror can answer; anything else goes to NetBox
+MIRROR_FILTERS = {
+    'id': 'object_id',
+    'name': 'name',
+    'slug': 'slug',
+    'site_id': 'site_id',
+    'site': 'site_slug',
+    'status': 'status',
+}
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS nbmirror_objects (
+        endpoint VARCHAR(128) NOT NULL,
+        object_id BIGINT NOT NULL,
+        name VARCHAR(255) NULL,
+        slug VARCHAR(255) NULL,
+        site_id BIGINT NULL,
+        site_slug VARCHAR(255) NULL,
+        status VARCHAR(64) NULL,
+        last_updated DATETIME(6) NULL,
+        data JSON NOT NULL,
+        PRIMARY KEY (endpoint, object_id),
+        INDEX idx_nbmirror_name (endpoint, name),
+        INDEX idx_nbmirror_slug (endpoint, slug),
+        INDEX idx_nbmirror_site (endpoint, site_id),
+        INDEX idx_nbmirror_site_slug (endpoint, site_slug),
+        INDEX idx_nbmirror_status (endpoint, status),
+        INDEX idx_nbmirror_updated (endpoint, last_updated)
+    ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS nbmirror_sync_state (
+        endpoint VARCHAR(128) NOT NULL PRIMARY KEY,
+        high_watermark DATETIME(6) NULL,
+        last_synced_at DATETIME(6) NULL,
+        last_full_sync_at DATETIME(6) NULL,
+        object_count INT NOT NULL DEFAULT 0
+    ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
+    """,
+]
+
+UPSERT = """
+    INSERT INTO nbmirror_objects
+        (endpoint, object_id, name, slug, site_id, site_slug, status, last_updated, data)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        name = VALUES(name), slug = VALUES(slug), site_id = VALUES(site_id),
+        site_slug = VALUES(site_slug), status = VALUES(status),
+        last_updated = VALUES(last_updated), data = VALUES(data)
+"""
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Convert a NetBox ISO timestamp to a naive UTC datetime for MySQL"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _row_for(endpoint: str, obj: Dict[str, Any]) -> tuple:
+    """Extract the indexed columns of a NetBox object"""
+    site = obj.get('site') if isinstance(obj.get('site'), dict) else {}
+    status = obj.get('status')
+    if isinstance(status, dict):
+        status = status.get('value')
+    return (
+        endpoint,
+        obj['id'],
+        obj.get('name') or obj.get('display'),
+        obj.get('slug'),
+        site.get('id'),
+        site.get('slug'),
+        status,
+        _parse_timestamp(obj.get('last_updated')),
+        json.dumps(obj, separators=(',', ':')),
+    )
+
+
+def load_mirror_endpoints(file_path: str = None) -> List[str]:
+    """Resolve MIRROR_ENDPOINTS (URLs or names) against netbox_apis.json"""
+    return select_catalog_endpoints('MIRROR_ENDPOINTS', DEFAULT_MIRROR_ENDPOINTS, file_path)
+
+
+class NetBoxMirror:
+    """Mirrors selected NetBox list endpoints into indexed MySQL tables"""
+
+    def __init__(self, mysql_config: Dict[str, str], controller: NetBoxController,
+                 endpoints: List[str] = None, batch_size: int = 500,
+                 max_staleness: float = 900, reconcile_every: int = 12):
+        self.mysql_config = mysql_config
+        self.controller = controller
+        self.endpoints = endpoints or load_mirror_endpoints()
+        self.batch_size = batch_size
+        # Reads older than this fall through to NetBox
+        self.max_staleness = max_staleness
+        # Every Nth incremental cycle also removes objects deleted upstream
+        self.reconcile_every = reconcile_every
+        self._local = threading.local()
+        self._stop = threading.Event()
+        self._thread = None
+        self._cycles = 0
+        # Endpoint -> time of the last write through a controller; reads skip it until re-synced
+        self._written: Dict[str, float] = {}
+        self._written_lock = threading.Lock()
+        add_write_listener(self.on_write)
+
+    def on_write(self, api_url: str):
+        """Mark the written endpoint stale so reads go to NetBox until the next sync picks the change up"""
+        endpoint = endpoint_prefix(api_url)
+        if endpoint in self.endpoints:
+            with self._written_lock:
+                self._written[endpoint] = time.monotonic()
+
+    def is_written(self, endpoint: str) -> bool:
+        with self._written_lock:
+            return endpoint in self._written
+
+    def _connection(self):
+        """Return this thread's MySQL connection, reconnecting if needed"""
+        import pymysql  # optional dependency
+
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = pymysql.connect(
+                host=self.mysql_config['DB_HOST'],
+                port=int(self.mysql_config.get('DB_PORT') or 3306),
+                user=self.mysql_config['DB_USER'],
+                password=self.mysql_config['DB_PASSWORD'],
+                database=self.mysql_config['DB_NAME'],
+                charset='utf8mb4',
+                autocommit=True,
+            )
+            self._local.conn = conn
+        else:
+            conn.ping(reconnect=True)
+        return conn
+
+    def ensure_schema(self):
+        with self._connection().cursor() as cursor:
+            for statement in SCHEMA:
+                cursor.execute(statement)
+
+    # ------------------------------------------------------------------
+    # Sync
+    # ------------------------------------------------------------------
+
+    def _get_state(self, endpoint: str) -> Optional[Dict[str, Any]]:
+        with self._connection().cursor() as cursor:
+            cursor.execute(
+                "SELECT high_watermark, last_synced_at, last_full_sync_at, object_count "
+                "FROM nbmirror_sync_state WHERE endpoint = %s", (endpoint,))
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        return dict(zip(('high_watermark', 'last_synced_at', 'last_full_sync_at', 'object_count'), row))
+
+    def _save_state(self, endpoint: str, high_watermark: Optional[datetime], full: bool):
+        now = _utcnow()
+        with self._connection().cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM nbmirror_objects WHERE endpoint = %s", (endpoint,))
+            count = cursor.fetchone()[0]
+            cursor.execute(
+                """
+                INSERT INTO nbmirror_sync_state
+                    (endpoint, high_watermark, last_synced_at, last_full_sync_at, object_count)
+                VALUES (%s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    high_watermark = COALESCE(VALUES(high_watermark), high_watermark),
+                    last_synced_at = VALUES(last_synced_at),
+                    last_full_sync_at = COALESCE(VALUES(last_full_sync_at), last_full_sync_at),
+                    object_count = VALUES(object_count)
+                """,
+                (endpoint, high_watermark, now, now if full else None, count))
+
+    def _load(self, endpoint: str, params: dict = None) -> Optional[datetime]:
+        """Upsert every object returned by the endpoint, returning the newest last_updated"""
+        high_watermark = None
+        batch = []
+        with self._connection().cursor() as cursor:
+            for obj in self.controller.iter_api(endpoint, params=params, page_size=1000):
+                row = _row_for(endpoint, obj)
+                if row[7] is not None and (high_watermark is None or row[7] > high_watermark):
+                    high_watermark = row[7]
+                batch.append(row)
+                if len(batch) >= self.batch_size:
+                    cursor.executemany(UPSERT, batch)
+                    batch = []
+            if batch:
+                cursor.executemany(UPSERT, batch)
+        return high_watermark
+
+    def _reconcile_deletes(self, endpoint: str):
+        """Remove mirrored objects that no longer exist upstream"""
+        live_ids = {obj['id'] for obj in self.controller.iter_api(endpoint, params={'brief': 1}, page_size=1000)}
+        with self._connection().cursor() as cursor:
+            cursor.execute("SELECT object_id FROM nbmirror_objects WHERE endpoint = %s", (endpoint,))
+            stale = [row[0] for row in cursor.fetchall() if row[0] not in live_ids]
+            for start in range(0, len(stale), self.batch_size):
+                chunk = stale[start:start + self.batch_size]
+                placeholders = ', '.join(['%s'] * len(chunk))
+                cursor.execute(
+                    f"DELETE FROM nbmirror_objects WHERE endpoint = %s AND object_id IN ({placeholders})",
+                    [endpoint] + chunk)
+        if stale:
+            logger.info(f"Mirror removed {len(stale)} deleted objects from {endpoint}")
+
+    def sync_endpoint(self, endpoint: str, reconcile: bool = False):
+        """Run a full load for new endpoints, otherwise an incremental refresh
+
+        An endpoint written since its last sync is also reconciled, since
+        incremental refreshes do not see deletes.
+        """
+        state = self._get_state(endpoint)
+        start = time.monotonic()
+        with self._written_lock:
+            written = self._written.get(endpoint)
+        reconcile = reconcile or written is not None
+        if state is None or state['high_watermark'] is None:
+            high_watermark = self._load(endpoint)
+            self._save_state(endpoint, high_watermark, full=True)
+            logger.info(f"Mirror full load of {endpoint} took {time.monotonic() - start:.1f}s")
+        else:
+            watermark = state['high_watermark']
+            high_watermark = self._load(endpoint, params={'last_updated__gte': watermark.isoformat()})
+            if reconcile:
+                self._reconcile_deletes(endpoint)
+            self._save_state(endpoint, high_watermark, full=reconcile)
+        with self._written_lock:
+            # Writes made while this sync ran may not be in it; keep those stale
+            if written is not None and self._written.get(endpoint) == written:
+                del self._written[endpoint]
+
+    def sync_all(self):
+        reconcile = self.reconcile_every > 0 and self._cycles % self.reconcile_every == self.reconcile_every - 1
+        for endpoint in self.endpoints:
+            try:
+                self.sync_endpoint(endpoint, reconcile=reconcile)
+            except Exception as e:
+                logger.error(f"Mirror sync of {endpoint} failed: {e}")
+        self._cycles += 1
+
+    def start_background_sync(self, interval: float = 60):
+        """Create tables, then refresh every ``interval`` seconds on a daemon thread"""
+        if self._thread is not None:
+            return
+
+        def run():
+            self.ensure_schema()
+            while not self._stop.is_set():
+                self.sync_all()
+                self._stop.wait(interval)
+
+        self._thread = threading.Thread(target=run, name='netbox-mirror', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def staleness(self, endpoint: str) -> Optional[float]:
+        """Seconds since the endpoint was last refreshed, or None if never synced"""
+        state = self._get_state(endpoint)
+        if state is None or state['last_synced_at'] is None:
+            return None
+        return (_utcnow() - state['last_synced_at']).total_seconds()
+
+    def status(self) -> Dict[str, Any]:
+        """Per-endpoint object counts and staleness"""
+        report = {}
+        for endpoint in self.endpoints:
+            state = self._get_state(endpoint) or {}
+            staleness = self.staleness(endpoint)
+            report[endpoint] = {
+                'objects': state.get('object_count', 0),
+                'last_synced_at': state['last_synced_at'].isoformat() if state.get('last_synced_at') else None,
+                'staleness_seconds': round(staleness, 1) if staleness is not None else None,
+                'written_since_sync': self.is_written(endpoint),
+            }
+        return report
+
+    def query(self, api_url: str, all_pages: bool = False, max_objects: int = None) -> Optional[Dict[str, Any]]:
+        """Answer a GET from the mirror, or return None if NetBox must be asked
+
+        Handles list and detail URLs of mirrored endpoints filtered by the
+        parameters in MIRROR_FILTERS, provided the data is fresh enough. Like
+        ``get_all``, ``all_pages`` and ``limit=0`` return at most
+        ``max_objects`` (default NETBOX_MAX_OBJECTS) rows.
+        """
+        path, params = split_api_url(api_url)
+        endpoint = endpoint_prefix(path)
+        if endpoint not in self.endpoints:
+            return None
+        record_read(endpoint)
+        detail_id = [s for s in path.split('/') if s][-1]
+        if not detail_id.isdigit() and path.rstrip('/') + '/' != endpoint:
+            return None  # nested routes such as available-ips
+
+        raw_limit, raw_offset = params.pop('limit', 50), params.pop('offset', 0)
+        if any(key not in MIRROR_FILTERS for key in params):
+            return None
+
+        if self.is_written(endpoint):
+            return None  # written since the last sync
+
+        try:
+            limit, offset = int(raw_limit or 0), int(raw_offset or 0)
+            if all_pages or limit == 0:
+                # The whole list, capped as NetBoxController.get_all caps it
+                limit = DEFAULT_MAX_OBJECTS if max_objects is None else int(max_objects)
+                offset = 0 if all_pages else offset
+            else:
+                # NetBox caps one page at MAX_PAGE_SIZE (1000 by default)
+                limit = min(limit, DEFAULT_MAX_OBJECTS)
+            limit, offset = max(0, limit), max(0, offset)
+            staleness = self.staleness(endpoint)
+            if staleness is None or staleness > self.max_staleness:
+                return None
+
+            clauses, values = ["endpoint = %s"], [endpoint]
+            if detail_id.isdigit():
+                clauses.append("object_id = %s")
+                values.append(int(detail_id))
+            for key, value in params.items():
+                clauses.append(f"{MIRROR_FILTERS[key]} = %s")
+                values.append(value)
+            where = " AND ".join(clauses)
+
+            with self._connection().cursor() as cursor:
+                cursor.execute(f"SELECT COUNT(*) FROM nbmirror_objects WHERE {where}", values)
+                count = cursor.fetchone()[0]
+                sql = (f"SELECT data FROM nbmirror_objects WHERE {where} ORDER BY object_id "
+                       f"LIMIT {limit} OFFSET {offset}")
+                cursor.execute(sql, values)
+                results = [json.loads(row[0]) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.warning(f"Mirror read failed, falling back to NetBox: {e}")
+            return None
+
+        mirror_info = {'source': 'mysql-mirror', 'staleness_seconds': round(staleness, 1)}
+        if detail_id.isdigit():
+            if not results:
+                return None
+            return dict(results[0], _mirror=mirror_info)
+        return {
+            'count': count,
+            'returned': len(results),
+            'truncated': len(results) < count,
+            'results': results,
+            '_mirror': mirror_info,
+        }
+
+
+_mirror: Optional[NetBoxMirror] = None
+_mirror_lock = threading.Lock()
+
+
+def _mysql_config_from_env_or_file() -> Dict[str, str]:
+    try:
+        from config_loader import ConfigLoader
+        return ConfigLoader().get_mysql_config()
+    except Exception:
+        return {key: os.getenv(key, '') for key in ('DB_HOST', 'DB_USER', 'DB_PASSWORD', 'DB_PORT', 'DB_NAME')}
+
+
+def get_mirror(mysql_config: Dict[str, str] = None, netbox_url: str = None, api_token: str = None) -> Optional[NetBoxMirror]:
+    """Return the process-wide mirror when NETBOX_MIRROR is enabled, else None"""
+    global _mirror
+    if os.getenv('NETBOX_MIRROR', 'false').lower() not in ('1', 'true', 'yes'):
+        return None
+    with _mirror_lock:
+        if _mirror is None:
+            netbox_url = netbox_url or os.getenv('NETBOX_URL')
+            api_token = api_token or os.getenv('NETBOX_TOKEN')
+            # The mirror must see live data, so it bypasses the response cache
+            controller = NetBoxController(netbox_url, api_token, use_cache=False)
+            _mirror = NetBoxMirror(
+                mysql_config or _mysql_config_from_env_or_file(),
+                controller,
+                max_staleness=float(os.getenv('MIRROR_MAX_STALENESS', 900)),
+                reconcile_every=int(os.getenv('MIRROR_RECONCILE_EVERY', 12)),
+            )
+        return _mirror
+
+
+if __name__ == "__main__":
+    # Run a single sync pass and print the mirror status
+    logging.basicConfig(level=logging.INFO)
+    os.environ.setdefault('NETBOX_MIRROR', 'true')
+    try:
+        from config_loader import ConfigLoader
+        netbox_config = ConfigLoader().get_netbox_config()
+    except Exception:
+        netbox_config = {'NETBOX_URL': os.getenv('NETBOX_URL'), 'NETBOX_TOKEN': os.getenv('NETBOX_TOKEN')}
+    mirror = get_mirror(netbox_url=netbox_config['NETBOX_URL'], api_token=netbox_config['NETBOX_TOKEN'])
+    mirror.ensure_schema()
+    mirror.sync_all()
+    print(json.dumps(mirror.status(), indent=2))
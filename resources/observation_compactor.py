@@ -0,0 +1,371 @@
+import os
+import re
+import time
+import logging
+import functools
+import threading
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Callable, Iterator, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from token_estimator import estimate_tokens, estimate_value_tokens, to_text
+
+logger = logging.getLogger(__name__)
+
+# Token budget of one tool observation in the agent scratchpad
+DEFAULT_BUDGET = int(os.getenv('OBSERVATION_TOKEN_BUDGET', 1500))
+# Full results kept for the final formatter
+STORE_SIZE = int(os.getenv('OBSERVATION_STORE_SIZE', 200))
+# Distinct values for a field to be summarized as a value -> count table
+AGGREGATE_MAX_VALUES = 8
+# Rows scanned when computing aggregates
+AGGREGATE_MAX_ROWS = 5000
+# Fields that identify rows rather than group them
+UNIQUE_FIELDS = {'id', 'url', 'display', 'name', 'slug', 'description', 'comments', 'serial', 'asset_tag',
+                 'address', 'prefix', 'cid', 'created', 'last_updated', 'mac_address', 'dns_name'}
+# How the agent cites a stored result in its final answer
+RESULT_REF = re.compile(r'\[result:(r\d+)\]')
+# Rows of a cited result listed in a chat reply
+REPLY_ROWS = int(os.getenv('REPLY_RESULT_ROWS', 20))
+# Row fields that name a row, first present wins, and details shown after the name
+ROW_TITLE_FIELDS = ('name', 'display', 'display_name', 'address', 'prefix', 'cid', 'vid', 'model', 'id')
+ROW_DETAIL_FIELDS = ('status', 'role', 'type', 'site', 'tenant', 'vrf')
+
+
+class ResultStore:
+    """Bounded LRU of full tool results, referenced by ``result_id``"""
+
+    def __init__(self, max_entries: int = STORE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def put(self, data: Any) -> str:
+        with self._lock:
+            self._next_id += 1
+            result_id = f"r{self._next_id}"
+            self._entries[result_id] = data
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return result_id
+
+    def get(self, result_id: str) -> Optional[Any]:
+        with self._lock:
+            return self._entries.get(result_id)
+
+
+class CompactionStats:
+    """Observation and per-conversation prompt token totals, with and without compaction"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.observations = 0
+        self.compacted = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self.conversations = 0
+        self.prompt_tokens = 0
+        self.prompt_tokens_uncompacted = 0
+
+    def record_observation(self, before: int, after: int):
+        with self._lock:
+            self.observations += 1
+            self.compacted += int(after < before)
+            self.tokens_before += before
+            self.tokens_after += after
+
+    def record_conversation(self, prompt_tokens: int, uncompacted: int):
+        with self._lock:
+            self.conversations += 1
+            self.prompt_tokens += prompt_tokens
+            self.prompt_tokens_uncompacted += uncompacted
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            per_conversation = self.prompt_tokens / self.conversations if self.conversations else 0
+            uncompacted = self.prompt_tokens_uncompacted / self.conversations if self.conversations else 0
+            return {
+                'observations': self.observations,
+                'compacted': self.compacted,
+                'observation_tokens_before': self.tokens_before,
+                'observation_tokens_after': self.tokens_after,
+                'conversations': self.conversations,
+                'prompt_tokens_per_conversation': round(per_conversation),
+                'prompt_tokens_per_conversation_uncompacted': round(uncompacted),
+            }
+
+
+class TokenMeter(BaseCallbackHandler):
+    """Counts the prompt tokens of one conversation's LLM calls
+
+    Every LLM call re-sends the scratchpad, so each token removed from an
+    observation is saved once per later call. The uncompacted total adds the
+    savings so far to every call, giving the cost without compaction.
+    """
+
+    def __init__(self):
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.uncompacted_tokens = 0
+        self.saved_so_far = 0
+        self.started = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        tokens = sum(estimate_tokens(p) for p in prompts)
+        self.llm_calls += 1
+        self.prompt_tokens += tokens
+        self.uncompacted_tokens += tokens + self.saved_so_far
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        text = ''.join(str(getattr(m, 'content', m)) for batch in messages for m in batch)
+        self.on_llm_start(serialized, [text])
+
+
+_current_meter: ContextVar[Optional[TokenMeter]] = ContextVar('observation_token_meter', default=None)
+
+
+def _label(value: Any) -> Any:
+    """Reduce a field value to something hashable worth counting"""
+    if isinstance(value, dict):
+        if 'value' in value and 'label' in value:
+            return value['value']
+        for key in ('name', 'display', 'slug', 'vid', 'address', 'id'):
+            if value.get(key) is not None:
+                return value[key]
+        return None
+    if isinstance(value, (list, tuple)):
+        return None
+    return value
+
+
+def format_row(row: Any) -> str:
+    """One line for a raw or projected NetBox row
+
+    Choice fields may be ``{'value', 'label'}`` dicts or, after projection,
+    plain strings; nested objects may be full or reduced to a few keys.
+    """
+    if not isinstance(row, dict):
+        return str(row)
+    title = next((_label(row[f]) for f in ROW_TITLE_FIELDS if _label(row.get(f)) not in (None, '')), None)
+    line = f"**{title}**" if title is not None else to_text(row)
+    details = [f"{f.capitalize()}: {_label(row[f])}" for f in ROW_DETAIL_FIELDS
+               if _label(row.get(f)) not in (None, '')]
+    return line + (f" ({', '.join(details)})" if details else '')
+
+
+def format_result_rows(data: Any, limit: int = REPLY_ROWS) -> str:
+    """A list result as numbered lines for a chat reply, up to ``limit`` rows; other data as JSON"""
+    if not (isinstance(data, dict) and isinstance(data.get('results'), list)):
+        return to_text(data)
+    rows = data['results']
+    if not rows:
+        return "No results found."
+    total = max(data.get('count') or 0, len(rows))
+    lines = [f"Found {total} result(s):", '']
+    lines += [f"*{i + 1}.* {format_row(row)}" for i, row in enumerate(rows[:limit])]
+    if total > limit:
+        lines += ['', f"... and {total - limit} more results"]
+    return '\n'.join(lines)
+
+
+def aggregate(rows: List[Dict[str, Any]]) -> Dict[str, Dict[str, int]]:
+    """Value counts for fields that group rows (status, site, role, ...)"""
+    counters: Dict[str, Counter] = {}
+    for row in rows[:AGGREGATE_MAX_ROWS]:
+        if not isinstance(row, dict):
+            continue
+        for field, value in row.items():
+            if field in UNIQUE_FIELDS or field.startswith('_'):
+                continue
+            label = _label(value)
+            if label is not None and label != '':
+                counters.setdefault(field, Counter())[str(label)] += 1
+    scanned = min(len(rows), AGGREGATE_MAX_ROWS)
+    aggregates = {}
+    for field, counter in counters.items():
+        if len(counter) <= AGGREGATE_MAX_VALUES:
+            aggregates[field] = dict(counter.most_common())
+        elif counter.most_common(1)[0][1] > 1 and len(counter) <= scanned // 2:
+            top = counter.most_common(5)
+            aggregates[field] = dict(top, **{'(other)': scanned - sum(c for _, c in top)})
+    return aggregates
+
+
+def sample_order(rows: List[Any], aggregates: Dict[str, Dict[str, int]]) -> List[int]:
+    """Row indices, most representative first
+
+    The first row, then one row per value of each grouping field (fewest
+    values first), then evenly spaced rows.
+    """
+    order, chosen = [], set()
+
+    def take(index: int):
+        if index not in chosen:
+            chosen.add(index)
+            order.append(index)
+
+    if rows:
+        take(0)
+    for field in sorted(aggregates, key=lambda f: len(aggregates[f])):
+        seen = set()
+        for index, row in enumerate(rows[:AGGREGATE_MAX_ROWS]):
+            label = str(_label(row.get(field))) if isinstance(row, dict) else None
+            if label not in seen and label in aggregates[field]:
+                seen.add(label)
+                take(index)
+    step = max(1, len(rows) // 20)
+    for index in range(0, len(rows), step):
+        take(index)
+    for index in range(len(rows)):
+        take(index)
+    return order
+
+
+class ObservationCompactor:
+    """Fits tool observations into a token budget before they reach the scratchpad
+
+    Lists over budget keep their count, per-field aggregates and a sample of
+    representative rows; the full result goes to a side store under a
+    ``result_id`` the final answer can cite as ``[result:<id>]``.
+    """
+
+    def __init__(self, budget: int = DEFAULT_BUDGET, store: ResultStore = None):
+        self.budget = budget
+        self.store = store or ResultStore()
+        self.stats = CompactionStats()
+
+    def compact_list(self, data: Dict[str, Any], budget: int) -> Dict[str, Any]:
+        rows = data['results']
+        result_id = self.store.put(data)
+        compacted = {k: v for k, v in data.items() if k not in ('results', 'next', 'previous')}
+        compacted.setdefault('count', len(rows))
+        compacted['returned'] = len(rows)
+        compacted['aggregates'] = aggregate(rows)
+        compacted['sample'] = []
+        compacted['result_id'] = result_id
+        used = estimate_value_tokens(compacted) + 40
+        for index in sample_order(rows, compacted['aggregates']):
+            row_tokens = estimate_value_tokens(rows[index]) + 1
+            if used + row_tokens > budget and compacted['sample']:
+                break
+            compacted['sample'].append(rows[index])
+            used += row_tokens
+        compacted['compacted'] = (f"Showing {len(compacted['sample'])} of {len(rows)} rows; aggregates cover all "
+                                  f"{len(rows)}. Full result stored as [result:{result_id}].")
+        return compacted
+
+    def compact_value(self, data: Any, budget: int) -> Any:
+        if estimate_value_tokens(data) <= budget:
+            return data
+        if isinstance(data, dict) and isinstance(data.get('results'), list):
+            return self.compact_list(data, budget)
+        if isinstance(data, dict):
+            # e.g. flattened GraphQL: one list per queried field
+            lists = [k for k, v in data.items() if isinstance(v, dict) and isinstance(v.get('results'), list)]
+            if lists:
+                share = max(200, budget // len(lists))
+                return {k: self.compact_value(v, share) if k in lists else v for k, v in data.items()}
+        # A single large object: keep the start and point at the full copy
+        result_id = self.store.put(data)
+        text = to_text(data)
+        return {
+            'partial': text[:budget * 4],
+            'result_id': result_id,
+            'compacted': f"Truncated to {budget} tokens. Full result stored as [result:{result_id}].",
+        }
+
+    def compact(self, data: Any) -> Any:
+        before = estimate_value_tokens(data)
+        compacted = self.compact_value(data, self.budget) if isinstance(data, dict) and 'error' not in data else data
+        after = estimate_value_tokens(compacted) if compacted is not data else before
+        self.stats.record_observation(before, after)
+        meter = _current_meter.get()
+        if meter is not None and after < before:
+            meter.saved_so_far += before - after
+        return compacted
+
+    def wrap_tool(self, tool):
+        """Copy of a LangChain tool whose sync and async results are compacted"""
+        update = {}
+        if getattr(tool, 'func', None) is not None:
+            func = tool.func
+
+            @functools.wraps(func)
+            def run(*args, **kwargs):
+                return self.compact(func(*args, **kwargs))
+            update['func'] = run
+        if getattr(tool, 'coroutine', None) is not None:
+            coroutine = tool.coroutine
+
+            @functools.wraps(coroutine)
+            async def arun(*args, **kwargs):
+                return self.compact(await coroutine(*args, **kwargs))
+            update['coroutine'] = arun
+        return tool.model_copy(update=update)
+
+    def expand_results(self, text: str, formatter: Callable[[Any], str]) -> str:
+        """Replace ``[result:<id>]`` citations in a final answer with the formatted full results"""
+        def replace(match):
+            data = self.store.get(match.group(1))
+            return f"\n{formatter(data)}\n" if data is not None else ''
+        return RESULT_REF.sub(replace, text or '')
+
+
+_compactor: Optional[ObservationCompactor] = None
+_compactor_lock = threading.Lock()
+
+
+def get_compactor() -> ObservationCompactor:
+    """Return the process-wide compactor"""
+    global _compactor
+    with _compactor_lock:
+        if _compactor is None:
+            _compactor = ObservationCompactor()
+        return _compactor
+
+
+def compact_tools(tools: List[Any]) -> List[Any]:
+    """Tools for the AgentExecutor with compacted observations, unless OBSERVATION_COMPACTION is off"""
+    if os.getenv('OBSERVATION_COMPACTION', 'true').lower() not in ('1', 'true', 'yes'):
+        return tools
+    compactor = get_compactor()
+    return [compactor.wrap_tool(tool) for tool in tools]
+
+
+@contextmanager
+def measure_conversation() -> Iterator[TokenMeter]:
+    """Meter one agent run; pass the yielded handler in the invoke config's callbacks"""
+    meter = TokenMeter()
+    token = _current_meter.set(meter)
+    try:
+        yield meter
+    finally:
+        _current_meter.reset(token)
+        if meter.llm_calls:
+            get_compactor().stats.record_conversation(meter.prompt_tokens, meter.uncompacted_tokens)
+
+
+def current_meter() -> Optional[TokenMeter]:
+    """The meter of the conversation being measured in this context, if any"""
+    return _current_meter.get()
+
+
+def stored_results(text: str) -> List[Any]:
+    """Full results cited as ``[result:<id>]`` in a final answer"""
+    store = get_compactor().store
+    return [data for data in (store.get(rid) for rid in RESULT_REF.findall(text or '')) if data is not None]
+
+
+def expand_results(text: str, formatter: Callable[[Any], str]) -> str:
+    return get_compactor().expand_results(text, formatter)
+
+
+def get_compactor_stats() -> Dict[str, Any]:
+    """Return compaction statistics, if the compactor exists"""
+    if _compactor is None:
+        return {}
+    return _compactor.stats.snapshot()
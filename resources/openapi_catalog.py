@@ -0,0 +1,224 @@
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout of generated entries changes
+CATALOG_FORMAT = 1
+SCHEMA_URL = '/api/schema/?format=json'
+
+# Query parameters every list endpoint has; not worth listing per endpoint
+COMMON_PARAMS = {'limit', 'offset', 'ordering', 'format', 'brief', 'fields', 'exclude', 'omit'}
+# Segments spelled in capitals in endpoint names
+ACRONYMS = {'ip', 'ips', 'vlan', 'vlans', 'vrf', 'vrfs', 'asn', 'asns', 'rir', 'rirs', 'vm', 'l2vpn', 'l2vpns',
+            'fhrp', 'ike', 'ipsec', 'api', 'id'}
+_DETAIL = re.compile(r'^(?P<list>/api/.+/)\{[^/]+\}/$')
+_METHODS = ('get', 'post', 'put', 'patch', 'delete')
+
+
+def endpoint_name(url: str) -> str:
+    """'/api/ipam/ip-addresses/' -> 'IP Addresses'"""
+    model = [s for s in url.split('/') if s][-1]
+    return ' '.join(w.upper() if w in ACRONYMS else w.capitalize() for w in model.split('-'))
+
+
+def _resolve(schema: Dict[str, Any], node: Any, depth: int = 0) -> Dict[str, Any]:
+    """Follow $ref and pick the object variant of oneOf/anyOf/allOf and arrays"""
+    if not isinstance(node, dict) or depth > 8:
+        return {}
+    if '$ref' in node:
+        target = schema
+        for part in node['$ref'].lstrip('#/').split('/'):
+            target = target.get(part, {})
+        return _resolve(schema, target, depth + 1)
+    for key in ('oneOf', 'anyOf', 'allOf'):
+        for variant in node.get(key, []):
+            resolved = _resolve(schema, variant, depth + 1)
+            if resolved.get('properties'):
+                return resolved
+    if node.get('type') == 'array':
+        return _resolve(schema, node.get('items'), depth + 1)
+    return node
+
+
+def _json_body(schema: Dict[str, Any], operation: Dict[str, Any]) -> Dict[str, Any]:
+    content = (operation.get('requestBody') or {}).get('content', {})
+    body = content.get('application/json') or next(iter(content.values()), {})
+    return _resolve(schema, body.get('schema'))
+
+
+def _filters(operation: Dict[str, Any]) -> List[str]:
+    """Query filters of a list GET, collapsed to base names (name__ic -> name)"""
+    names = []
+    for param in operation.get('parameters', []):
+        if param.get('in') != 'query':
+            continue
+        base = param['name'].split('__', 1)[0]
+        if base not in COMMON_PARAMS and base not in names:
+            names.append(base)
+    return names
+
+
+def build_entries(schema: Dict[str, Any], curated: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Extract list endpoints with methods, filters and required fields from an OpenAPI schema
+
+    Names and field profiles from the curated netbox_apis.json are kept for the
+    endpoints it lists; other endpoints get names derived from their path.
+    """
+    curated_by_url = {entry['URL']: entry for entry in curated or []}
+    paths = schema.get('paths', {})
+    endpoints: Dict[str, Dict[str, Any]] = {}
+
+    for path, operations in paths.items():
+        detail = _DETAIL.match(path)
+        url = detail.group('list') if detail else path
+        if '{' in url or not url.startswith('/api/') or url in ('/api/', '/api/schema/'):
+            continue
+        entry = endpoints.setdefault(url, {'methods': set(), 'list': None, 'create': None})
+        for method in _METHODS:
+            if method in operations:
+                entry['methods'].add(method.upper())
+        if not detail:
+            entry['list'] = operations.get('get')
+            entry['create'] = operations.get('post')
+
+    entries = []
+    for url in sorted(endpoints):
+        info = endpoints[url]
+        curated_entry = curated_by_url.get(url, {})
+        entry = {'URL': url, 'Name': curated_entry.get('Name') or endpoint_name(url)}
+        entry['Methods'] = [m for m in ('GET', 'POST', 'PUT', 'PATCH', 'DELETE') if m in info['methods']]
+        if info['list']:
+            filters = _filters(info['list'])
+            if filters:
+                entry['Filters'] = filters
+        if info['create']:
+            required = _json_body(schema, info['create']).get('required', [])
+            if required:
+                entry['Required'] = list(required)
+        if curated_entry.get('Fields'):
+            entry['Fields'] = list(curated_entry['Fields'])
+        entries.append(entry)
+    return entries
+
+
+def build_catalog(schema: Dict[str, Any], curated: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Wrap generated entries with the version stamp used to detect stale caches"""
+    digest = hashlib.sha256(json.dumps(schema.get('paths', {}), sort_keys=True).encode()).hexdigest()[:16]
+    return {
+        'format': CATALOG_FORMAT,
+        'netbox_version': (schema.get('info') or {}).get('version'),
+        'schema_sha256': digest,
+        'generated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'entries': build_entries(schema, curated),
+    }
+
+
+def write_catalog(catalog: Dict[str, Any], path: str):
+    """Write compact JSON atomically so readers never see a partial file"""
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(catalog, f, separators=(',', ':'))
+    os.replace(tmp, path)
+
+
+def read_stamp(path: str) -> Optional[Dict[str, Any]]:
+    """Return the version stamp of a generated catalog, or None if absent or outdated"""
+    try:
+        with open(path, 'r') as f:
+            catalog = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(catalog, dict) or catalog.get('format') != CATALOG_FORMAT:
+        return None
+    return {k: v for k, v in catalog.items() if k != 'entries'}
+
+
+def load_schema_file(path: str) -> Dict[str, Any]:
+    with open(path, 'r') as f:
+        if path.endswith(('.yaml', '.yml')):
+            import yaml  # optional dependency
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def fetch_schema(controller=None) -> Dict[str, Any]:
+    """Download the OpenAPI schema from NetBox"""
+    if controller is None:
+        from netbox_client import get_netbox_controller
+        controller = get_netbox_controller()
+    # The schema is large and changes only with NetBox upgrades: skip the response cache
+    response = controller._request('GET', SCHEMA_URL)
+    response.raise_for_status()
+    return response.json()
+
+
+def refresh_catalog(output: str = None, schema_file: str = None, controller=None) -> Dict[str, Any]:
+    """Build the catalog from a schema file or the live NetBox and write it to ``output``"""
+    from api_catalog import curated_api_file, generated_catalog_file
+
+    output = output or generated_catalog_file()
+    start = time.monotonic()
+    schema = load_schema_file(schema_file) if schema_file else fetch_schema(controller)
+    curated = []
+    try:
+        with open(curated_api_file(), 'r') as f:
+            curated = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Building the catalog without curated names: {e}")
+    catalog = build_catalog(schema, curated)
+    write_catalog(catalog, output)
+    logger.info(f"Wrote {len(catalog['entries'])} endpoints from NetBox {catalog['netbox_version']} "
+                f"schema to {output} in {time.monotonic() - start:.1f}s")
+    return catalog
+
+
+def ensure_catalog_in_background(max_age: float = None) -> Optional[threading.Thread]:
+    """Regenerate the catalog from NetBox when NETBOX_OPENAPI_CATALOG is on and it is missing or old"""
+    if os.getenv('NETBOX_OPENAPI_CATALOG', 'false').lower() not in ('1', 'true', 'yes'):
+        return None
+    from api_catalog import generated_catalog_file
+
+    path = generated_catalog_file()
+    max_age = float(os.getenv('NETBOX_OPENAPI_MAX_AGE', 86400)) if max_age is None else max_age
+    stamp = read_stamp(path)
+    if stamp is not None and time.time() - os.path.getmtime(path) < max_age:
+        return None
+
+    def run():
+        try:
+            refresh_catalog(path)
+        except Exception as e:
+            logger.error(f"Could not build the API catalog from the OpenAPI schema: {e}")
+
+    thread = threading.Thread(target=run, name='netbox-openapi-catalog', daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Generate the API catalog from NetBox's OpenAPI schema")
+    parser.add_argument('--schema', help="Local schema file (JSON, or YAML with PyYAML); default: fetch from NETBOX_URL")
+    parser.add_argument('--output', help="Catalog path; default: NETBOX_CATALOG_FILE or netbox_catalog.json")
+    args = parser.parse_args()
+    if not args.schema:
+        try:
+            from config_loader import ConfigLoader
+            netbox_config = ConfigLoader().get_netbox_config()
+            os.environ.setdefault('NETBOX_URL', netbox_config['NETBOX_URL'])
+            os.environ.setdefault('NETBOX_TOKEN', netbox_config['NETBOX_TOKEN'])
+        except Exception:
+            pass
+    catalog = refresh_catalog(args.output, args.schema)
+    json.dump({k: v for k, v in catalog.items() if k != 'entries'}, sys.stdout, indent=2)
+    print(f"\n{len(catalog['entries'])} endpoints")
@@ -0,0 +1,173 @@
+import os
+import json
+import logging
+import threading
+from typing import Dict, Any, List, Optional
+
+from response_cache import endpoint_prefix
+from token_estimator import estimate_tokens
+from api_catalog import get_api_catalog
+
+logger = logging.getLogger(__name__)
+
+# Kept for endpoints without a profile in netbox_apis.json
+FALLBACK_DROP_KEYS = {
+    'url', 'display_url', 'created', 'last_updated', 'custom_fields', 'tags',
+    'comments', 'config_context', 'local_context_data', 'config_template', '_depth',
+}
+# What a nested object is reduced to
+NESTED_KEYS = ('id', 'name', 'slug', 'address', 'prefix', 'cid', 'vid', 'model', 'display')
+# NetBox "brief" representation
+BRIEF_FIELDS = ['id', 'display', 'name', 'slug', 'description']
+
+
+def compact_value(value: Any) -> Any:
+    """Collapse nested NetBox objects and choice fields to their identifying keys"""
+    if isinstance(value, dict):
+        if set(value) >= {'value', 'label'} and len(value) <= 3:
+            return value['value']
+        if 'id' in value or 'display' in value:
+            compact = {k: value[k] for k in NESTED_KEYS if value.get(k) not in (None, '')}
+            # display duplicates name for most objects
+            if 'display' in compact and len(compact) > 2:
+                compact.pop('display')
+            return compact
+        return {k: compact_value(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [compact_value(v) for v in value]
+    return value
+
+
+class ProjectionStats:
+    """Running totals of bytes and tokens removed before results reach the LLM"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.bytes_before = 0
+        self.bytes_after = 0
+        self.tokens_saved = 0
+
+    def record(self, before: int, after: int, tokens_saved: int):
+        with self._lock:
+            self.calls += 1
+            self.bytes_before += before
+            self.bytes_after += after
+            self.tokens_saved += tokens_saved
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'bytes_before': self.bytes_before,
+                'bytes_after': self.bytes_after,
+                'bytes_saved': self.bytes_before - self.bytes_after,
+                'tokens_saved_est': self.tokens_saved,
+            }
+
+
+class FieldProjector:
+    """Shrinks NetBox responses to the fields worth showing the LLM
+
+    Per-endpoint field profiles come from the optional ``Fields`` list of each
+    entry in netbox_apis.json. When the server supports dynamic fields (NetBox
+    4.0+) the profile is also sent as ``?fields=`` so less data is transferred.
+    """
+
+    def __init__(self, profiles: Dict[str, List[str]], server_fields: bool = True):
+        self.profiles = profiles
+        self.server_fields = server_fields
+        self.stats = ProjectionStats()
+
+    @classmethod
+    def from_file(cls, file_path: str = None, server_fields: bool = True) -> "FieldProjector":
+        catalog = get_api_catalog(file_path)
+        if catalog.error:
+            logger.warning(f"No field profiles loaded: {catalog.error}")
+        profiles = {endpoint_prefix(entry['URL']): list(entry['Fields'])
+                    for entry in catalog.entries if entry.get('Fields')}
+        return cls(profiles, server_fields=server_fields)
+
+    def fields_for(self, request: Dict[str, Any]) -> Optional[List[str]]:
+        """Fields to keep for a tool request, or None to only strip noise"""
+        if request.get('fields'):
+            fields = request['fields']
+            return fields.split(',') if isinstance(fields, str) else list(fields)
+        if request.get('brief'):
+            return BRIEF_FIELDS
+        return self.profiles.get(endpoint_prefix(request['api_url']))
+
+    def request_params(self, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Query parameters asking NetBox for a reduced representation"""
+        if request.get('full'):
+            return None
+        if request.get('brief'):
+            return {'brief': 'true'}
+        fields = self.fields_for(request)
+        if fields and self.server_fields:
+            return {'fields': ','.join(fields)}
+        return None
+
+    def project_object(self, obj: Any, fields: Optional[List[str]]) -> Any:
+        if not isinstance(obj, dict):
+            return obj
+        if fields:
+            kept = {k: obj[k] for k in fields if k in obj}
+        else:
+            kept = {k: v for k, v in obj.items()
+                    if k not in FALLBACK_DROP_KEYS and v not in (None, '', [], {})}
+        return {k: compact_value(v) for k, v in kept.items()}
+
+    def project(self, request: Dict[str, Any], data: Any) -> Any:
+        """Project a NetBox response and attach a per-call savings report"""
+        if request.get('full') or not isinstance(data, dict) or 'error' in data:
+            return data
+        fields = self.fields_for(request)
+        if isinstance(data.get('results'), list):
+            projected = {k: v for k, v in data.items() if k not in ('next', 'previous', 'results')}
+            projected['results'] = [self.project_object(obj, fields) for obj in data['results']]
+        else:
+            projected = self.project_object(data, fields)
+            for key in ('_mirror',):
+                if key in data:
+                    projected[key] = data[key]
+
+        before_text = json.dumps(data, separators=(',', ':'), default=str)
+        after_text = json.dumps(projected, separators=(',', ':'), default=str)
+        tokens_saved = max(0, estimate_tokens(before_text) - estimate_tokens(after_text))
+        self.stats.record(len(before_text), len(after_text), tokens_saved)
+        projected['_projection'] = {
+            'bytes_saved': len(before_text) - len(after_text),
+            'tokens_saved_est': tokens_saved,
+        }
+        logger.debug(f"Projected {request['api_url']}: {len(before_text)} -> {len(after_text)} bytes, "
+                     f"~{tokens_saved} tokens saved")
+        return projected
+
+
+_projector: Optional[FieldProjector] = None
+_projector_lock = threading.Lock()
+
+
+def get_projector() -> FieldProjector:
+    """Return the process-wide FieldProjector"""
+    global _projector
+    with _projector_lock:
+        if _projector is None:
+            server_fields = os.getenv('NETBOX_SERVER_FIELDS', 'true').lower() in ('1', 'true', 'yes')
+            _projector = FieldProjector.from_file(server_fields=server_fields)
+        return _projector
+
+
+def projection_params(request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    return get_projector().request_params(request)
+
+
+def project_response(request: Dict[str, Any], data: Any) -> Any:
+    return get_projector().project(request, data)
+
+
+def get_projection_stats() -> Dict[str, Any]:
+    if _projector is None:
+        return {}
+    return _projector.stats.snapshot()
@@ -0,0 +1,147 @@
+import os
+import time
+import random
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Statuses that mean "try again later" rather than "your request is wrong"
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling NetBox while the circuit breaker is open"""
+
+    def __init__(self, retry_in: float):
+        self.retry_in = retry_in
+        super().__init__(f"NetBox is unhealthy; circuit breaker open, retrying in {retry_in:.0f}s")
+
+
+class RetryPolicy:
+    """Jittered exponential backoff that honours Retry-After"""
+
+    def __init__(self, max_retries: int = 3, backoff_base: float = 0.5,
+                 backoff_max: float = 8.0, retry_after_max: float = 30.0):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # Never sleep longer than this, whatever the server asks for
+        self.retry_after_max = retry_after_max
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        return cls(
+            max_retries=int(os.getenv('NETBOX_RETRIES', 3)),
+            backoff_base=float(os.getenv('NETBOX_BACKOFF_BASE', 0.5)),
+            backoff_max=float(os.getenv('NETBOX_BACKOFF_MAX', 8.0)),
+            retry_after_max=float(os.getenv('NETBOX_RETRY_AFTER_MAX', 30.0)),
+        )
+
+    def delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Seconds to wait before retry number ``attempt`` (0-based)"""
+        requested = parse_retry_after(retry_after)
+        if requested is not None:
+            return min(requested, self.retry_after_max)
+        # Full jitter spreads retries from many Slack handlers apart
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given as seconds or an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker shared by every client of one NetBox
+
+    After ``failure_threshold`` consecutive failures the breaker opens and calls
+    fail immediately for ``reset_timeout`` seconds. Then one trial call is let
+    through; its success closes the breaker, its failure re-opens it.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self.stats = {'opened': 0, 'short_circuited': 0, 'failures': 0, 'retries': 0}
+
+    def before_call(self):
+        """Raise CircuitOpenError if the call must not reach NetBox"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            elapsed = time.monotonic() - self.opened_at
+            if self.state == self.OPEN and elapsed >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            self.stats['short_circuited'] += 1
+            raise CircuitOpenError(max(0.0, self.reset_timeout - elapsed))
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("NetBox circuit breaker closed")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.stats['failures'] += 1
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.stats['opened'] += 1
+                    logger.warning(f"NetBox circuit breaker opened after "
+                                   f"{self.consecutive_failures} consecutive failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def record_retry(self):
+        with self._lock:
+            self.stats['retries'] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, state=self.state, consecutive_failures=self.consecutive_failures)
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(netbox_url: str) -> CircuitBreaker:
+    """Return the breaker for a NetBox instance, shared by sync and async clients"""
+    with _breakers_lock:
+        breaker = _breakers.get(netbox_url)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                failure_threshold=int(os.getenv('NETBOX_BREAKER_THRESHOLD', 5)),
+                reset_timeout=float(os.getenv('NETBOX_BREAKER_RESET', 30.0)),
+            )
+            _breakers[netbox_url] = breaker
+        return breaker
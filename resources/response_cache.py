@@ -0,0 +1,314 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Optional, Tuple
+from urllib.parse import urlencode, parse_qsl
+
+logger = logging.getLogger(__name__)
+
+# Default per-endpoint TTLs in seconds; reference data changes rarely,
+# operational objects more often. Override with NETBOX_CACHE_TTLS.
+DEFAULT_ENDPOINT_TTLS = {
+    '/api/dcim/sites/': 600,
+    '/api/dcim/regions/': 600,
+    '/api/dcim/site-groups/': 600,
+    '/api/dcim/locations/': 600,
+    '/api/dcim/manufacturers/': 1800,
+    '/api/dcim/device-types/': 1800,
+    '/api/dcim/device-roles/': 1800,
+    '/api/dcim/platforms/': 1800,
+    '/api/tenancy/tenants/': 600,
+    '/api/circuits/providers/': 600,
+    '/api/circuits/circuit-types/': 1800,
+    '/api/ipam/roles/': 1800,
+    '/api/ipam/rirs/': 1800,
+    '/api/ipam/ip-addresses/': 30,
+    '/api/dcim/interfaces/': 30,
+}
+
+
+def endpoint_prefix(api_url: str) -> str:
+    """Return the list-endpoint path an API URL belongs to
+
+    ``/api/dcim/devices/12/`` and ``/api/dcim/devices/?site=x`` both map to
+    ``/api/dcim/devices/``.
+    """
+    path = api_url.split('?', 1)[0]
+    segments = [s for s in path.split('/') if s]
+    while segments and segments[-1].isdigit():
+        segments.pop()
+    # /api/<app>/<model>/ is the endpoint (/api/plugins/<plugin>/<model>/ for plugins);
+    # anything deeper (e.g. available-ips) hangs off it
+    depth = 4 if segments[1:2] == ['plugins'] else 3
+    if len(segments) > depth and segments[0] == 'api':
+        segments = segments[:depth]
+    return '/' + '/'.join(segments) + '/' if segments else '/'
+
+
+def normalize_key(api_url: str, params: dict = None) -> str:
+    """Build a cache key from the URL path and sorted query parameters"""
+    path, _, query = api_url.partition('?')
+    if not path.endswith('/'):
+        path += '/'
+    merged = dict(parse_qsl(query, keep_blank_values=True))
+    for k, v in (params or {}).items():
+        merged[k] = v
+    items = sorted((k, str(v)) for k, v in merged.items())
+    return f"{path}?{urlencode(items)}" if items else path
+
+
+class CacheStats:
+    """Thread-safe hit/miss/eviction counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def incr(self, name: str, amount: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
+
+
+class MemoryCacheBackend:
+    """In-process LRU store bounded by total payload bytes"""
+
+    def __init__(self, max_bytes: int, stats: CacheStats):
+        self.max_bytes = max_bytes
+        self.stats = stats
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.stats.incr('expirations')
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.stats.incr('evictions')
+
+    def invalidate_prefix(self, prefix: str) -> int:
+        with self._lock:
+            keys = [k for k in self._entries if k.startswith(prefix)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: str):
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    def size(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes, 'max_bytes': self.max_bytes}
+
+
+class RedisCacheBackend:
+    """Redis store shared between bot replicas
+
+    Expiry is handled by Redis TTLs; byte-bounded LRU eviction is delegated to the
+    server (configure ``maxmemory`` with ``allkeys-lru``).
+    """
+
+    def __init__(self, redis_url: str, stats: CacheStats, namespace: str = 'netbox:'):
+        import redis  # optional dependency
+
+        self.client = redis.Redis.from_url(redis_url)
+        self.client.ping()
+        self.stats = stats
+        self.namespace = namespace
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.namespace + key)
+
+    def set(self, key: str, value: bytes, ttl: float):
+        self.client.set(self.namespace + key, value, ex=max(1, int(ttl)))
+
+    def invalidate_prefix(self, prefix: str) -> int:
+        keys = list(self.client.scan_iter(match=f"{self.namespace}{prefix}*", count=500))
+        if keys:
+            self.client.delete(*keys)
+        return len(keys)
+
+    def clear(self):
+        self.invalidate_prefix('')
+
+    def size(self) -> Dict[str, Any]:
+        return {'backend': 'redis'}
+
+
+class ResponseCache:
+    """TTL cache for NetBox GET responses with write-through invalidation"""
+
+    def __init__(self, backend, stats: CacheStats, default_ttl: float = 60,
+                 endpoint_ttls: Dict[str, float] = None):
+        self.backend = backend
+        self.stats = stats
+        self.default_ttl = default_ttl
+        self.endpoint_ttls = dict(DEFAULT_ENDPOINT_TTLS)
+        self.endpoint_ttls.update(endpoint_ttls or {})
+
+    def ttl_for(self, api_url: str) -> float:
+        return self.endpoint_ttls.get(endpoint_prefix(api_url), self.default_ttl)
+
+    def get_or_fetch(self, scope: str, api_url: str, params: dict, fetch: Callable[[], Any]) -> Any:
+        """Return a cached response or call ``fetch`` and store its result
+
+        ``scope`` separates NetBox instances and tokens sharing one backend.
+        """
+        key = self.make_key(scope, api_url, params)
+        cached = self.lookup(key)
+        if cached is not None:
+            return cached
+        data = fetch()
+        self.store(key, api_url, data)
+        return data
+
+    def make_key(self, scope: str, api_url: str, params: dict = None) -> str:
+        return scope + normalize_key(api_url, params)
+
+    def lookup(self, key: str) -> Any:
+        try:
+            cached = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Response cache lookup failed: {e}")
+            cached = None
+        if cached is None:
+            self.stats.incr('misses')
+            return None
+        self.stats.incr('hits')
+        return json.loads(cached)
+
+    def store(self, key: str, api_url: str, data: Any):
+        ttl = self.ttl_for(api_url)
+        if ttl <= 0:
+            return
+        try:
+            self.backend.set(key, json.dumps(data, separators=(',', ':')).encode(), ttl)
+        except Exception as e:
+            logger.warning(f"Response cache store failed: {e}")
+
+    def invalidate(self, scope: str, api_url: str) -> int:
+        """Drop every cached response under the endpoint that ``api_url`` belongs to"""
+        try:
+            removed = self.backend.invalidate_prefix(scope + endpoint_prefix(api_url))
+        except Exception as e:
+            logger.warning(f"Response cache invalidation failed: {e}")
+            return 0
+        self.stats.incr('invalidations', removed)
+        return removed
+
+    def invalidate_scope(self, scope: str) -> int:
+        """Drop every cached response of one NetBox instance and token"""
+        try:
+            removed = self.backend.invalidate_prefix(scope)
+        except Exception as e:
+            logger.warning(f"Response cache invalidation failed: {e}")
+            return 0
+        self.stats.incr('invalidations', removed)
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.stats.snapshot()
+        stats.update(self.backend.size())
+        return stats
+
+
+def cache_scope(netbox_url: str, api_token: str) -> str:
+    """Namespace cache keys by NetBox instance and token (permissions differ per token)"""
+    digest = hashlib.sha1(f"{netbox_url}|{api_token}".encode()).hexdigest()[:12]
+    return f"{digest}:"
+
+
+def parse_endpoint_ttls(value: str) -> Dict[str, float]:
+    """Parse NETBOX_CACHE_TTLS, e.g. '/api/dcim/sites/=600,/api/dcim/devices/=30'"""
+    ttls = {}
+    for item in (value or '').split(','):
+        if '=' in item:
+            endpoint, _, ttl = item.strip().partition('=')
+            try:
+                ttls[endpoint_prefix(endpoint)] = float(ttl)
+            except ValueError:
+                logger.warning(f"Ignoring invalid cache TTL entry: {item}")
+    return ttls
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Return the process-wide response cache configured from NETBOX_CACHE_* settings
+
+    NETBOX_CACHE is ``memory`` (default), ``redis`` or ``off``. The Redis backend
+    reads REDIS_URL and falls back to memory if Redis is unreachable.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is not None:
+            return _cache
+        mode = os.getenv('NETBOX_CACHE', 'memory').lower()
+        if mode in ('off', 'none', 'false', '0'):
+            return None
+
+        stats = CacheStats()
+        backend = None
+        if mode == 'redis':
+            try:
+                backend = RedisCacheBackend(os.getenv('REDIS_URL', 'redis://localhost:6379/0'), stats)
+            except Exception as e:
+                logger.warning(f"Redis response cache unavailable, using memory: {e}")
+        if backend is None:
+            max_bytes = int(os.getenv('NETBOX_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+            backend = MemoryCacheBackend(max_bytes, stats)
+
+        _cache = ResponseCache(
+            backend,
+            stats,
+            default_ttl=float(os.getenv('NETBOX_CACHE_TTL', 60)),
+            endpoint_ttls=parse_endpoint_ttls(os.getenv('NETBOX_CACHE_TTLS', '')),
+        )
+        return _cache
@@ -0,0 +1,117 @@
+import copy
+import asyncio
+import threading
+from typing import Dict, Any, Awaitable, Callable
+
+
+class SingleFlightStats:
+    """Counts requests that went out versus requests that piggybacked on them"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+
+    def record(self, coalesced: bool):
+        with self._lock:
+            if coalesced:
+                self.coalesced += 1
+            else:
+                self.executed += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.executed + self.coalesced
+            return {
+                'executed': self.executed,
+                'coalesced': self.coalesced,
+                'coalesced_ratio': round(self.coalesced / total, 4) if total else 0.0,
+            }
+
+
+# Shared by the threaded and asyncio groups so one counter covers the process
+_stats = SingleFlightStats()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapse concurrent identical calls from threads into one execution
+
+    The first caller for a key runs ``fn``; callers arriving while it is in
+    flight wait and receive a deep copy of the same result (or the same error),
+    so no caller can mutate another's data.
+    """
+
+    def __init__(self, stats: SingleFlightStats = None):
+        self.stats = stats or _stats
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        self.stats.record(coalesced=not leader)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    """asyncio counterpart of SingleFlight for callers on one event loop"""
+
+    def __init__(self, stats: SingleFlightStats = None):
+        self.stats = stats or _stats
+        self._calls: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._calls.get(key)
+        if future is not None:
+            self.stats.record(coalesced=True)
+            # shield: a cancelled waiter must not cancel the shared request
+            result = await asyncio.shield(future)
+            return copy.deepcopy(result)
+
+        self.stats.record(coalesced=False)
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await fn()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Retrieve the exception so it is not reported as unhandled when nobody waited
+            future.exception()
+            raise
+        finally:
+            self._calls.pop(key, None)
+
+
+def get_single_flight_stats() -> Dict[str, Any]:
+    return _stats.snapshot()
@@ -0,0 +1,35 @@
+import json
+from typing import Any
+
+# tiktoken is optional; without it tokens are approximated from characters
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:
+    _encoding = None
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate how many model tokens a string costs"""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def to_text(value: Any) -> str:
+    """Render a tool result the way it ends up in the prompt"""
+    if isinstance(value, str):
+        return value
+    try:
+        return json.dumps(value, separators=(',', ':'), default=str)
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def estimate_value_tokens(value: Any) -> int:
+    """Estimate the prompt tokens of a tool result"""
+    return estimate_tokens(to_text(value))
@@ -0,0 +1,166 @@
+import os
+import json
+import time
+import logging
+import threading
+import http.server
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STATUS_URL = '/api/status/'
+# Keep-alive connections opened to NetBox before the first request
+WARMUP_CONNECTIONS = int(os.getenv('NETBOX_WARMUP_CONNECTIONS', 4))
+
+# (status, content type, body) for a GET of a registered path
+Route = Callable[[], Tuple[int, str, bytes]]
+
+
+class Readiness:
+    """Outcome of each start-up step and whether the process can take requests"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.steps: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.started = time.time()
+        self.ready_at: Optional[float] = None
+
+    def run_step(self, name: str, func: Callable[[], Any], required: bool = True) -> bool:
+        start = time.perf_counter()
+        try:
+            func()
+            outcome = {'ok': True}
+        except Exception as e:
+            logger.error(f"Warm-up step {name} failed: {e}")
+            outcome = {'ok': False, 'error': str(e)}
+        outcome['ms'] = round((time.perf_counter() - start) * 1000, 1)
+        outcome['required'] = required
+        with self._lock:
+            self.steps[name] = outcome
+        logger.info(f"Warm-up step {name}: {'ok' if outcome['ok'] else 'failed'} in {outcome['ms']} ms")
+        return outcome['ok']
+
+    @property
+    def ready(self) -> bool:
+        with self._lock:
+            return self.ready_at is not None and all(s['ok'] for s in self.steps.values() if s['required'])
+
+    def mark_ready(self):
+        with self._lock:
+            self.ready_at = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        ready = self.ready
+        with self._lock:
+            return {
+                'ready': ready,
+                'startup_seconds': round(self.ready_at - self.started, 2) if self.ready_at else None,
+                'steps': {name: dict(step) for name, step in self.steps.items()},
+            }
+
+
+_readiness = Readiness()
+_routes: Dict[str, Route] = {}
+_server: Optional[http.server.ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def warm_netbox_pool(connections: int = None):
+    """Open keep-alive connections to NetBox so the first tool calls skip the TCP/TLS handshake"""
+    from netbox_client import get_netbox_controller
+
+    controller = get_netbox_controller()
+    connections = WARMUP_CONNECTIONS if connections is None else connections
+
+    def status(_):
+        # Straight to NetBox: a cached status response would not open a connection
+        controller._request('GET', STATUS_URL).raise_for_status()
+
+    with ThreadPoolExecutor(max_workers=max(1, connections)) as pool:
+        list(pool.map(status, range(max(1, connections))))
+
+
+def warm_api_catalog():
+    from api_catalog import get_api_catalog
+
+    catalog = get_api_catalog()
+    if catalog.error:
+        raise RuntimeError(catalog.error)
+
+
+def shared_warmup_steps() -> List[Tuple[str, Callable[[], Any], bool]]:
+    """Start-up steps both entry points run before taking requests"""
+    return [
+        ('api_catalog', warm_api_catalog, True),
+        ('netbox_pool', warm_netbox_pool, True),
+    ]
+
+
+def warm_up(steps: List[Tuple[str, Callable[[], Any], bool]]) -> bool:
+    """Run start-up steps in order and mark the process ready; returns whether every required step passed"""
+    results = [(_readiness.run_step(name, func, required), required) for name, func, required in steps]
+    ok = all(passed for passed, required in results if required)
+    _readiness.mark_ready()
+    logger.info(f"Warm-up finished: {'ready' if ok else 'not ready'} ({_readiness.snapshot()['startup_seconds']}s)")
+    return ok
+
+
+def llm_warmup_enabled() -> bool:
+    """WARMUP_LLM: also send one tiny model request at start-up (costs a few tokens)"""
+    return os.getenv('WARMUP_LLM', 'false').lower() in ('1', 'true', 'yes')
+
+
+def is_ready() -> bool:
+    return _readiness.ready
+
+
+def get_readiness() -> Dict[str, Any]:
+    """Return readiness and the outcome and duration of each warm-up step"""
+    return _readiness.snapshot()
+
+
+def register_route(path: str, route: Route):
+    """Serve ``route`` for GETs of ``path`` on the status server"""
+    _routes[path] = route
+
+
+def _json_route(status: int, body: Dict[str, Any]) -> Tuple[int, str, bytes]:
+    return status, 'application/json', json.dumps(body).encode()
+
+
+register_route('/health', lambda: _json_route(200, {'status': 'ok'}))
+register_route('/ready', lambda: _json_route(200 if is_ready() else 503, get_readiness()))
+
+
+class _StatusHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        route = _routes.get(self.path.split('?', 1)[0])
+        if route is None:
+            status, content_type, body = 404, 'text/plain', b'not found'
+        else:
+            status, content_type, body = route()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_status_server(port: int = None) -> Optional[http.server.ThreadingHTTPServer]:
+    """Serve /health and /ready (and other registered routes) on STATUS_PORT; 0 or unset disables it"""
+    global _server
+    port = int(os.getenv('STATUS_PORT', 0)) if port is None else port
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            _server = http.server.ThreadingHTTPServer((os.getenv('STATUS_HOST', '0.0.0.0'), port), _StatusHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name='status-server', daemon=True).start()
+            logger.info(f"Serving {', '.join(sorted(_routes))} on port {port}")
+        return _server
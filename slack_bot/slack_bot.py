@@ -1,23 +1,45 @@
 import os
+import sys
 import json
+import time
+import asyncio
 import logging
 import requests
-import difflib
+import httpx
 from slack_bolt import App
 from slack_bolt.adapter.socket_mode import SocketModeHandler
 from langchain_community.chat_models import ChatOpenAI
-from langchain.agents import AgentExecutor, create_react_agent
-from langchain.prompts import PromptTemplate
-from langchain_core.tools import tool, render_text_description
+from langchain_core.tools import tool
 import urllib3
 
+# Shared modules live in ../resources next to config_loader.py
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'resources'))
+from netbox_client import get_netbox_controller, get_client_stats, parse_get_input, parse_delete_input, is_unpaginated
+from netbox_mirror import get_mirror
+from projection import projection_params, project_response, get_projection_stats
+from name_resolver import get_name_resolver, get_resolver_stats, resolve_names, resolve_ids
+from api_catalog import get_api_catalog, check_url_support
+from openapi_catalog import ensure_catalog_in_background
+from graphql_queries import GraphQLError, parse_graphql_input, flatten_graphql, describe_templates
+from netbox_async import get_async_netbox_controller
+from intent_router import route_question, record_agent_latency, get_router_stats
+from answer_cache import lookup_answer, record_answer, start_answer_cache_polling, get_answer_cache_stats
+from observation_compactor import compact_tools, measure_conversation, expand_results, format_result_rows, get_compactor_stats
+from agent_factory import chain_tools, is_final_answer, record_agent_run, get_agent_stats
+from conversation_memory import get_memory_store, get_memory_stats
+from warmup import shared_warmup_steps, warm_up, llm_warmup_enabled, start_status_server
+from agent_stream import PLACEHOLDER, StreamingCallback, AsyncStreamingCallback, streaming_enabled, get_stream_stats
+from agent_metrics import metrics_callbacks
+from model_router import build_tiered_agent, tier_model, tiering_enabled, get_model_tier_stats
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-# Global variables for lazy initialization
+# Global variables, set up by the start-up warm-up (or lazily by the first message)
 llm = None
 agent_executor = None
+bot_user_id = None
 
 # Initialize Slack app
 try:
@@ -33,89 +55,18 @@ except:
 
 app = App(token=slack_bot_token)
 
-# NetBoxController for CRUD Operations
-class NetBoxController:
-    def __init__(self, netbox_url, api_token):
-        self.netbox = netbox_url.rstrip('/')
-        self.api_token = api_token
-        self.headers = {
-            'Accept': 'application/json',
-            'Authorization': f"Token {self.api_token}",
-        }
-
-    def get_api(self, api_url: str, params: dict = None):
-        response = requests.get(
-            f"{self.netbox}{api_url}",
-            headers=self.headers,
-            params=params,
-            verify=False
-        )
-        response.raise_for_status()
-        return response.json()
-
-    def post_api(self, api_url: str, payload: dict):
-        response = requests.post(
-            f"{self.netbox}{api_url}",
-            headers=self.headers,
-            json=payload,
-            verify=False
-        )
-        response.raise_for_status()
-        return response.json()
-
-    def delete_api(self, api_url: str):
-        response = requests.delete(
-            f"{self.netbox}{api_url}",
-            headers=self.headers,
-            verify=False
-        )
-        response.raise_for_status()
-        return response.json()
-
-# Function to load supported URLs with their names from a JSON file
-def load_urls(file_path='netbox_apis.json'):
-    if not os.path.exists(file_path):
-        return {"error": f"URLs file '{file_path}' not found."}
-    try:
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-        return [(entry['URL'], entry.get('Name', '')) for entry in data]
-    except Exception as e:
-        return {"error": f"Error loading URLs: {str(e)}"}
-
-def check_url_support(api_url: str) -> dict:
-    url_list = load_urls()
-    if "error" in url_list:
-        return url_list
-
-    urls = [entry[0] for entry in url_list]
-    names = [entry[1] for entry in url_list]
-
-    close_url_matches = difflib.get_close_matches(api_url, urls, n=1, cutoff=0.6)
-    close_name_matches = difflib.get_close_matches(api_url, names, n=1, cutoff=0.6)
-
-    if close_url_matches:
-        closest_url = close_url_matches[0]
-        matching_name = [entry[1] for entry in url_list if entry[0] == closest_url][0]
-        return {"status": "supported", "closest_url": closest_url, "closest_name": matching_name}
-    elif close_name_matches:
-        closest_name = close_name_matches[0]
-        closest_url = [entry[0] for entry in url_list if entry[1] == closest_name][0]
-        return {"status": "supported", "closest_url": closest_url, "closest_name": closest_name}
-    else:
-        return {"status": "unsupported", "message": f"The input '{api_url}' is not supported."}
-
 # Tools for interacting with NetBox
 @tool
-def discover_apis(dummy_input: str = None) -> dict:
-    """Discover available NetBox APIs from a local JSON file."""
+def discover_apis(query: str = "") -> dict:
+    """Discover NetBox APIs in the local API catalog: no input for the index of apps, or an app name or keywords to list matching endpoints."""
     try:
-        if not os.path.exists("netbox_apis.json"):
+        catalog = get_api_catalog()
+        if catalog.error:
             return {"error": "API JSON file not found. Please ensure 'netbox_apis.json' exists in the project directory."}
-        
-        with open("netbox_apis.json", "r") as f:
-            data = json.load(f)
-        return {"apis": data, "message": "APIs successfully loaded from JSON file"}
+        result = {**catalog.discover(query), "message": "APIs successfully loaded from JSON file"}
+        if catalog.meta.get("netbox_version"):
+            result["netbox_version"] = catalog.meta["netbox_version"]
+        return result
     except Exception as e:
         return {"error": f"An error occurred while loading the APIs: {str(e)}"}
 
@@ -132,28 +83,51 @@ def check_supported_url_tool(api_url: str) -> dict:
             "action": {
                 "next_tool": "get_netbox_data_tool",
                 "input": closest_url
-            }
+            },
+            # Methods, filter names and required create fields from the OpenAPI catalog
+            **{k: result[k] for k in ("methods", "filters", "required") if k in result}
         }
     return result
 
 @tool
 def get_netbox_data_tool(api_url: str) -> dict:
-    """Fetch data from NetBox."""
+    """Fetch data from NetBox. Input is an API URL, or a JSON string like {"api_url": "/api/dcim/interfaces/", "all_pages": true, "max_objects": 500} to read every page of a list endpoint. Results are trimmed to key fields; add "fields": ["name", ...] to choose fields, "brief": true for minimal objects or "full": true for the raw response."""
     try:
-        netbox_controller = NetBoxController(
-            netbox_url=os.getenv("NETBOX_URL"),
-            api_token=os.getenv("NETBOX_TOKEN")
-        )
-        data = netbox_controller.get_api(api_url)
-        return data
+        request = parse_get_input(api_url)
+        data = None
+        mirror = get_mirror()
+        if mirror is not None:
+            data = mirror.query(request["api_url"], all_pages=request.get("all_pages"), max_objects=request.get("max_objects"))
+        if data is None:
+            netbox_controller = get_netbox_controller()
+            params = projection_params(request)
+            # limit=0 is streamed and capped at max_objects instead of loading the whole list
+            if request.get("all_pages") or is_unpaginated(request["api_url"]):
+                data = netbox_controller.get_all(request["api_url"], params=params, max_objects=request.get("max_objects"))
+            else:
+                data = netbox_controller.get_api(request["api_url"], params=params)
+        return project_response(request, data)
     except requests.HTTPError as e:
         return {"error": f"Failed to fetch data from NetBox: {str(e)}"}
     except Exception as e:
         return {"error": f"An unexpected error occurred: {str(e)}"}
 
+@tool
+def graphql_netbox_tool(query: str) -> dict:
+    """Query NetBox's GraphQL API in one call for questions that join related objects (e.g. devices in a site with interfaces on a VLAN). Input is a JSON string {"template": "site_devices_on_vlan", "variables": {"site": "dc1", "vid": 100}} or {"query": "{ device_list { name } }"}. Templates: site_devices_on_vlan(site, vid), site_devices(site), device_interfaces(device), ip_address_owner(address), vlan_prefixes(vid), provider_circuits(provider)."""
+    try:
+        netbox_controller = get_netbox_controller()
+        return flatten_graphql(netbox_controller.graphql(parse_graphql_input(query)))
+    except GraphQLError as e:
+        return {"error": str(e), "templates": describe_templates()}
+    except requests.HTTPError as e:
+        return {"error": f"Failed to query NetBox GraphQL: {str(e)}"}
+    except Exception as e:
+        return {"error": f"An unexpected error occurred: {str(e)}"}
+
 @tool
 def create_netbox_data_tool(input: str) -> dict:
-    """Create new data in NetBox."""
+    """Create new data in NetBox. Input is a JSON string {"api_url": ..., "payload": {...}}; pass a list of payloads to create many objects in one call. Reference fields such as site, role, device_type, platform or tenant accept names or slugs instead of IDs."""
     try:
         data = json.loads(input)
         api_url = data.get("api_url")
@@ -162,31 +136,117 @@ def create_netbox_data_tool(input: str) -> dict:
         if not api_url or not payload:
             raise ValueError("Both 'api_url' and 'payload' must be provided.")
 
+        netbox_controller = get_netbox_controller()
+        if isinstance(payload, list):
+            if not all(isinstance(item, dict) for item in payload):
+                raise ValueError("Every payload in the list must be a dictionary.")
+            return netbox_controller.bulk_post_api(api_url, resolve_names(api_url, payload), batch_size=data.get("batch_size"))
+
         if not isinstance(payload, dict):
-            raise ValueError("Payload must be a dictionary.")
+            raise ValueError("Payload must be a dictionary or a list of dictionaries.")
 
-        netbox_controller = NetBoxController(
-            netbox_url=os.getenv("NETBOX_URL"),
-            api_token=os.getenv("NETBOX_TOKEN")
-        )
-        return netbox_controller.post_api(api_url, payload)
+        return netbox_controller.post_api(api_url, resolve_names(api_url, payload))
     except Exception as e:
         return {"error": f"An error occurred in create_netbox_data_tool: {str(e)}"}
 
 @tool
 def delete_netbox_data_tool(api_url: str) -> dict:
-    """Delete data from NetBox."""
+    """Delete data from NetBox. Input is an object URL, or a JSON string {"api_url": "/api/ipam/ip-addresses/", "ids": [1, 2, 3]} to delete many objects in one call; ids of sites, roles, tenants and other reference objects may be given as names."""
     try:
-        netbox_controller = NetBoxController(
-            netbox_url=os.getenv("NETBOX_URL"),
-            api_token=os.getenv("NETBOX_TOKEN")
-        )
-        return netbox_controller.delete_api(api_url)
+        request = parse_delete_input(api_url)
+        netbox_controller = get_netbox_controller()
+        if request.get("ids"):
+            return netbox_controller.bulk_delete_api(request["api_url"], resolve_ids(request["api_url"], request["ids"]), batch_size=request.get("batch_size"))
+        return netbox_controller.delete_api(request["api_url"])
     except requests.HTTPError as e:
         return {"error": f"Failed to delete data from NetBox: {str(e)}"}
     except Exception as e:
         return {"error": f"An unexpected error occurred: {str(e)}"}
 
+# Async implementations used by AgentExecutor.ainvoke in async mode; the
+# sync functions above keep serving the threaded Slack handlers.
+async def adiscover_apis(query: str = "") -> dict:
+    return await asyncio.to_thread(discover_apis.func, query)
+
+async def acheck_supported_url_tool(api_url: str) -> dict:
+    return await asyncio.to_thread(check_supported_url_tool.func, api_url)
+
+async def aget_netbox_data_tool(api_url: str) -> dict:
+    try:
+        request = parse_get_input(api_url)
+        data = None
+        mirror = get_mirror()
+        if mirror is not None:
+            data = await asyncio.to_thread(mirror.query, request["api_url"], request.get("all_pages"), request.get("max_objects"))
+        if data is None:
+            netbox_controller = get_async_netbox_controller()
+            params = projection_params(request)
+            # limit=0 is streamed and capped at max_objects instead of loading the whole list
+            if request.get("all_pages") or is_unpaginated(request["api_url"]):
+                data = await netbox_controller.get_all(request["api_url"], params=params, max_objects=request.get("max_objects"))
+            else:
+                data = await netbox_controller.get_api(request["api_url"], params=params)
+        return project_response(request, data)
+    except httpx.HTTPStatusError as e:
+        return {"error": f"Failed to fetch data from NetBox: {str(e)}"}
+    except Exception as e:
+        return {"error": f"An unexpected error occurred: {str(e)}"}
+
+async def agraphql_netbox_tool(query: str) -> dict:
+    try:
+        netbox_controller = get_async_netbox_controller()
+        return flatten_graphql(await netbox_controller.graphql(parse_graphql_input(query)))
+    except GraphQLError as e:
+        return {"error": str(e), "templates": describe_templates()}
+    except httpx.HTTPStatusError as e:
+        return {"error": f"Failed to query NetBox GraphQL: {str(e)}"}
+    except Exception as e:
+        return {"error": f"An unexpected error occurred: {str(e)}"}
+
+async def acreate_netbox_data_tool(input: str) -> dict:
+    try:
+        data = json.loads(input)
+        api_url = data.get("api_url")
+        payload = data.get("payload")
+
+        if not api_url or not payload:
+            raise ValueError("Both 'api_url' and 'payload' must be provided.")
+
+        netbox_controller = get_async_netbox_controller()
+        if isinstance(payload, list):
+            if not all(isinstance(item, dict) for item in payload):
+                raise ValueError("Every payload in the list must be a dictionary.")
+            payload = await asyncio.to_thread(resolve_names, api_url, payload)
+            return await netbox_controller.bulk_post_api(api_url, payload, batch_size=data.get("batch_size"))
+
+        if not isinstance(payload, dict):
+            raise ValueError("Payload must be a dictionary or a list of dictionaries.")
+
+        payload = await asyncio.to_thread(resolve_names, api_url, payload)
+        return await netbox_controller.post_api(api_url, payload)
+    except Exception as e:
+        return {"error": f"An error occurred in create_netbox_data_tool: {str(e)}"}
+
+async def adelete_netbox_data_tool(api_url: str) -> dict:
+    try:
+        request = parse_delete_input(api_url)
+        netbox_controller = get_async_netbox_controller()
+        if request.get("ids"):
+            ids = await asyncio.to_thread(resolve_ids, request["api_url"], request["ids"])
+            return await netbox_controller.bulk_delete_api(request["api_url"], ids, batch_size=request.get("batch_size"))
+        return await netbox_controller.delete_api(request["api_url"])
+    except httpx.HTTPStatusError as e:
+        return {"error": f"Failed to delete data from NetBox: {str(e)}"}
+    except Exception as e:
+        return {"error": f"An unexpected error occurred: {str(e)}"}
+
+discover_apis.coroutine = adiscover_apis
+check_supported_url_tool.coroutine = acheck_supported_url_tool
+get_netbox_data_tool.coroutine = aget_netbox_data_tool
+graphql_netbox_tool.coroutine = agraphql_netbox_tool
+create_netbox_data_tool.coroutine = acreate_netbox_data_tool
+delete_netbox_data_tool.coroutine = adelete_netbox_data_tool
+
 def initialize_agent():
     global llm, agent_executor
     if not llm:
@@ -203,112 +263,141 @@ def initialize_agent():
             openai_api_key = os.getenv('OPENAI_API_KEY')
         
         # Initialize the LLM with the API key
-        llm = ChatOpenAI(model_name="gpt-4o", openai_api_key=openai_api_key)
+        # Streamed tokens let the handlers show the answer while it is generated
+        llm = ChatOpenAI(model_name=tier_model('strong'), openai_api_key=openai_api_key, streaming=streaming_enabled())
+        # Simple read requests try the cheaper, faster model first
+        fast_llm = ChatOpenAI(model_name=tier_model('fast'), openai_api_key=openai_api_key,
+                              streaming=streaming_enabled()) if tiering_enabled() else None
 
         # Define tools
-        tools = [discover_apis, check_supported_url_tool, get_netbox_data_tool, create_netbox_data_tool, delete_netbox_data_tool]
+        # Large observations are compacted to a token budget before they enter the scratchpad,
+        # and hand-offs such as check_supported_url_tool -> get_netbox_data_tool run in the same call
+        tools = chain_tools(compact_tools([discover_apis, check_supported_url_tool, get_netbox_data_tool, graphql_netbox_tool, create_netbox_data_tool, delete_netbox_data_tool]))
 
-        # Create the prompt template
-        tool_descriptions = render_text_description(tools)
-        template = """
+        # TOOLS and GUIDELINES shared by both agent modes
+        instructions = """
         Assistant is a network assistant capable of managing NetBox data using CRUD operations.
 
         TOOLS:
-        - discover_apis: Discovers available NetBox APIs from a local JSON file.
+        - discover_apis: Lists NetBox APIs from the local API catalog. Call it without input for the apps, then with an app name (e.g. ipam) or keywords (e.g. vlan) for their endpoints.
         - check_supported_url_tool: Checks if an API URL or Name is supported by NetBox.
         - get_netbox_data_tool: Fetches data from NetBox using the specified API URL.
+        - graphql_netbox_tool: Answers questions spanning related objects with one NetBox GraphQL query.
         - create_netbox_data_tool: Creates new data in NetBox using the specified API URL and payload.
         - delete_netbox_data_tool: Deletes data from NetBox using the specified API URL.
 
         GUIDELINES:
-        1. Use 'check_supported_url_tool' to validate ambiguous or unknown URLs or Names.
+        1. Use 'check_supported_url_tool' to validate ambiguous or unknown URLs or Names; only use the query filters and required fields it reports. Its result already includes the data of the closest URL under 'handoff', so do not fetch that URL again.
         2. If certain about the URL, directly use 'get_netbox_data_tool', 'create_netbox_data_tool', or 'delete_netbox_data_tool'.
-        3. Follow a structured response format to ensure consistency.
-        4. Keep responses concise and well-formatted for Slack.
-
-        FORMAT:
-        Thought: [Your thought process]
-        Action: [Tool Name]
-        Action Input: [Tool Input]
-        Observation: [Tool Response]
-        Final Answer: [Your response to the user]
-
-        Begin:
-
-        Previous conversation history:
-        {chat_history}
-
-        New input: {input}
-
-        {agent_scratchpad}
+        3. For counts or questions about every object of a type, call 'get_netbox_data_tool' with {{"api_url": "...", "all_pages": true}} so all pages are read.
+        4. For questions that join related objects (e.g. devices, their interfaces and VLANs), make ONE 'graphql_netbox_tool' call, preferably with a template, instead of chaining 'get_netbox_data_tool' calls.
+        5. To create or delete several objects, make ONE call with a list of payloads or a list of ids instead of repeating the tool.
+        6. Large results come back compacted: answer from their count, aggregates and sample, and write the [result:...] marker they give where the full list should be shown.
+        7. Follow a structured response format to ensure consistency.
+        8. Keep responses concise and well-formatted for Slack.
         """
-        prompt_template = PromptTemplate(
-            template=template,
-            input_variables=["input", "chat_history", "agent_scratchpad"],
-            partial_variables={
-                "tools": tool_descriptions,
-                "tool_names": ", ".join([t.name for t in tools])
-            }
-        )
-
-        # Create the ReAct agent
-        agent = create_react_agent(llm=llm, tools=tools, prompt=prompt_template)
-
-        # Create the AgentExecutor
-        agent_executor = AgentExecutor(
-            agent=agent,
-            tools=tools,
-            handle_parsing_errors=True,
-            verbose=True,
-            max_iterations=10
-        )
-
-def process_agent_response(response):
-    if response and response.get("status") == "supported" and "next_tool" in response.get("action", {}):
-        next_tool = response["action"]["next_tool"]
-        tool_input = response["action"]["input"]
-
-        # Automatically invoke the next tool
-        return agent_executor.invoke({
-            "input": tool_input,
-            "chat_history": "",
-            "agent_scratchpad": "",
-            "tool": next_tool
-        })
+
+        # AGENT_MODE picks the ReAct text loop or structured tool calls run in parallel;
+        # simple reads go to the fast model and escalate to the strong one if it stumbles
+        agent_executor = build_tiered_agent(llm, fast_llm, tools, instructions)
+
+def get_bot_user_id():
+    """The bot's user ID, looked up once instead of on every mention"""
+    global bot_user_id
+    if bot_user_id is None:
+        bot_user_id = app.client.auth_test()['user_id']
+    return bot_user_id
+
+def warm_llm():
+    """Send one tiny request so the first answer does not pay for the OpenAI connection setup"""
+    llm.invoke("Reply with OK.")
+
+def conversation_key(event):
+    """Memory key of a message: its thread, or the user's conversation in a channel or DM"""
+    return f"{event['channel']}:{event.get('thread_ts') or event.get('user')}"
+
+def update_message(message, text):
+    """Edit a message posted by say()"""
+    app.client.chat_update(channel=message['channel'], ts=message['ts'], text=text)
+
+def reply(say, placeholder, text):
+    """Replace the streaming placeholder with the final text, or post it when there is none"""
+    if placeholder is None:
+        say(text)
     else:
-        return response
+        update_message(placeholder, text)
 
 # Slack event handlers
 @app.event("app_mention")
 def handle_mention(event, say):
     """Handle when the bot is mentioned in a channel"""
-    user_message = event['text'].replace(f"<@{app.client.auth_test()['user_id']}>", "").strip()
+    user_message = event['text'].replace(f"<@{get_bot_user_id()}>", "").strip()
     
     if not user_message:
         say("Hello! I'm your NetBox assistant. Ask me anything about your network infrastructure!")
         return
     
+    placeholder = None
     try:
+        # Follow-ups see a token-bounded window of this conversation plus a summary of older turns
+        memory = get_memory_store(llm).get(conversation_key(event))
+        chat_history = memory.render()
+
+        # Repeated questions are answered from the cache until the data they read changes;
+        # follow-ups depend on the history, so only first questions use it
+        cached_answer = lookup_answer(user_message) if not chat_history else None
+        if cached_answer is not None:
+            say(format_response_for_slack(cached_answer))
+            memory.add_exchange(user_message, cached_answer)
+            return
+
+        # Simple list and count questions are answered without the LLM
+        fast_answer = route_question(user_message, get_netbox_data_tool.func)
+        if fast_answer is not None:
+            say(format_response_for_slack(fast_answer))
+            memory.add_exchange(user_message, fast_answer)
+            return
+
         # Initialize the agent
         initialize_agent()
         
-        # Process the message
-        response = agent_executor.invoke({
-            "input": user_message,
-            "chat_history": "",
-            "agent_scratchpad": ""
-        })
+        # Post a placeholder and edit it as the agent takes steps and writes its answer
+        callbacks = []
+        if streaming_enabled():
+            placeholder = say(PLACEHOLDER)
+            stream = StreamingCallback(lambda text: update_message(placeholder, format_response_for_slack(text)))
+            callbacks.append(stream)
         
-        # Process the agent's response
-        final_response = process_agent_response(response)
-        final_answer = final_response.get('output', 'No answer provided.')
+        # Process the message, recording the endpoints it reads for the answer cache
+        with record_answer(user_message) as recording, measure_conversation() as meter:
+            started = time.perf_counter()
+            response = agent_executor.invoke({
+                "input": user_message,
+                "chat_history": chat_history,
+                "agent_scratchpad": ""
+            }, config={"callbacks": [meter] + metrics_callbacks('slack') + callbacks})
+            
+            record_agent_latency(time.perf_counter() - started)
+            record_agent_run(meter.llm_calls)
+            # Results the answer cites as [result:...] are listed, up to REPLY_ROWS rows
+            final_answer = expand_results(response.get('output', 'No answer provided.'), format_json_for_slack)
+            if not chat_history and is_final_answer(response):
+                recording.save(final_answer)
         
         # Format the response for Slack
         formatted_response = format_response_for_slack(final_answer)
-        say(formatted_response)
+        reply(say, placeholder, formatted_response)
+        if callbacks:
+            stream.finish()
+        memory.add_exchange(user_message, final_answer)
+        logging.debug(f"Streaming: {get_stream_stats()} NetBox client stats: {get_client_stats()} "
+                      f"projection: {get_projection_stats()} name resolver: {get_resolver_stats()} "
+                      f"intent router: {get_router_stats()} answer cache: {get_answer_cache_stats()} "
+                      f"compaction: {get_compactor_stats()} agent: {get_agent_stats()} memory: {get_memory_stats()} "
+                      f"model tiers: {get_model_tier_stats()}")
         
     except Exception as e:
-        say(f"Sorry, I encountered an error: {str(e)}")
+        reply(say, placeholder, f"Sorry, I encountered an error: {str(e)}")
 
 @app.event("message")
 def handle_dm(event, say):
@@ -321,27 +410,148 @@ def handle_dm(event, say):
             say("Hello! I'm your NetBox assistant. Ask me anything about your network infrastructure!")
             return
         
+        placeholder = None
         try:
+            # Follow-ups see a token-bounded window of this conversation plus a summary of older turns
+            memory = get_memory_store(llm).get(conversation_key(event))
+            chat_history = memory.render()
+
+            # Repeated questions are answered from the cache until the data they read changes;
+            # follow-ups depend on the history, so only first questions use it
+            cached_answer = lookup_answer(user_message) if not chat_history else None
+            if cached_answer is not None:
+                say(format_response_for_slack(cached_answer))
+                memory.add_exchange(user_message, cached_answer)
+                return
+
+            # Simple list and count questions are answered without the LLM
+            fast_answer = route_question(user_message, get_netbox_data_tool.func)
+            if fast_answer is not None:
+                say(format_response_for_slack(fast_answer))
+                memory.add_exchange(user_message, fast_answer)
+                return
+
             # Initialize the agent
             initialize_agent()
             
-            # Process the message
-            response = agent_executor.invoke({
-                "input": user_message,
-                "chat_history": "",
-                "agent_scratchpad": ""
-            })
+            # Post a placeholder and edit it as the agent takes steps and writes its answer
+            callbacks = []
+            if streaming_enabled():
+                placeholder = say(PLACEHOLDER)
+                stream = StreamingCallback(lambda text: update_message(placeholder, format_response_for_slack(text)))
+                callbacks.append(stream)
             
-            # Process the agent's response
-            final_response = process_agent_response(response)
-            final_answer = final_response.get('output', 'No answer provided.')
+            # Process the message, recording the endpoints it reads for the answer cache
+            with record_answer(user_message) as recording, measure_conversation() as meter:
+                started = time.perf_counter()
+                response = agent_executor.invoke({
+                    "input": user_message,
+                    "chat_history": chat_history,
+                    "agent_scratchpad": ""
+                }, config={"callbacks": [meter] + metrics_callbacks('slack') + callbacks})
+                
+                record_agent_latency(time.perf_counter() - started)
+                record_agent_run(meter.llm_calls)
+                # Results the answer cites as [result:...] are listed, up to REPLY_ROWS rows
+                final_answer = expand_results(response.get('output', 'No answer provided.'), format_json_for_slack)
+                if not chat_history and is_final_answer(response):
+                    recording.save(final_answer)
             
             # Format the response for Slack
             formatted_response = format_response_for_slack(final_answer)
-            say(formatted_response)
+            reply(say, placeholder, formatted_response)
+            if callbacks:
+                stream.finish()
+            memory.add_exchange(user_message, final_answer)
+            logging.debug(f"Streaming: {get_stream_stats()} NetBox client stats: {get_client_stats()} "
+                          f"projection: {get_projection_stats()} name resolver: {get_resolver_stats()} "
+                          f"intent router: {get_router_stats()} answer cache: {get_answer_cache_stats()} "
+                          f"compaction: {get_compactor_stats()} agent: {get_agent_stats()} memory: {get_memory_stats()} "
+                          f"model tiers: {get_model_tier_stats()}")
             
         except Exception as e:
-            say(f"Sorry, I encountered an error: {str(e)}")
+            reply(say, placeholder, f"Sorry, I encountered an error: {str(e)}")
+
+def create_async_app():
+    """Build an AsyncApp whose handlers run the agent with ainvoke on one event loop"""
+    from slack_bolt.async_app import AsyncApp
+
+    async_app = AsyncApp(token=slack_bot_token)
+
+    async def update_message_async(message, text):
+        await async_app.client.chat_update(channel=message['channel'], ts=message['ts'], text=text)
+
+    async def reply_async(say, placeholder, text):
+        if placeholder is None:
+            await say(text)
+        else:
+            await update_message_async(placeholder, text)
+
+    async def answer(user_message, say, key):
+        if not user_message:
+            await say("Hello! I'm your NetBox assistant. Ask me anything about your network infrastructure!")
+            return
+
+        placeholder = None
+        try:
+            # Follow-ups see a token-bounded window of this conversation plus a summary of older turns
+            memory = get_memory_store(llm).get(key)
+            chat_history = memory.render()
+
+            # Repeated questions are answered from the cache until the data they read changes;
+            # follow-ups depend on the history, so only first questions use it
+            cached_answer = await asyncio.to_thread(lookup_answer, user_message) if not chat_history else None
+            if cached_answer is not None:
+                await say(format_response_for_slack(cached_answer))
+                await asyncio.to_thread(memory.add_exchange, user_message, cached_answer)
+                return
+
+            # Simple list and count questions are answered without the LLM
+            fast_answer = await asyncio.to_thread(route_question, user_message, get_netbox_data_tool.func)
+            if fast_answer is not None:
+                await say(format_response_for_slack(fast_answer))
+                await asyncio.to_thread(memory.add_exchange, user_message, fast_answer)
+                return
+
+            initialize_agent()
+            callbacks = []
+            if streaming_enabled():
+                placeholder = await say(PLACEHOLDER)
+                stream = AsyncStreamingCallback(
+                    lambda text: update_message_async(placeholder, format_response_for_slack(text)))
+                callbacks.append(stream)
+            with record_answer(user_message) as recording, measure_conversation() as meter:
+                started = time.perf_counter()
+                response = await agent_executor.ainvoke({
+                    "input": user_message,
+                    "chat_history": chat_history,
+                    "agent_scratchpad": ""
+                }, config={"callbacks": [meter] + metrics_callbacks('slack') + callbacks})
+                record_agent_latency(time.perf_counter() - started)
+                record_agent_run(meter.llm_calls)
+                final_answer = expand_results(response.get('output', 'No answer provided.'), format_json_for_slack)
+                if not chat_history and is_final_answer(response):
+                    recording.save(final_answer)
+            await reply_async(say, placeholder, format_response_for_slack(final_answer))
+            if callbacks:
+                stream.finish()
+            await asyncio.to_thread(memory.add_exchange, user_message, final_answer)
+        except Exception as e:
+            await reply_async(say, placeholder, f"Sorry, I encountered an error: {str(e)}")
+
+    @async_app.event("app_mention")
+    async def handle_mention_async(event, say):
+        """Handle when the bot is mentioned in a channel"""
+        user_id = bot_user_id or await asyncio.to_thread(get_bot_user_id)
+        await answer(event['text'].replace(f"<@{user_id}>", "").strip(), say, conversation_key(event))
+
+    @async_app.event("message")
+    async def handle_dm_async(event, say):
+        """Handle direct messages to the bot"""
+        if event.get('channel_type') == 'im':
+            await answer(event['text'].strip(), say, conversation_key(event))
+
+    return async_app
 
 def format_response_for_slack(response_text):
     """Format the agent response for Slack display"""
@@ -363,37 +573,11 @@ def format_response_for_slack(response_text):
 def format_json_for_slack(data):
     """Format JSON data for Slack display"""
     if isinstance(data, dict):
-        if 'results' in data and isinstance(data['results'], list):
-            # Handle paginated results
-            results = data['results']
-            if len(results) == 0:
-                return "No results found."
-            
-            formatted = f"Found {len(results)} result(s):\n\n"
-            for i, item in enumerate(results[:5]):  # Limit to first 5 results
-                formatted += f"*{i+1}.* "
-                if 'name' in item:
-                    formatted += f"**{item['name']}**"
-                elif 'display_name' in item:
-                    formatted += f"**{item['display_name']}**"
-                elif 'id' in item:
-                    formatted += f"**ID: {item['id']}**"
-                
-                # Add key details
-                if 'status' in item:
-                    formatted += f" (Status: {item['status']['value']})"
-                if 'site' in item and item['site']:
-                    formatted += f" (Site: {item['site']['name']})"
-                
-                formatted += "\n"
-            
-            if len(results) > 5:
-                formatted += f"\n... and {len(results) - 5} more results"
-            
-            return formatted
-        else:
-            # Handle single object
-            return json.dumps(data, indent=2)
+        if isinstance(data.get('results'), list):
+            # Raw or projected list results, up to REPLY_ROWS rows
+            return format_result_rows(data)
+        # Handle single object
+        return json.dumps(data, indent=2)
     
     return str(data)
 
@@ -409,6 +593,37 @@ if __name__ == "__main__":
     except:
         # Fallback to environment variable
         slack_app_token = os.environ["SLACK_APP_TOKEN"]
+
+    # /health answers from now on; /ready once the warm-up below has passed
+    start_status_server()
+
+    # Keep the local MySQL mirror fresh so read tools can answer from it
+    mirror = get_mirror()
+    if mirror is not None:
+        mirror.start_background_sync(float(os.getenv("MIRROR_SYNC_INTERVAL", 60)))
+
+    # Drop cached answers when NetBox data changes outside this bot
+    start_answer_cache_polling()
+
+    # Build the OpenAPI-derived catalog if enabled and missing or stale
+    ensure_catalog_in_background()
+
+    # Warm the name-to-ID index so write tools can take names without lookup calls
+    resolver = get_name_resolver()
+    if resolver is not None:
+        resolver.start_background_refresh(float(os.getenv("RESOLVER_REFRESH_INTERVAL", 300)))
+
+    # Build the agent, load the catalog, open NetBox connections and look up the bot ID
+    # before connecting, so the first message is answered at steady-state latency
+    warm_up(shared_warmup_steps() + [
+        ('agent', initialize_agent, True),
+        ('bot_identity', get_bot_user_id, True),
+    ] + ([('llm', warm_llm, False)] if llm_warmup_enabled() else []))
     
-    handler = SocketModeHandler(app, slack_app_token)
-    handler.start() 
\ No newline at end of file
+    if os.getenv("SLACK_ASYNC", "false").lower() in ("1", "true", "yes"):
+        # Async mode: conversations share one event loop and the async NetBox client
+        from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
+        asyncio.run(AsyncSocketModeHandler(create_async_app(), slack_app_token).start_async())
+    else:
+        handler = SocketModeHandler(app, slack_app_token)
+        handler.start() 
\ No newline at end of file
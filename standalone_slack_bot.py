@@ -5,6 +5,7 @@ Connects to local MySQL and uses OpenAI API for natural language processing
 """
 
 import os
+import sys
 import json
 import logging
 import requests
@@ -20,6 +21,14 @@ from langchain_community.chat_models import ChatOpenAI
 from langchain.schema import HumanMessage, SystemMessage
 import urllib3
 
+# Shared modules live in resources/ next to config_loader.py
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources'))
+from netbox_client import get_netbox_controller, get_client_stats
+from api_catalog import get_api_catalog
+from model_tiers import tier_model
+from warmup import shared_warmup_steps, warm_up, start_status_server
+from agent_metrics import metrics_callbacks
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -91,7 +100,7 @@ class OpenAIClient:
         self.api_key = api_key
         self.client = ChatOpenAI(
             openai_api_key=api_key,
-            model="gpt-3.5-turbo",
+            model=tier_model('fast'),
             temperature=0.7
         )
         logger.info("✅ OpenAI client initialized successfully")
@@ -108,7 +117,7 @@ class OpenAIClient:
             
             messages.append(HumanMessage(content=message))
             
-            response = self.client.invoke(messages)
+            response = self.client.invoke(messages, config={"callbacks": metrics_callbacks('standalone')})
             response_text = response.content
             
             logger.info(f"Received response from OpenAI: {response_text[:50]}...")
@@ -122,44 +131,6 @@ class OpenAIClient:
         """Close OpenAI client (no cleanup needed)"""
         logger.info("Closed OpenAI client connection")
 
-class NetBoxController:
-    def __init__(self, netbox_url, api_token):
-        self.netbox = netbox_url.rstrip('/')
-        self.api_token = api_token
-        self.headers = {
-            'Accept': 'application/json',
-            'Authorization': f"Token {self.api_token}",
-        }
-
-    def get_api(self, api_url: str, params: dict = None):
-        response = requests.get(
-            f"{self.netbox}{api_url}",
-            headers=self.headers,
-            params=params,
-            verify=False
-        )
-        response.raise_for_status()
-        return response.json()
-
-    def post_api(self, api_url: str, payload: dict):
-        response = requests.post(
-            f"{self.netbox}{api_url}",
-            headers=self.headers,
-            json=payload,
-            verify=False
-        )
-        response.raise_for_status()
-        return response.json()
-
-    def delete_api(self, api_url: str):
-        response = requests.delete(
-            f"{self.netbox}{api_url}",
-            headers=self.headers,
-            verify=False
-        )
-        response.raise_for_status()
-        return response.json()
-
 class StandaloneNetBoxBot:
     def __init__(self):
         # Load configuration
@@ -170,7 +141,7 @@ class StandaloneNetBoxBot:
         self.slack_config = self.config.get_slack_config()
         
         # Initialize components
-        self.netbox_controller = NetBoxController(
+        self.netbox_controller = get_netbox_controller(
             self.netbox_config['NETBOX_URL'],
             self.netbox_config['NETBOX_TOKEN']
         )
@@ -246,14 +217,11 @@ Please provide clear, actionable responses with specific API guidance when users
 
     def load_urls(self, file_path='netbox_react_agent/netbox_apis.json'):
         """Load supported URLs with their names from a JSON file"""
-        if not os.path.exists(file_path):
-            return {"error": f"URLs file '{file_path}' not found."}
-        try:
-            with open(file_path, 'r') as f:
-                data = json.load(f)
-            return [(entry['URL'], entry.get('Name', '')) for entry in data]
-        except Exception as e:
-            return {"error": f"Error loading URLs: {str(e)}"}
+        # Parsed once and reloaded only when the file changes
+        catalog = get_api_catalog(file_path)
+        if catalog.error:
+            return {"error": catalog.error}
+        return catalog.url_names()
 
     def setup_slack_handlers(self):
         """Set up Slack event handlers"""
@@ -302,6 +270,7 @@ Please provide clear, actionable responses with specific API guidance when users
             say(formatted_response)
             
             logger.info("Response sent successfully")
+            logger.debug(f"NetBox client stats: {get_client_stats()}")
             
         except Exception as e:
             error_msg = f"Sorry, I encountered an error: {str(e)}"
@@ -318,6 +287,10 @@ Please provide clear, actionable responses with specific API guidance when users
 
     def run(self):
         """Start the Slack bot"""
+        # /health, /ready and /metrics on STATUS_PORT; importing agent_metrics records NetBox requests
+        start_status_server()
+        warm_up(shared_warmup_steps())
+
         logger.info("🚀 Starting NetBox Slack Bot with OpenAI...")
         logger.info(f"📊 MySQL Host: {self.mysql_config['DB_HOST']}")
         logger.info(f"🔗 NetBox URL: {self.netbox_config['NETBOX_URL']}")
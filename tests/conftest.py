@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Shared modules are imported by name from resources/, as the entry points do
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'resources'))
@@ -0,0 +1,31 @@
+import pytest
+
+from intent_router import IntentRouter, NoRoute
+
+DEVICES = {'URL': '/api/dcim/devices/', 'Name': 'Devices',
+           'Filters': ['name', 'q', 'status', 'site', 'site_id', 'rack_id', 'role', 'role_id']}
+PREFIXES = {'URL': '/api/ipam/prefixes/', 'Name': 'Prefixes', 'Filters': ['q', 'status', 'vrf', 'vrf_id']}
+CURATED = {'URL': '/api/dcim/devices/', 'Name': 'Devices', 'Fields': ['id', 'name', 'status', 'site', 'rack']}
+
+
+@pytest.fixture(autouse=True)
+def no_resolver(monkeypatch):
+    monkeypatch.setenv('NAME_RESOLVER', 'false')
+
+
+def test_filters_from_the_openapi_list():
+    router = IntentRouter()
+    assert router.build_params(DEVICES, {'site': 'AMS1', 'status': 'active', 'name': 'sw1'}) == \
+        {'site': 'ams1', 'status': 'active', 'name': 'sw1'}
+    assert router.build_params(PREFIXES, {'name': '10.0.0.0/8'}) == {'q': '10.0.0.0/8'}
+
+
+@pytest.mark.parametrize('entry, filters', [
+    (DEVICES, {'rack': 'r1'}),           # only rack_id exists
+    (PREFIXES, {'vrf': 'blue'}),         # vrf matches the RD, not the name
+    (CURATED, {'site': 'ams1'}),         # no OpenAPI filter list to check against
+    (CURATED, {'status': 'active'}),
+])
+def test_unverified_filters_go_to_the_agent(entry, filters):
+    with pytest.raises(NoRoute):
+        IntentRouter().build_params(entry, filters)
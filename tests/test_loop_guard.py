@@ -0,0 +1,50 @@
+import pytest
+from langchain_core.agents import AgentAction
+
+import loop_guard
+from loop_guard import RunGuard
+
+
+def turn(tool, tool_input, observation):
+    return [(AgentAction(tool=tool, tool_input=tool_input, log=''), observation)]
+
+
+def run(guard, turns):
+    return [guard.check(steps) for steps in turns]
+
+
+def test_alternating_lookups_of_new_data_carry_on():
+    guard = RunGuard(time_budget=0, token_budget=0)
+    reasons = run(guard, [
+        turn('check_supported_url_tool', '/api/dcim/sites/', {'status': 'supported', 'closest_url': '/api/dcim/sites/'}),
+        turn('get_netbox_data_tool', '/api/dcim/sites/', {'count': 2, 'results': [{'name': 'ams1'}, {'name': 'fra2'}]}),
+        turn('check_supported_url_tool', '/api/ipam/prefixes/', {'status': 'supported', 'closest_url': '/api/ipam/prefixes/'}),
+        turn('get_netbox_data_tool', '/api/ipam/prefixes/', {'count': 1, 'results': [{'prefix': '10.0.0.0/8'}]}),
+    ])
+    assert reasons == [None, None, None, None]
+
+
+def test_alternating_repeated_calls_stop(monkeypatch):
+    # Let identical calls through so the alternation itself is what stops the run
+    monkeypatch.setattr(loop_guard, 'MAX_REPEATS', 2)
+    guard = RunGuard(time_budget=0, token_budget=0)
+    sites = {'count': 1, 'results': [{'name': 'ams1'}]}
+    reasons = run(guard, [
+        turn('check_supported_url_tool', '/api/dcim/sites/', {'status': 'supported'}),
+        turn('get_netbox_data_tool', '/api/dcim/sites/', sites),
+        turn('check_supported_url_tool', '/api/dcim/sites/', {'status': 'supported'}),
+        turn('get_netbox_data_tool', '/api/dcim/sites/', sites),
+    ])
+    assert reasons == [None, None, None, 'oscillation']
+
+
+def test_alternating_new_calls_without_new_data_stop():
+    guard = RunGuard(time_budget=0, token_budget=0)
+    sites = {'count': 1, 'results': [{'name': 'ams1'}]}
+    reasons = run(guard, [
+        turn('check_supported_url_tool', 'sites', {'status': 'supported'}),
+        turn('get_netbox_data_tool', '/api/dcim/sites/', sites),
+        turn('check_supported_url_tool', 'site', {'status': 'supported'}),
+        turn('get_netbox_data_tool', '/api/dcim/sites/?limit=50', sites),
+    ])
+    assert reasons[-1] == 'oscillation'
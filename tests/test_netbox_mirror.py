@@ -0,0 +1,67 @@
+import re
+import json
+
+import pytest
+
+from netbox_client import DEFAULT_MAX_OBJECTS
+from netbox_mirror import NetBoxMirror
+
+SITES = '/api/dcim/sites/'
+ROWS = DEFAULT_MAX_OBJECTS + 500
+
+
+class FakeCursor:
+    """Answers the mirror's COUNT and paged SELECT over ROWS site objects"""
+
+    def __init__(self):
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, values):
+        if sql.startswith('SELECT COUNT(*)'):
+            self.rows = [(ROWS,)]
+            return
+        limit, offset = map(int, re.search(r'LIMIT (\d+) OFFSET (\d+)', sql).groups())
+        self.rows = [(json.dumps({'id': i}),) for i in range(offset + 1, min(ROWS, offset + limit) + 1)]
+
+    def fetchone(self):
+        return self.rows[0]
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeConnection:
+    def cursor(self):
+        return FakeCursor()
+
+
+@pytest.fixture
+def mirror(monkeypatch):
+    mirror = NetBoxMirror({}, controller=None, endpoints=[SITES])
+    monkeypatch.setattr(mirror, '_connection', FakeConnection)
+    monkeypatch.setattr(mirror, 'staleness', lambda endpoint: 1.0)
+    return mirror
+
+
+@pytest.mark.parametrize('api_url, all_pages, max_objects, returned', [
+    (SITES, False, None, 50),
+    (f'{SITES}?limit=0', False, None, DEFAULT_MAX_OBJECTS),
+    (SITES, True, None, DEFAULT_MAX_OBJECTS),
+    (SITES, True, 200, 200),
+    (f'{SITES}?limit=100000', False, None, DEFAULT_MAX_OBJECTS),
+])
+def test_whole_lists_are_capped_like_get_all(mirror, api_url, all_pages, max_objects, returned):
+    data = mirror.query(api_url, all_pages=all_pages, max_objects=max_objects)
+    assert data['count'] == ROWS
+    assert data['returned'] == returned and data['truncated']
+
+
+@pytest.mark.parametrize('api_url', [f'{SITES}?limit=ten', f'{SITES}?offset=x'])
+def test_bad_paging_falls_back_to_netbox(mirror, api_url):
+    assert mirror.query(api_url) is None
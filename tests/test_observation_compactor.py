@@ -0,0 +1,36 @@
+from observation_compactor import ObservationCompactor, format_result_rows
+from projection import FieldProjector
+
+
+def device(i):
+    return {
+        'id': i,
+        'name': f'sw{i}',
+        'status': {'value': 'active', 'label': 'Active'},
+        'site': {'id': 1, 'url': '/api/dcim/sites/1/', 'display': 'dc1', 'name': 'dc1', 'slug': 'dc1'},
+        'role': {'id': 2, 'name': 'access', 'slug': 'access'},
+    }
+
+
+def test_projected_result_expands_into_rows():
+    projector = FieldProjector({})
+    rows = [projector.project_object(device(i), None) for i in range(1, 41)]
+    assert rows[0]['status'] == 'active' and rows[0]['site'] == {'id': 1, 'name': 'dc1', 'slug': 'dc1'}
+    compactor = ObservationCompactor(budget=200)
+    compacted = compactor.compact({'count': 40, 'results': rows})
+
+    text = compactor.expand_results(f"Here are the devices: [result:{compacted['result_id']}]",
+                                    lambda data: format_result_rows(data, limit=5))
+
+    assert "Found 40 result(s):" in text
+    assert "*1.* **sw1** (Status: active, Role: access, Site: dc1)" in text
+    assert "*5.* **sw5**" in text and "sw6" not in text
+    assert "... and 35 more results" in text
+
+
+def test_raw_rows_and_plain_values():
+    text = format_result_rows({'results': [device(1), {'prefix': '10.0.0.0/24', 'status': 'reserved'}, 7]})
+    assert "**sw1** (Status: active, Role: access, Site: dc1)" in text
+    assert "**10.0.0.0/24** (Status: reserved)" in text
+    assert "*3.* 7" in text
+    assert format_result_rows({'results': []}) == "No results found."